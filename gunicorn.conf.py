@@ -0,0 +1,50 @@
+"""
+Configuration Gunicorn (lue automatiquement depuis le répertoire de lancement).
+
+Le pipeline est chargé une seule fois dans le processus maître (preload_app) puis
+partagé en copie sur écriture par les workers forkés ; avec MODEL_MMAP_DIR, les
+tableaux de la forêt compilée sont en plus projetés en mémoire en lecture seule.
+Avec GUNICORN_PRELOAD=0, chaque worker répond immédiatement et charge le modèle en
+arrière-plan.
+"""
+
+import gc
+import logging
+import os
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() in ('1', 'true', 'yes')
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def on_starting(server):
+    # État d'une exécution précédente : instantanés de métriques (pids réutilisés, compteurs
+    # périmés) et modèle activé par l'administration
+    from src.metrics import clear
+    from src.model_watcher import clear_pointer
+    clear()
+    clear_pointer()
+
+
+def when_ready(server):
+    # Appelé une fois les sockets ouverts, avant le fork des workers : en preload, le
+    # chargement d'arrière-plan du maître est attendu ici pour que les workers héritent
+    # d'un modèle prêt (et qu'aucun fork n'ait lieu pendant un import).
+    if preload_app:
+        from src.model_loader import model_loader
+        model_loader.wait()
+        # Les objets du modèle sont exclus du ramasse-miettes : ses parcours ne réécrivent
+        # plus leurs en-têtes, les pages restent partagées après le fork.
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    from src.model_watcher import model_watcher
+    from src.process_memory import memory_usage
+    # Le thread de surveillance du modèle (rechargement à chaud) est relancé dans chaque worker
+    model_watcher.start()
+    usage = memory_usage()
+    logger.info(f"Worker {worker.pid} démarré: RSS {usage.get('rss_mb')} Mo, "
+                f"partagé {usage.get('shared_mb')} Mo, privé {usage.get('private_mb')} Mo")
@@ -0,0 +1,83 @@
+"""
+Données de référence de l'API (description des features, exemple de requête, limites),
+partagées par les routes Flask et ASGI. Aucun import lourd : le processus ASGI
+principal les sert sans charger pandas ni scikit-learn.
+"""
+
+API_VERSION = '1.0.0'
+
+MAX_BATCH_SIZE = 10000
+
+# Endpoints listés par la racine et la réponse 404 de l'application Flask
+ENDPOINTS = {
+    'predict': '/api/v1/predict',
+    'predict_batch': '/api/v1/predict/batch',
+    'predict_stream': '/api/v1/predict/stream',
+    'explain': '/api/v1/explain',
+    'explain_batch': '/api/v1/explain/batch',
+    'what_if': '/api/v1/what-if',
+    'counterfactual': '/api/v1/counterfactual',
+    'health': '/api/v1/health',
+    'ready': '/api/v1/ready',
+    'model_info': '/api/v1/model/info',
+    'models': '/api/v1/models',
+    'model_reload': '/api/v1/admin/model/reload',
+    'features': '/api/v1/features',
+    'example': '/api/v1/example',
+    'liveness': '/health',
+    'metrics': '/metrics'
+}
+
+FEATURE_DESCRIPTIONS = {
+    'person_age': 'Âge (18-100)',
+    'person_income': 'Revenu annuel',
+    'person_emp_exp': 'Années d\'expérience',
+    'loan_amnt': 'Montant du prêt',
+    'loan_int_rate': 'Taux d\'intérêt (%)',
+    'loan_percent_income': 'Pourcentage revenu/prêt',
+    'cb_person_cred_hist_length': 'Historique crédit',
+    'credit_score': 'Score (300-850)',
+    'person_gender': 'Genre',
+    'person_education': 'Niveau d\'étude',
+    'person_home_ownership': 'Statut logement',
+    'loan_intent': 'Objet du prêt',
+    'previous_loan_defaults_on_file': 'Défauts précédents'
+}
+
+EXAMPLE_REQUEST = {
+    'description': 'Exemple de requête',
+    'endpoint': '/api/v1/predict',
+    'method': 'POST',
+    'headers': {
+        'Content-Type': 'application/json'
+    },
+    'body': {
+        "person_age": 30,
+        "person_income": 50000,
+        "person_emp_exp": 5,
+        "loan_amnt": 15000,
+        "loan_int_rate": 10.5,
+        "loan_percent_income": 0.3,
+        "cb_person_cred_hist_length": 7,
+        "credit_score": 680,
+        "person_gender": "Male",
+        "person_education": "Bachelor",
+        "person_home_ownership": "RENT",
+        "loan_intent": "PERSONAL",
+        "previous_loan_defaults_on_file": "No"
+    },
+    'expected_response': {
+        'status': 'success',
+        'prediction': {
+            'risk_class': 0,
+            'risk_label': 'Faible risque',
+            'probability_score': 0.23,
+            'confidence_level': 'Élevé'
+        },
+        'model_info': {
+            'model_name': 'RandomForestClassifier',
+            'model_version': 'ee7f16288ef8e56b',
+            'features_used': 13
+        }
+    }
+}
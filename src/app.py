@@ -1,54 +1,39 @@
+import os
+import sys
 import streamlit as st
-import pandas as pd
-import joblib
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 
+# Racine du projet dans le chemin (streamlit run src/app.py n'y ajoute que src/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.dataset_analytics import load_analytics
+from src.input_validation import CATEGORICAL_VALUES
+from src.prediction_service import predictor as service_predictor
+
 # --- Fonctions de l'Agent IA (adaptées de ai_agent.py et du notebook) ---
-# Charger le modèle entraîné et le scaler
-@st.cache_resource # Mettre en cache le chargement pour éviter de recharger à chaque exécution
-def load_resources():
-    try:
-        model = joblib.load("best_credit_risk_model.pkl")
-        scaler = joblib.load("scaler.pkl")
-        feature_names_df = pd.read_csv("feature_names.csv")
-        feature_names = feature_names_df["feature_name"].tolist()
-        # Charger un échantillon de X_train pour obtenir toutes les colonnes après prétraitement
-        X_train_sample = pd.read_csv("X_train.csv", nrows=1)
-        all_model_columns = X_train_sample.columns.tolist()
-        return model, scaler, feature_names, all_model_columns
-    except FileNotFoundError:
-        st.error("Fichiers de modèle/scaler/features non trouvés. Assurez-vous d'avoir exécuté les étapes précédentes du notebook.")
+# Même prédicteur que l'API (pipeline complet : encodage, scaler et modèle) : l'instance du module
+# prediction_service, chargée à l'import (MODEL_PATH respecté), sans seconde copie du modèle.
+# STREAMLIT_MODEL_PATH la fait basculer une fois par processus sur un autre fichier.
+@st.cache_resource
+def load_predictor():
+    model_path = os.environ.get("STREAMLIT_MODEL_PATH")
+    if model_path and not service_predictor.load_model(model_path):
+        st.error(f"Modèle non chargé depuis STREAMLIT_MODEL_PATH ({model_path}).")
         st.stop()
+    if service_predictor.model is None:
+        st.error("Modèle non chargé : vérifiez la présence de src/models/credit_risk_pipeline.pkl (ou MODEL_PATH / STREAMLIT_MODEL_PATH).")
+        st.stop()
+    return service_predictor
 
-model, scaler, feature_names, all_model_columns = load_resources()
+predictor = load_predictor()
 
 def predict_risk_streamlit(client_data_dict):
-    # Convertir les données d'entrée en DataFrame
-    client_df = pd.DataFrame([client_data_dict])
-
-    # Définir les colonnes numériques et catégorielles (doit correspondre au prétraitement)
-    numerical_cols = ["person_age", "person_income", "person_emp_exp", "loan_amnt", "loan_int_rate", "loan_percent_income", "cb_person_cred_hist_length", "credit_score"]
-    categorical_cols = ["person_gender", "person_education", "person_home_ownership", "loan_intent", "previous_loan_defaults_on_file"]
-
-    # Appliquer One-Hot Encoding
-    client_df_processed = pd.get_dummies(client_df, columns=categorical_cols, drop_first=True)
-
-    # Assurer que toutes les colonnes du modèle sont présentes (remplir avec 0 si manquant)
-    for col in all_model_columns:
-        if col not in client_df_processed.columns:
-            client_df_processed[col] = 0
-    
-    # Réordonner les colonnes pour correspondre à l'ordre d'entraînement du modèle
-    client_df_processed = client_df_processed[all_model_columns]
-
-    # Appliquer le scaler aux colonnes numériques
-    client_df_processed[numerical_cols] = scaler.transform(client_df_processed[numerical_cols])
-
-    # Prédiction de la probabilité de risque
-    risk_proba = model.predict_proba(client_df_processed)[:, 1][0]
-    return risk_proba
+    # Validation, cache de prédictions et scoring identiques à l'API
+    return predictor.predict(client_data_dict)
 
 def explain_risk_streamlit(client_data, risk_proba):
     explanation = []
@@ -95,18 +80,18 @@ st.sidebar.header("Informations Client")
 
 with st.sidebar.form("client_form"):
     person_age = st.number_input("Âge", min_value=18, max_value=100, value=30)
-    person_gender = st.selectbox("Genre", ["Male", "Female"])
-    person_education = st.selectbox("Niveau d'éducation", ["High School", "Bachelor", "Master", "Doctorate", "Associate"])
-    person_income = st.number_input("Revenu Annuel (€)", min_value=0, value=50000)
+    person_gender = st.selectbox("Genre", CATEGORICAL_VALUES["person_gender"])
+    person_education = st.selectbox("Niveau d'éducation", CATEGORICAL_VALUES["person_education"])
+    person_income = st.number_input("Revenu Annuel (€)", min_value=1, value=50000)
     person_emp_exp = st.number_input("Années d'expérience professionnelle", min_value=0, max_value=50, value=5)
-    person_home_ownership = st.selectbox("Propriété du logement", ["RENT", "OWN", "MORTGAGE", "OTHER"])
-    loan_amnt = st.number_input("Montant du prêt (€)", min_value=0, value=15000)
-    loan_intent = st.selectbox("Intention du prêt", ["PERSONAL", "EDUCATION", "MEDICAL", "VENTURE", "HOMEIMPROVEMENT", "DEBTCONSOLIDATION"])
+    person_home_ownership = st.selectbox("Propriété du logement", CATEGORICAL_VALUES["person_home_ownership"])
+    loan_amnt = st.number_input("Montant du prêt (€)", min_value=1, value=15000)
+    loan_intent = st.selectbox("Intention du prêt", CATEGORICAL_VALUES["loan_intent"])
     loan_int_rate = st.number_input("Taux d'intérêt du prêt (%)", min_value=0.0, max_value=30.0, value=10.5)
     loan_percent_income = st.slider("Pourcentage du prêt par rapport au revenu", min_value=0.0, max_value=1.0, value=0.3, step=0.01)
     cb_person_cred_hist_length = st.number_input("Ancienneté de l'historique de crédit (années)", min_value=0, max_value=50, value=7)
     credit_score = st.number_input("Score de crédit", min_value=300, max_value=850, value=680)
-    previous_loan_defaults_on_file = st.selectbox("Défauts de paiement précédents ?", ["No", "Yes"])
+    previous_loan_defaults_on_file = st.selectbox("Défauts de paiement précédents ?", CATEGORICAL_VALUES["previous_loan_defaults_on_file"])
 
     submitted = st.form_submit_button("Prédire le Risque")
 
@@ -127,83 +112,92 @@ with st.sidebar.form("client_form"):
             "previous_loan_defaults_on_file": previous_loan_defaults_on_file
         }
 
-        risk_proba = predict_risk_streamlit(client_data)
-        explanation, actions = explain_risk_streamlit(client_data, risk_proba)
-
-        st.subheader("Résultats de la Prédiction")
-        st.write(f"Probabilité de risque d'impayé : **{risk_proba:.2f}**")
-
-        # Jauge de risque
-        fig = go.Figure(go.Indicator(
-            mode = "gauge+number",
-            value = risk_proba * 100,
-            title = {"text": "Niveau de Risque"},
-            domain = {"x": [0, 1], "y": [0, 1]},
-            gauge = {
-                "axis": {"range": [None, 100], "tickwidth": 1, "tickcolor": "darkblue"},
-                "bar": {"color": "darkblue"},
-                "bgcolor": "white",
-                "borderwidth": 2,
-                "bordercolor": "gray",
-                "steps": [
-                    {"range": [0, 30], "color": "lightgreen"},
-                    {"range": [30, 50], "color": "yellow"},
-                    {"range": [50, 70], "color": "orange"},
-                    {"range": [70, 100], "color": "red"}
-                ],
-                "threshold": {
-                    "line": {"color": "red", "width": 4},
-                    "thickness": 0.75,
-                    "value": 50
+        result = predict_risk_streamlit(client_data)
+        if result["status"] != "success":
+            st.error(result["message"])
+            st.json(result.get("details", {}))
+        else:
+            risk_proba = result["prediction"]["probability_score"]
+            explanation, actions = explain_risk_streamlit(client_data, risk_proba)
+
+            st.subheader("Résultats de la Prédiction")
+            st.write(f"Probabilité de risque d'impayé : **{risk_proba:.2f}**")
+
+            # Jauge de risque
+            fig = go.Figure(go.Indicator(
+                mode = "gauge+number",
+                value = risk_proba * 100,
+                title = {"text": "Niveau de Risque"},
+                domain = {"x": [0, 1], "y": [0, 1]},
+                gauge = {
+                    "axis": {"range": [None, 100], "tickwidth": 1, "tickcolor": "darkblue"},
+                    "bar": {"color": "darkblue"},
+                    "bgcolor": "white",
+                    "borderwidth": 2,
+                    "bordercolor": "gray",
+                    "steps": [
+                        {"range": [0, 30], "color": "lightgreen"},
+                        {"range": [30, 50], "color": "yellow"},
+                        {"range": [50, 70], "color": "orange"},
+                        {"range": [70, 100], "color": "red"}
+                    ],
+                    "threshold": {
+                        "line": {"color": "red", "width": 4},
+                        "thickness": 0.75,
+                        "value": 50
+                    }
                 }
-            }
-        ))
-        st.plotly_chart(fig, use_container_width=True)
+            ))
+            st.plotly_chart(fig, use_container_width=True)
 
-        st.subheader("Explication de l'Agent IA")
-        st.info(explanation)
+            st.subheader("Explication de l'Agent IA")
+            st.info(explanation)
 
-        st.subheader("Actions Recommandées par l'Agent IA")
-        st.success(actions)
+            st.subheader("Actions Recommandées par l'Agent IA")
+            st.success(actions)
 
 # --- Visualisations Générales des Données (dans le corps principal) ---
 st.header("Analyse Générale du Dataset")
 
-# Charger le dataset complet pour les visualisations exploratoires
+# Statistiques pré-calculées (src/dataset_analytics.py) : recalculées seulement quand le fichier
+# change, et de façon incrémentale si des lignes ont été ajoutées
+@st.cache_data(show_spinner=False)
+def dataset_analytics(path, mtime_ns, size):
+    analytics = load_analytics(path)
+    histograms = {column: analytics.histogram(column) + (np.diff(analytics.edges[column]),)
+                  for column in analytics.histograms}
+    return analytics.target_counts, analytics.risk_rate, analytics.correlation(), histograms
+
+def histogram_figure(histograms, column, title):
+    centers, counts, widths = histograms[column]
+    fig = go.Figure(go.Bar(x=centers, y=counts, width=widths))
+    fig.update_layout(title=title, xaxis_title=column, yaxis_title="count", bargap=0)
+    return fig
+
 try:
-    df_full = pd.read_csv("loan_data.csv") # Charger le dataset réel original
-    df_full = df_full.rename(columns={"loan_status": "target"})
+    stat = os.stat("loan_data.csv")  # Dataset réel original
+    target_counts, risk_rate, corr_matrix, histograms = dataset_analytics("loan_data.csv", stat.st_mtime_ns, stat.st_size)
 
     # Distribution de la variable cible
     st.subheader("Distribution du Risque Client")
-    fig_target = px.histogram(df_full, x="target", title="Distribution de la Variable Cible (0=Payeur, 1=Impayé)")
+    fig_target = px.bar(x=[0, 1], y=target_counts, labels={"x": "target", "y": "count"},
+                        title="Distribution de la Variable Cible (0=Payeur, 1=Impayé)")
     st.plotly_chart(fig_target, use_container_width=True)
 
     # Taux de risque global
-    risk_clients = len(df_full[df_full["target"] == 1])
-    total_clients = len(df_full)
-    risk_rate = (risk_clients / total_clients * 100)
-    st.metric("Taux de risque global dans le dataset", f"{risk_rate:.1f}%")
+    st.metric("Taux de risque global dans le dataset", f"{risk_rate * 100:.1f}%")
 
     # Matrice de corrélation des variables numériques
     st.subheader("Matrice de Corrélation des Variables Numériques")
-    numerical_cols_full = ["person_age", "person_income", "person_emp_exp", "loan_amnt", "loan_int_rate", "loan_percent_income", "cb_person_cred_hist_length", "credit_score"]
-    corr_matrix = df_full[numerical_cols_full].corr()
-    fig_corr = px.imshow(corr_matrix, text_auto=True, aspect="auto", color_continuous_scale="RdBu", title="Matrice de Corrélation")
+    fig_corr = px.imshow(corr_matrix, text_auto=True, aspect="auto",
+                         color_continuous_scale="RdBu", title="Matrice de Corrélation")
     st.plotly_chart(fig_corr, use_container_width=True)
 
-    # Distributions de quelques variables clés
+    # Distributions de quelques variables clés (classes pré-calculées)
     st.subheader("Distributions des Variables Clés")
-    fig_dist = px.histogram(df_full, x="person_income", title="Distribution du Revenu Annuel")
-    st.plotly_chart(fig_dist, use_container_width=True)
-
-    fig_dist_age = px.histogram(df_full, x="person_age", title="Distribution de l'Âge")
-    st.plotly_chart(fig_dist_age, use_container_width=True)
-
-    fig_dist_loan = px.histogram(df_full, x="loan_amnt", title="Distribution du Montant du Prêt")
-    st.plotly_chart(fig_dist_loan, use_container_width=True)
+    st.plotly_chart(histogram_figure(histograms, "person_income", "Distribution du Revenu Annuel"), use_container_width=True)
+    st.plotly_chart(histogram_figure(histograms, "person_age", "Distribution de l'Âge"), use_container_width=True)
+    st.plotly_chart(histogram_figure(histograms, "loan_amnt", "Distribution du Montant du Prêt"), use_container_width=True)
 
 except FileNotFoundError:
     st.warning("Le fichier 'loan_data.csv' n'a pas été trouvé. Veuillez vous assurer qu'il est dans le même répertoire que l'application Streamlit.")
-
-
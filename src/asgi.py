@@ -0,0 +1,185 @@
+"""
+Point d'entrée ASGI pour le scoring : /predict, /predict/batch et les routes d'information
+(santé, infos modèle, features, exemple) de l'API, avec des handlers asynchrones. Le scoring,
+lié au CPU, est délégué à un pool de processus pré-chauffés ; santé, features et exemple
+restent servis par la boucle d'événements. Les autres routes de l'application Flask
+(explications, what-if, contrefactuels, flux, versions, rechargement, /metrics) répondent
+501 NOT_AVAILABLE_ON_ASGI.
+
+Lancement : uvicorn src.asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.api_reference import API_VERSION, MAX_BATCH_SIZE, FEATURE_DESCRIPTIONS, EXAMPLE_REQUEST
+from src.metrics import clear as clear_metrics
+from src.scoring_pool import ScoringPool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+pool = ScoringPool()
+
+
+async def _start_pool():
+    # Démarrage du pool hors de la boucle : le serveur écoute et répond à /health pendant
+    # que les processus chargent le modèle et exécutent leur chauffe
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, pool.start)
+    except Exception as e:
+        logger.error(f"Échec du démarrage du pool de scoring: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Instantanés de métriques d'une exécution précédente, avant que le pool n'en écrive
+    clear_metrics()
+    startup = asyncio.create_task(_start_pool())
+    yield
+    await startup
+    pool.shutdown()
+
+
+def _error(status_code: int, error_code: str, message: str, details: dict = None) -> JSONResponse:
+    body = {'status': 'error', 'error_code': error_code, 'message': message}
+    if details is not None:
+        body['details'] = details
+    return JSONResponse(body, status_code=status_code)
+
+
+def _not_ready() -> JSONResponse:
+    return _error(503, 'MODEL_NOT_READY', 'Pool de scoring en cours de démarrage')
+
+
+async def _json_body(request: Request):
+    if request.headers.get('content-type', '').split(';')[0].strip() != 'application/json':
+        return None, _error(400, 'INVALID_CONTENT_TYPE', 'Content-Type doit être application/json')
+    try:
+        return await request.json(), None
+    except ValueError:
+        return None, _error(400, 'INVALID_JSON', 'Corps de requête JSON invalide')
+
+
+async def predict_credit_risk(request: Request) -> JSONResponse:
+    data, error = await _json_body(request)
+    if error is not None:
+        return error
+    if not data:
+        return _error(400, 'EMPTY_REQUEST', 'Corps de requête vide')
+    if not pool.ready:
+        return _not_ready()
+    try:
+        result = await pool.predict(data)
+        return JSONResponse(result, status_code=200 if result['status'] == 'success' else 400)
+    except Exception as e:
+        logger.error(f"Erreur dans l'endpoint /predict: {str(e)}")
+        return _error(500, 'INTERNAL_ERROR', 'Erreur interne du serveur', {'error': str(e)})
+
+
+async def predict_credit_risk_batch(request: Request) -> JSONResponse:
+    data, error = await _json_body(request)
+    if error is not None:
+        return error
+    records = data.get('applicants') if isinstance(data, dict) else data
+    if not isinstance(records, list) or not records:
+        return _error(400, 'EMPTY_REQUEST',
+                      'Le corps doit contenir une liste non vide de demandeurs (ou {"applicants": [...]})')
+    if len(records) > MAX_BATCH_SIZE:
+        return _error(413, 'BATCH_TOO_LARGE', f'Le lot ne peut pas dépasser {MAX_BATCH_SIZE} demandeurs',
+                      {'received': len(records), 'max_batch_size': MAX_BATCH_SIZE})
+    if not pool.ready:
+        return _not_ready()
+    try:
+        result = await pool.predict_batch(records)
+        return JSONResponse(result, status_code=200 if result['status'] == 'success' else 400)
+    except Exception as e:
+        logger.error(f"Erreur dans l'endpoint /predict/batch: {str(e)}")
+        return _error(500, 'INTERNAL_ERROR', 'Erreur interne du serveur', {'error': str(e)})
+
+
+async def health_check(request: Request) -> JSONResponse:
+    # Liveness, ne passe jamais par le pool : reste réactif même quand tous les cœurs évaluent
+    return JSONResponse({
+        'status': 'healthy' if pool.ready else 'starting',
+        'pipeline_loaded': pool.ready,
+        'scoring_workers': len(pool.worker_status),
+        'timestamp': datetime.now().isoformat(),
+        'version': API_VERSION,
+        'api_status': 'running'
+    })
+
+
+async def readiness_check(request: Request) -> JSONResponse:
+    return JSONResponse({
+        'status': 'ready' if pool.ready else 'not_ready',
+        'scoring_workers': len(pool.worker_status),
+        'timestamp': datetime.now().isoformat()
+    }, status_code=200 if pool.ready else 503)
+
+
+async def get_model_info(request: Request) -> JSONResponse:
+    if not pool.ready:
+        return JSONResponse({'status': 'error', 'message': 'Aucun pipeline chargé'}, status_code=503)
+    try:
+        return JSONResponse(await pool.model_info())
+    except Exception as e:
+        logger.error(f"Erreur dans l'endpoint /model/info: {str(e)}")
+        return _error(500, 'INTERNAL_ERROR', 'Erreur interne du serveur', {'error': str(e)})
+
+
+async def get_features(request: Request) -> JSONResponse:
+    return JSONResponse({
+        'features': list(FEATURE_DESCRIPTIONS),
+        'count': len(FEATURE_DESCRIPTIONS),
+        'description': FEATURE_DESCRIPTIONS
+    })
+
+
+async def get_example_request(request: Request) -> JSONResponse:
+    return JSONResponse(EXAMPLE_REQUEST)
+
+
+# Routes de l'application Flask (src/main.py) sans équivalent ASGI
+FLASK_ONLY_ROUTES = [
+    ('/api/v1/explain', ['POST']),
+    ('/api/v1/explain/batch', ['POST']),
+    ('/api/v1/what-if', ['POST']),
+    ('/api/v1/counterfactual', ['POST']),
+    ('/api/v1/predict/stream', ['POST']),
+    ('/api/v1/models', ['GET']),
+    ('/api/v1/admin/model/reload', ['GET', 'POST']),
+    ('/metrics', ['GET']),
+]
+
+
+async def not_available(request: Request) -> JSONResponse:
+    return _error(501, 'NOT_AVAILABLE_ON_ASGI',
+                  f"{request.url.path} n'est servi que par l'application Flask (gunicorn src.main:app)")
+
+
+routes = [
+    Route('/api/v1/predict', predict_credit_risk, methods=['POST']),
+    Route('/api/v1/predict/batch', predict_credit_risk_batch, methods=['POST']),
+    Route('/api/v1/health', health_check, methods=['GET']),
+    Route('/api/v1/ready', readiness_check, methods=['GET']),
+    Route('/api/v1/model/info', get_model_info, methods=['GET']),
+    Route('/api/v1/features', get_features, methods=['GET']),
+    Route('/api/v1/example', get_example_request, methods=['GET']),
+    *[Route(path, not_available, methods=methods) for path, methods in FLASK_ONLY_ROUTES],
+]
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    middleware=[Middleware(CORSMiddleware, allow_origins=["https://sallamihamza.github.io", "http://localhost:5173"])]
+)
@@ -0,0 +1,218 @@
+"""
+Scoring hors ligne d'un portefeuille complet (même schéma que loan_data.csv).
+
+Le fichier d'entrée est lu par blocs (un enregistrement par ligne), les blocs sont répartis
+sur un pool de processus (une copie du modèle par processus) et les résultats
+(risk_class, probability_score, confidence_level) sont écrits dans l'ordre d'entrée,
+en CSV ou en Parquet. Une cellule numérique illisible ne rejette que sa ligne (erreur de
+validation par ligne). Un fichier de progression enregistre la position atteinte dans le
+fichier d'entrée : une reprise y repart directement, sans relire les lignes déjà scorées.
+
+Usage :
+    python -m src.batch_scoring src/loan_data.csv scores.csv
+    python -m src.batch_scoring portefeuille.csv scores.parquet --workers 8 --chunk-rows 100000
+    python -m src.batch_scoring portefeuille.csv scores.csv --resume
+"""
+
+import argparse
+import io
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from src.api_reference import FEATURE_DESCRIPTIONS
+from src.input_validation import CATEGORICAL_VALUES, coerce_numeric_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURES = list(FEATURE_DESCRIPTIONS)
+
+# Catégorielles en chaînes ; les numériques sont inférées puis converties cellule par cellule
+# (coerce_numeric_text). Les colonnes hors schéma ne sont pas lues.
+INPUT_DTYPES = {field: str for field in FEATURES if field in CATEGORICAL_VALUES}
+
+_worker_predictor = None
+
+
+def _init_worker(pipeline_path: Optional[str]):
+    global _worker_predictor
+    # Le prédicteur du module charge MODEL_PATH dès l'import : un seul chargement par processus
+    # (load_model ignore ensuite le même fichier inchangé)
+    if pipeline_path:
+        os.environ['MODEL_PATH'] = pipeline_path
+    from src.prediction_service import predictor
+    if pipeline_path:
+        predictor.load_model(pipeline_path)
+    _worker_predictor = predictor
+
+
+def _score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    return _worker_predictor.predict_frame(coerce_numeric_text(chunk, FEATURES))
+
+
+def iter_chunks(input_path: str, chunk_rows: int, offset: int = 0) -> Iterator[Tuple[pd.DataFrame, int]]:
+    # Blocs de chunk_rows lignes et position (octets) de la fin de chaque bloc dans le fichier.
+    # Suppose un enregistrement par ligne (schéma de loan_data.csv, pas de champ multiligne).
+    with open(input_path, 'rb') as f:
+        header = f.readline()
+        position = offset or len(header)
+        f.seek(position)
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            position += sum(len(line) for line in lines)
+            chunk = pd.read_csv(io.BytesIO(header + b''.join(lines)), usecols=lambda column: column in FEATURES,
+                                dtype=INPUT_DTYPES)
+            if len(chunk):
+                yield chunk, position
+
+
+class ResultWriter:
+    # CSV : un seul fichier, tronqué à la dernière taille validée lors d'une reprise.
+    # Parquet : un répertoire de fichiers part-NNNNN.parquet, un par bloc (écrits puis renommés).
+    def __init__(self, output_path: str, output_format: str, written_bytes: int = 0, chunks_done: int = 0):
+        self.output_path = output_path
+        self.output_format = output_format
+        self.written_bytes = written_bytes
+        self.chunks_done = chunks_done
+        if output_format == 'csv':
+            mode = 'r+b' if written_bytes and os.path.exists(output_path) else 'wb'
+            self._file = open(output_path, mode)
+            self._file.truncate(written_bytes)
+            self._file.seek(written_bytes)
+        else:
+            os.makedirs(output_path, exist_ok=True)
+
+    def write(self, results: pd.DataFrame):
+        if self.output_format == 'csv':
+            data = results.to_csv(index=False, header=self.written_bytes == 0).encode('utf-8')
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.written_bytes += len(data)
+        else:
+            part = os.path.join(self.output_path, f'part-{self.chunks_done:05d}.parquet')
+            results.to_parquet(part + '.tmp', index=False)
+            os.replace(part + '.tmp', part)
+        self.chunks_done += 1
+
+    def close(self):
+        if self.output_format == 'csv':
+            self._file.close()
+
+
+def _progress_path(output_path: str) -> str:
+    return output_path.rstrip(os.sep) + '.progress.json'
+
+
+def _load_progress(output_path: str, input_path: str, chunk_rows: int) -> Dict[str, Any]:
+    path = _progress_path(output_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        progress = json.load(f)
+    if progress.get('input') != os.path.abspath(input_path) or progress.get('chunk_rows') != chunk_rows:
+        raise ValueError(f"Le fichier de progression {path} ne correspond pas à cette exécution "
+                         f"(entrée ou taille de bloc différente)")
+    return progress
+
+
+def _save_progress(output_path: str, progress: Dict[str, Any]):
+    path = _progress_path(output_path)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(progress, f)
+    os.replace(path + '.tmp', path)
+
+
+def score_file(input_path: str, output_path: str, output_format: str = None, workers: int = None,
+               chunk_rows: int = 50000, pipeline_path: str = None, resume: bool = False) -> Dict[str, Any]:
+    output_format = output_format or ('parquet' if output_path.endswith('.parquet') else 'csv')
+    workers = workers or os.cpu_count() or 1
+
+    progress = _load_progress(output_path, input_path, chunk_rows) if resume else {}
+    rows_done = progress.get('rows_done', 0)
+    if rows_done:
+        if 'input_offset' not in progress:
+            raise ValueError("Fichier de progression sans position d'entrée (version antérieure) : relancer sans --resume")
+        logger.info(f"Reprise après {rows_done} lignes ({progress['chunks_done']} blocs)")
+    progress.update({'input': os.path.abspath(input_path), 'chunk_rows': chunk_rows,
+                     'rows_done': rows_done, 'failed': progress.get('failed', 0)})
+
+    writer = ResultWriter(output_path, output_format, progress.get('written_bytes', 0), progress.get('chunks_done', 0))
+    reader = iter_chunks(input_path, chunk_rows, progress.get('input_offset', 0))
+
+    start = time.monotonic()
+    scored = 0
+    # Au plus deux blocs en vol par processus : la mémoire reste bornée, l'ordre est celui de la file
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pipeline_path,)) as executor:
+        chunks = iter(reader)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    frame, end_offset = chunk
+                    pending.append((executor.submit(_score_chunk, frame), end_offset))
+            if not pending:
+                break
+            future, end_offset = pending.popleft()
+            results = future.result()
+            writer.write(results)
+            scored += len(results)
+            progress.update({
+                'rows_done': progress['rows_done'] + len(results),
+                'chunks_done': writer.chunks_done,
+                'written_bytes': writer.written_bytes,
+                'input_offset': end_offset,
+                'failed': progress['failed'] + int(results['risk_class'].isna().sum())
+            })
+            _save_progress(output_path, progress)
+            elapsed = time.monotonic() - start
+            logger.info(f"{progress['rows_done']} lignes écrites ({scored / elapsed:,.0f} lignes/s)")
+    writer.close()
+
+    elapsed = time.monotonic() - start
+    summary = {
+        'rows': progress['rows_done'],
+        'rows_this_run': scored,
+        'failed': progress['failed'],
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(scored / elapsed) if elapsed else 0,
+        'workers': workers,
+        'output': output_path,
+        'format': output_format
+    }
+    os.remove(_progress_path(output_path))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring hors ligne d'un fichier de demandeurs")
+    parser.add_argument('input', help='Fichier CSV (schéma de loan_data.csv)')
+    parser.add_argument('output', help='Fichier CSV ou répertoire Parquet de sortie')
+    parser.add_argument('--format', choices=('csv', 'parquet'), help='Déduit de l\'extension par défaut')
+    parser.add_argument('--workers', type=int, help='Nombre de processus (défaut : un par cœur)')
+    parser.add_argument('--chunk-rows', type=int, default=50000, help='Lignes par bloc (défaut : 50 000)')
+    parser.add_argument('--model', help='Chemin du pipeline (défaut : src/models/credit_risk_pipeline.pkl)')
+    parser.add_argument('--resume', action='store_true', help='Reprendre une exécution interrompue')
+    args = parser.parse_args()
+
+    summary = score_file(args.input, args.output, args.format, args.workers, args.chunk_rows, args.model, args.resume)
+    print(f"✅ {summary['rows']} lignes scorées ({summary['failed']} invalides) en {summary['seconds']}s "
+          f"avec {summary['workers']} processus : {summary['rows_per_second']:,} lignes/s -> {summary['output']}")
+
+
+if __name__ == '__main__':
+    main()
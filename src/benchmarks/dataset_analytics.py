@@ -0,0 +1,86 @@
+"""
+Vérifie que les statistiques mises en cache du tableau de bord (src/dataset_analytics.py)
+sont identiques à celles de pandas sur loan_data.csv, y compris après un ajout de lignes
+traité de façon incrémentale, et compare le coût d'un rafraîchissement : relecture complète
+du CSV, cache valide, ajout de lignes.
+
+Usage : python -m src.benchmarks.dataset_analytics [--data src/loan_data.csv]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.dataset_analytics import load_analytics, NUMERIC_COLUMNS, TARGET
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOLERANCE = 1e-9
+
+
+def check_against_pandas(analytics, df: pd.DataFrame, label: str) -> bool:
+    corr_diff = float(np.nanmax(np.abs(analytics.correlation().to_numpy() - df[NUMERIC_COLUMNS].corr().to_numpy())))
+    same_counts = analytics.target_counts.tolist() == [int((df[TARGET] == 0).sum()), int((df[TARGET] == 1).sum())]
+    same_histograms = all(
+        np.array_equal(counts, np.histogram(df[column].dropna(), bins=analytics.edges[column])[0])
+        for column, counts in analytics.histograms.items()
+    )
+    passed = corr_diff <= TOLERANCE and same_counts and same_histograms and analytics.rows == len(df)
+    print(f"{'✅' if passed else '❌'} {label} : {analytics.rows} lignes, taux de risque {analytics.risk_rate:.1%}, "
+          f"écart max des corrélations {corr_diff:.1e}, cible {'identique' if same_counts else 'différente'}, "
+          f"histogrammes {'identiques' if same_histograms else 'différents'}")
+    return passed
+
+
+def _ms(fn, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def pandas_refresh(csv_path: str):
+    # Ce que faisait chaque rerun de src/app.py
+    df = pd.read_csv(csv_path)
+    df[NUMERIC_COLUMNS].corr()
+    for column in ('person_income', 'person_age', 'loan_amnt'):
+        np.histogram(df[column].dropna(), bins=50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=os.path.join(SRC_DIR, 'loan_data.csv'))
+    parser.add_argument('--appended', type=int, default=2000, help="Lignes ajoutées pour le test incrémental")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    head, tail = df.iloc[:-args.appended], df.iloc[-args.appended:]
+    directory = tempfile.mkdtemp()
+    try:
+        csv_path, cache_dir = os.path.join(directory, 'loan_data.csv'), os.path.join(directory, 'cache')
+        head.to_csv(csv_path, index=False)
+        ok = check_against_pandas(load_analytics(csv_path, cache_dir), head, 'calcul complet')
+
+        tail.to_csv(csv_path, mode='a', header=False, index=False)
+        start = time.perf_counter()
+        analytics = load_analytics(csv_path, cache_dir)
+        append_ms = (time.perf_counter() - start) * 1000
+        ok = check_against_pandas(analytics, df, f'après ajout de {args.appended} lignes') and ok
+        ok = check_against_pandas(load_analytics(csv_path, cache_dir), df, 'relu depuis le cache') and ok
+
+        print(f"\nDurée d'un rafraîchissement ({len(df)} lignes) :")
+        print(f"  {'relecture du CSV (pandas)':<30}{_ms(lambda: pandas_refresh(csv_path)):>10.1f} ms")
+        print(f"  {'cache valide':<30}{_ms(lambda: load_analytics(csv_path, cache_dir)):>10.1f} ms")
+        print(f"  {f'ajout de {args.appended} lignes':<30}{append_ms:>10.1f} ms")
+    finally:
+        shutil.rmtree(directory)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
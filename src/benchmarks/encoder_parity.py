@@ -0,0 +1,94 @@
+"""
+Vérifie que l'encodeur compilé reproduit exactement le ColumnTransformer du pipeline
+sur loan_data.csv, puis compare la latence des deux chemins.
+
+Usage : python -m src.benchmarks.encoder_parity [--model src/models/credit_risk_pipeline.pkl]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.feature_encoder import CompiledFeatureEncoder
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _dense(matrix):
+    return matrix.toarray() if hasattr(matrix, 'toarray') else np.asarray(matrix)
+
+
+def check_parity(pipeline, df: pd.DataFrame, feature_names) -> bool:
+    encoder = CompiledFeatureEncoder.from_pipeline(pipeline, feature_names)
+    if encoder is None:
+        print("❌ Pipeline non compilable")
+        return False
+
+    expected = _dense(pipeline.named_steps['preprocessor'].transform(df))
+    records = df.to_dict('records')
+    checks = {
+        'transform_frame': encoder.transform_frame(df),
+        'transform_records': encoder.transform_records(records),
+        'transform_record': np.vstack([encoder.transform_record(r) for r in records[:2000]]),
+    }
+    ok = True
+    for name, actual in checks.items():
+        reference = expected[:len(actual)]
+        max_diff = float(np.max(np.abs(actual - reference))) if actual.size else 0.0
+        equal = actual.shape == reference.shape and max_diff == 0.0
+        ok &= equal
+        print(f"{'✅' if equal else '❌'} {name}: {actual.shape[0]} lignes, écart max {max_diff:.3e}")
+    return ok
+
+
+def _timeit(fn, rows, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(rows[i % len(rows)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def compare_latency(pipeline, df: pd.DataFrame, feature_names, repeat: int):
+    encoder = CompiledFeatureEncoder.from_pipeline(pipeline, feature_names)
+    preprocessor = pipeline.named_steps['preprocessor']
+    classifier = pipeline.steps[-1][1]
+    records = df.head(1000).to_dict('records')
+
+    results = {
+        'encodage ColumnTransformer': _timeit(
+            lambda r: preprocessor.transform(pd.DataFrame([r])[feature_names]), records, repeat),
+        'encodage compilé': _timeit(encoder.transform_record, records, repeat),
+        'predict_proba pipeline': _timeit(
+            lambda r: pipeline.predict_proba(pd.DataFrame([r])[feature_names]), records, repeat),
+        'predict_proba compilé': _timeit(
+            lambda r: classifier.predict_proba(encoder.transform_record(r)), records, repeat),
+    }
+    print(f"\nLatence par ligne (moyenne sur {repeat} appels) :")
+    for name, micros in results.items():
+        print(f"  {name:<28} {micros:10.1f} µs")
+    print(f"  gain encodage : x{results['encodage ColumnTransformer'] / results['encodage compilé']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(SRC_DIR, 'models', 'credit_risk_pipeline.pkl'))
+    parser.add_argument('--data', default=os.path.join(SRC_DIR, 'loan_data.csv'))
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    feature_names = list(pd.read_csv(os.path.join(SRC_DIR, 'models', 'original_feature_names.csv'))['feature_name'])
+    pipeline = joblib.load(args.model)
+    df = pd.read_csv(args.data)[feature_names]
+
+    ok = check_parity(pipeline, df, feature_names)
+    compare_latency(pipeline, df, feature_names, args.repeat)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Vérifie sur loan_data.csv que les contributions par feature s'additionnent exactement à la
+probabilité servie (valeur de base + somme des contributions) et compare le coût d'une
+explication à celui d'une prédiction, ligne seule et par lot.
+
+Usage : python -m src.benchmarks.explanations [--model src/models/credit_risk_pipeline.pkl]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.input_validation import validate_frame
+from src.prediction_service import CreditRiskPredictor
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_SIZES = (1, 100, 10000)
+
+# Écart toléré entre valeur de base + contributions et la probabilité du modèle
+ADDITIVITY_TOLERANCE = 1e-9
+
+
+def check_additivity(model, df: pd.DataFrame) -> bool:
+    _, expected = model.score_frame(df)
+    _, probabilities, contributions = model.explain_frame(df)
+    max_diff = float(np.abs(model.explainer.base_value + contributions.sum(axis=1) - expected).max())
+    same = float(np.abs(probabilities - expected).max())
+    passed = max_diff <= ADDITIVITY_TOLERANCE and same <= ADDITIVITY_TOLERANCE
+    print(f"{'✅' if passed else '❌'} {len(df)} lignes : écart max base + contributions / probabilité {max_diff:.2e}, "
+          f"probabilités explication / prédiction {same:.2e} (tolérance {ADDITIVITY_TOLERANCE:.0e})")
+    mean_abs = pd.Series(np.abs(contributions).mean(axis=0), index=model.explainer.feature_names)
+    print("   contribution absolue moyenne : " + ', '.join(
+        f"{name} {value:.3f}" for name, value in mean_abs.sort_values(ascending=False).items()))
+    return passed
+
+
+def _ms_per_call(fn, df: pd.DataFrame, batch_size: int, min_time: float) -> float:
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time or calls < 3:
+        offset = (calls * batch_size) % max(1, len(df) - batch_size)
+        fn(df.iloc[offset:offset + batch_size])
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def compare_latency(model, df: pd.DataFrame, min_time: float):
+    print("\nDurée par appel (ms) :")
+    print(f"  {'chemin':<14}" + ''.join(f"{f'lot={b}':>12}" for b in BATCH_SIZES))
+    for name, fn in (('prédiction', model.score_frame), ('explication', model.explain_frame)):
+        print(f"  {name:<14}" + ''.join(f"{_ms_per_call(fn, df, b, min_time):>12.3f}" for b in BATCH_SIZES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(SRC_DIR, 'models', 'credit_risk_pipeline.pkl'))
+    parser.add_argument('--data', default=os.path.join(SRC_DIR, 'loan_data.csv'))
+    parser.add_argument('--min-time', type=float, default=1.0, help='Durée minimale de mesure par cas (s)')
+    args = parser.parse_args()
+
+    predictor = CreditRiskPredictor(args.model)
+    model = predictor.model
+    if model is None or model.explainer is None:
+        print("❌ Explications indisponibles pour ce modèle")
+        sys.exit(1)
+    df, valid_mask, _ = validate_frame(pd.read_csv(args.data), predictor.feature_names)
+    df = df[valid_mask].reset_index(drop=True)
+    ok = check_additivity(model, df)
+    compare_latency(model, df, args.min_time)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
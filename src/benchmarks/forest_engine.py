@@ -0,0 +1,89 @@
+"""
+Vérifie que le moteur de forêt compilé reproduit predict_proba de sklearn sur loan_data.csv
+et mesure le débit pour des lots de 1, 100 et 10 000 lignes.
+
+Usage : python -m src.benchmarks.forest_engine [--model src/models/credit_risk_pipeline.pkl]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.feature_encoder import CompiledFeatureEncoder
+from src.forest_engine import CompiledForest
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Écart absolu maximal toléré sur les probabilités par rapport à sklearn
+PROBA_TOLERANCE = {'float64': 1e-12, 'float32': 1e-6}
+BATCH_SIZES = (1, 100, 10000)
+
+
+def check_parity(classifier, X: np.ndarray) -> bool:
+    expected = classifier.predict_proba(X)
+    ok = True
+    for dtype in (np.float64, np.float32):
+        engine = CompiledForest(classifier, dtype=dtype)
+        for label, rows in (('lot', X), ('ligne à ligne', X[:500])):
+            actual = engine.predict_proba(rows) if label == 'lot' else np.vstack(
+                [engine.predict_proba(rows[i:i + 1]) for i in range(len(rows))])
+            max_diff = float(np.max(np.abs(actual - expected[:len(rows)])))
+            same_class = float(np.mean(np.argmax(actual, axis=1) == np.argmax(expected[:len(rows)], axis=1)))
+            tolerance = PROBA_TOLERANCE[np.dtype(dtype).name]
+            passed = max_diff <= tolerance and same_class == 1.0
+            ok &= passed
+            print(f"{'✅' if passed else '❌'} {np.dtype(dtype).name:<8} {label:<14} {len(rows):>6} lignes, "
+                  f"écart max {max_diff:.2e} (tolérance {tolerance:.0e}), classes identiques {same_class:.2%}")
+    return ok
+
+
+def _throughput(fn, X: np.ndarray, batch_size: int, min_time: float) -> float:
+    calls, rows, start = 0, 0, time.perf_counter()
+    while time.perf_counter() - start < min_time or calls < 3:
+        offset = (calls * batch_size) % max(1, len(X) - batch_size)
+        fn(X[offset:offset + batch_size])
+        calls += 1
+        rows += batch_size
+    return rows / (time.perf_counter() - start)
+
+
+def compare_throughput(classifier, X: np.ndarray, min_time: float):
+    scorers = {
+        'sklearn': classifier.predict_proba,
+        'compiled (float64)': CompiledForest(classifier, dtype=np.float64).predict_proba,
+        'compiled (float32)': CompiledForest(classifier, dtype=np.float32).predict_proba,
+    }
+    print("\nDébit predict_proba (lignes/s) :")
+    print(f"  {'moteur':<20}" + ''.join(f"{f'lot={b}':>14}" for b in BATCH_SIZES))
+    for name, fn in scorers.items():
+        rates = [_throughput(fn, X, b, min_time) for b in BATCH_SIZES]
+        print(f"  {name:<20}" + ''.join(f"{r:>14,.0f}" for r in rates))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(SRC_DIR, 'models', 'credit_risk_pipeline.pkl'))
+    parser.add_argument('--data', default=os.path.join(SRC_DIR, 'loan_data.csv'))
+    parser.add_argument('--min-time', type=float, default=1.0, help='Durée minimale de mesure par cas (s)')
+    args = parser.parse_args()
+
+    feature_names = list(pd.read_csv(os.path.join(SRC_DIR, 'models', 'original_feature_names.csv'))['feature_name'])
+    pipeline = joblib.load(args.model)
+    df = pd.read_csv(args.data)[feature_names]
+    X = CompiledFeatureEncoder.from_pipeline(pipeline, feature_names).transform_frame(df)
+    classifier = pipeline.steps[-1][1]
+
+    engine = CompiledForest(classifier)
+    print(f"Forêt aplatie : {engine.n_trees} arbres, {engine.node_count} nœuds, profondeur max {engine.max_depth}")
+    ok = check_parity(classifier, X)
+    compare_throughput(classifier, X, args.min_time)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Profil des temps d'import au démarrage (python -X importtime), agrégé par paquet.
+
+Usage : python -m src.benchmarks.import_profile [module ...]
+        (défaut : src.main, chemin de démarrage du serveur, et src.prediction_service,
+        importé en arrière-plan avec le modèle)
+"""
+
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ('src.main', 'src.prediction_service')
+TOP = 12
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    # Chaque ligne : "import time: self [us] | cumulative | module", indentée selon la profondeur
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def by_package(times: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    packages = defaultdict(int)
+    for name, self_us, _ in times:
+        packages[name.split('.')[0]] += self_us
+    return packages
+
+
+def report(module: str):
+    times = import_times(module)
+    if not times:
+        print(f"{module}: aucun import mesuré")
+        return
+    total_us = sum(self_us for _, self_us, _ in times)
+    print(f"\n=== import {module} : {total_us / 1000:.0f} ms, {len(times)} modules ===")
+    print(f"{'paquet':<28}{'ms':>10}{'part':>8}")
+    packages = sorted(by_package(times).items(), key=lambda item: item[1], reverse=True)
+    for package, self_us in packages[:TOP]:
+        print(f"{package:<28}{self_us / 1000:>10.1f}{self_us / total_us:>8.0%}")
+
+
+def main():
+    for module in sys.argv[1:] or DEFAULT_MODULES:
+        report(module)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Suite de benchmarks du chemin de prédiction, sur des lignes réelles tirées de loan_data.csv :
+latence de CreditRiskPredictor.predict (p50/p95/p99), débit de predict_batch selon la
+taille du lot, temps de chargement des modèles (pickle et artefact) et latence de bout en bout de
+/api/v1/predict via le client de test Flask.
+
+Les résultats sont écrits en JSON et comparés à une référence : toute métrique dégradée
+au-delà de la tolérance est signalée (code de sortie 1).
+
+Usage : python -m src.benchmarks.suite [--output results.json] [--baseline src/benchmarks/baseline.json]
+        python -m src.benchmarks.suite --save-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS = ('credit_risk_pipeline.pkl', 'best_credit_risk_model.pkl')
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+PERCENTILES = (50, 95, 99)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def _latency_stats(samples_s: List[float]) -> Dict[str, float]:
+    samples_ms = np.asarray(samples_s) * 1000
+    stats = {f'p{p}': round(float(np.percentile(samples_ms, p)), 4) for p in PERCENTILES}
+    stats['mean'] = round(float(samples_ms.mean()), 4)
+    return stats
+
+
+def sample_records(predictor, data_path: str, n: int, seed: int) -> List[Dict[str, Any]]:
+    # Seules les lignes acceptées par la validation mesurent le chemin de scoring complet ;
+    # leurs modalités sont normalisées (p. ex. 'female' -> 'Female') comme le fait l'endpoint batch
+    df = pd.read_csv(data_path)[predictor.feature_names]
+    normalized, valid_mask, _ = predictor.validate_batch(df)
+    valid = normalized[valid_mask]
+    sample = valid.sample(n=min(n, len(valid)), random_state=seed, replace=n > len(valid))
+    return json.loads(sample.to_json(orient='records'))
+
+
+def bench_predict(predictor, records: List[Dict[str, Any]], iterations: int) -> Dict[str, float]:
+    for record in records[:50]:
+        predictor.predict(record)
+    samples = []
+    for i in range(iterations):
+        record = records[i % len(records)]
+        start = time.perf_counter()
+        predictor.predict(record)
+        samples.append(time.perf_counter() - start)
+    return _latency_stats(samples)
+
+
+def bench_batch(predictor, records: List[Dict[str, Any]], min_time: float) -> Dict[str, float]:
+    # Lignes répétées au-delà de l'échantillon : chaque lot compte exactement batch_size lignes
+    pool = records * (max(BATCH_SIZES) // len(records) + 2)
+    rates = {}
+    for batch_size in BATCH_SIZES:
+        calls, rows, start = 0, 0, time.perf_counter()
+        while time.perf_counter() - start < min_time or calls < 3:
+            offset = (calls * batch_size) % len(records)
+            batch = pool[offset:offset + batch_size]
+            predictor.predict_batch(batch)
+            calls += 1
+            rows += len(batch)
+        rates[f'batch_{batch_size}'] = round(rows / (time.perf_counter() - start), 1)
+    return rates
+
+
+def bench_model_load(repeat: int) -> Dict[str, Dict[str, float]]:
+    import joblib
+    import tempfile
+    from src.model_artifact import export_artifact
+    from src.prediction_service import CreditRiskPredictor
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for model in MODELS:
+            path = os.path.join(SRC_DIR, 'models', model)
+            artifact = export_artifact(path, os.path.join(directory, model + '.artifact'))
+            unpickle, load, artifact_load = [], [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                joblib.load(path)
+                unpickle.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                CreditRiskPredictor(pipeline_path=path)
+                load.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                CreditRiskPredictor(pipeline_path=artifact)
+                artifact_load.append(time.perf_counter() - start)
+            results[model] = {'unpickle_s': round(min(unpickle), 4), 'load_model_s': round(min(load), 4),
+                              'artifact_load_s': round(min(artifact_load), 4)}
+    return results
+
+
+def bench_http(records: List[Dict[str, Any]], iterations: int) -> Dict[str, float]:
+    from src.main import app
+    from src.model_loader import model_loader
+    model_loader.wait()
+    client = app.test_client()
+    for record in records[:50]:
+        client.post('/api/v1/predict', json=record)
+    samples = []
+    for i in range(iterations):
+        record = records[i % len(records)]
+        start = time.perf_counter()
+        response = client.post('/api/v1/predict', json=record)
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/v1/predict a répondu {response.status_code}: {response.get_json()}")
+    return _latency_stats(samples)
+
+
+def run(args) -> Dict[str, Any]:
+    from src.prediction_service import CreditRiskPredictor
+    import sklearn
+
+    predictor = CreditRiskPredictor()
+    records = sample_records(predictor, args.data, args.rows, args.seed)
+    print(f"{len(records)} lignes valides tirées de {os.path.basename(args.data)} (graine {args.seed})")
+
+    metrics = {
+        'predict_latency_ms': bench_predict(predictor, records, args.iterations),
+        'batch_rows_per_s': bench_batch(predictor, records, args.min_time),
+        'model_load': bench_model_load(args.repeat),
+        'http_predict_latency_ms': bench_http(records, args.iterations),
+    }
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'scikit_learn': sklearn.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'prediction_engine': predictor.engine,
+            'feature_encoder': 'compiled' if predictor.encoder is not None else 'pipeline',
+        },
+        'metrics': metrics
+    }
+
+
+def _flatten(metrics: Dict[str, Any], prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in metrics.items():
+        name = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        else:
+            flat[name] = value
+    return flat
+
+
+def _format(value: float) -> str:
+    return f"{value:,.0f}" if abs(value) >= 1000 else f"{value:.4g}"
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    # Débits : plus haut est meilleur ; latences et temps de chargement : plus bas est meilleur
+    current, reference = _flatten(results['metrics']), _flatten(baseline['metrics'])
+    regressions = []
+    print(f"\n{'métrique':<60}{'référence':>12}{'actuel':>12}{'écart':>9}")
+    for name, value in current.items():
+        if name not in reference or not reference[name]:
+            continue
+        higher_is_better = 'rows_per_s' in name
+        change = (value - reference[name]) / reference[name]
+        regressed = (-change if higher_is_better else change) > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<60}{_format(reference[name]):>12}{_format(value):>12}{change:>+9.1%}{'  ❌' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=os.path.join(SRC_DIR, 'loan_data.csv'))
+    parser.add_argument('--rows', type=int, default=10000, help='Lignes tirées de loan_data.csv')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=2000, help='Appels mesurés pour les latences')
+    parser.add_argument('--min-time', type=float, default=1.0, help='Durée minimale par taille de lot (s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Chargements par modèle (meilleur temps retenu)')
+    parser.add_argument('--output', help='Fichier JSON des résultats')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Référence à comparer')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Dégradation relative tolérée')
+    parser.add_argument('--save-baseline', action='store_true', help='Enregistrer les résultats comme référence')
+    args = parser.parse_args()
+
+    # Le cache partagé servirait les requêtes répétées sans passer par le modèle
+    os.environ['PREDICTION_CACHE_ENABLED'] = '0'
+    results = run(args)
+    print(json.dumps(results['metrics'], indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nRéférence enregistrée dans {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nAucune référence ({args.baseline}) : relancer avec --save-baseline")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('environment', {}).get('prediction_engine') != results['environment']['prediction_engine']:
+        print(f"⚠️  Référence mesurée avec le moteur {baseline['environment'].get('prediction_engine')}")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} régression(s) au-delà de {args.tolerance:.0%} : {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\n✅ Aucune régression au-delà de {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Vérifie sur des demandeurs de loan_data.csv que l'analyse what-if rend exactement les
+prédictions de /predict : le demandeur tel que soumis (base_prediction) et chaque point de
+la grille, pour des balayages entiers, décimaux, catégoriels et à deux variables.
+
+Usage : python -m src.benchmarks.what_if [--rows 200]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.input_validation import validate_frame
+from src.prediction_service import CreditRiskPredictor
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SWEEPS = {
+    'entier': [{'field': 'loan_int_rate', 'start': 5, 'stop': 25, 'step': 5}],
+    'décimal': [{'field': 'loan_amnt', 'start': 1000.5, 'stop': 30000.5, 'step': 2500}],
+    'catégoriel': [{'field': 'loan_intent'}],
+    'deux variables': [{'field': 'credit_score', 'start': 500, 'stop': 800, 'step': 100},
+                       {'field': 'person_income', 'values': [20000, 60000, 120000]}],
+}
+
+
+def _plain(record):
+    return {field: value.item() if isinstance(value, np.generic) else value for field, value in record.items()}
+
+
+def check(predictor: CreditRiskPredictor, records) -> bool:
+    passed = True
+    for name, sweeps in SWEEPS.items():
+        base_mismatches = point_mismatches = points = 0
+        for data in records:
+            result = predictor.what_if(data, sweeps)
+            if result['status'] != 'success':
+                print(f"❌ {name} : {result}")
+                return False
+            if result['base_prediction'] != predictor.predict(data)['prediction']:
+                base_mismatches += 1
+            sweep = result['sweep']
+            grids = np.meshgrid(*[sweep['values'][field] for field in sweep['fields']], indexing='ij')
+            expected = [{**data, **{field: grid.ravel()[i].item() for field, grid in zip(sweep['fields'], grids)}}
+                        for i in range(sweep['points'])]
+            for point in expected:
+                if 'loan_amnt' in sweep['fields'] or 'person_income' in sweep['fields']:
+                    # Même dérivation que build_grid (np.round : 0.075 -> 0.08)
+                    point['loan_percent_income'] = float(np.round(point['loan_amnt'] / point['person_income'], 2))
+            scores = np.ravel(sweep['probability_score'])
+            batch = predictor.predict_batch(expected)['results']
+            point_mismatches += sum(r['prediction']['probability_score'] != s for r, s in zip(batch, scores))
+            points += len(expected)
+        ok = base_mismatches == 0 and point_mismatches == 0
+        passed &= ok
+        print(f"{'✅' if ok else '❌'} {name} : base_prediction différente de /predict pour {base_mismatches} "
+              f"demandeurs sur {len(records)}, {point_mismatches} points différents sur {points}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(SRC_DIR, 'models', 'credit_risk_pipeline.pkl'))
+    parser.add_argument('--data', default=os.path.join(SRC_DIR, 'loan_data.csv'))
+    parser.add_argument('--rows', type=int, default=200)
+    args = parser.parse_args()
+
+    # Sans cache : chaque prédiction de référence est recalculée
+    os.environ['PREDICTION_CACHE_ENABLED'] = '0'
+    predictor = CreditRiskPredictor(args.model)
+    df, valid_mask, _ = validate_frame(pd.read_csv(args.data), predictor.feature_names)
+    records = [_plain(record) for record in df[valid_mask].head(args.rows).to_dict('records')]
+    sys.exit(0 if check(predictor, records) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Rapport mémoire des workers Gunicorn : RSS, PSS et part partagée / privée de chaque
+processus enfant du maître, avec les totaux.
+
+Usage : python -m src.benchmarks.worker_memory <pid du maître gunicorn>
+        python -m src.benchmarks.worker_memory   (compare preload et mmap sur ce processus)
+"""
+
+import os
+import sys
+from typing import Dict, Any, List
+
+from src.process_memory import memory_usage, child_pids
+
+COLUMNS = ('rss_mb', 'pss_mb', 'shared_mb', 'private_mb')
+
+
+def report(master_pid: int) -> List[Dict[str, Any]]:
+    rows = [dict(memory_usage(master_pid), role='master')]
+    rows += [dict(memory_usage(pid), role='worker') for pid in child_pids(master_pid)]
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]]):
+    print(f"{'rôle':<8}{'pid':>8}" + ''.join(f"{c:>13}" for c in COLUMNS))
+    for row in rows:
+        print(f"{row['role']:<8}{row['pid']:>8}" + ''.join(f"{row.get(c, '-'):>13}" for c in COLUMNS))
+    workers = [row for row in rows if row['role'] == 'worker']
+    if workers:
+        # PSS répartit les pages partagées entre processus : sa somme est l'empreinte réelle
+        total_pss = sum(row.get('pss_mb', 0) for row in rows)
+        mean_private = sum(row.get('private_mb', 0) for row in workers) / len(workers)
+        print(f"\n{len(workers)} workers, empreinte totale (PSS) {total_pss:.1f} Mo, "
+              f"coût marginal d'un worker (privé moyen) {mean_private:.1f} Mo")
+
+
+def main():
+    if len(sys.argv) > 1:
+        print_report(report(int(sys.argv[1])))
+        return
+
+    # Sans pid : mesure d'un processus qui charge le modèle seul
+    from src.prediction_service import CreditRiskPredictor
+    before = memory_usage()
+    predictor = CreditRiskPredictor(engine=os.environ.get('PREDICTION_ENGINE', 'compiled'))
+    after = memory_usage()
+    print(f"Modèle chargé (moteur {predictor.engine}, MODEL_MMAP_DIR={predictor.mmap_dir or '-'})")
+    for column in COLUMNS:
+        if column in after:
+            print(f"  {column:<12}{before.get(column, 0):>10} -> {after[column]:>10}")
+
+
+if __name__ == '__main__':
+    main()
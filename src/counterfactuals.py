@@ -0,0 +1,252 @@
+"""
+Recherche contrefactuelle : plus petit changement du montant, du taux ou du ratio
+prêt/revenu qui fait passer un demandeur en « Faible risque ».
+
+La forêt ne réagit à une variable qu'en franchissant l'un de ses seuils de décision : les
+valeurs candidates sont les points de franchissement de ses seuils (arrondis à la précision
+de la variable, tous les proches et de plus en plus espacés en s'éloignant), filtrés par les
+mêmes règles métier que validate_input (ratio prêt/revenu au plus MAX_PERCENT_INCOME). Les
+combinaisons sont triées par coût croissant (somme des écarts en écarts-types du
+StandardScaler, ratio recalculé compris quand il suit le montant) et scorées par lots, un
+appel au modèle par itération : la première combinaison qui change la décision est la moins
+coûteuse de l'espace des candidats. Les combinaisons sont construites par tranches de coût, à la demande, et la
+recherche s'arrête au budget de temps en le signalant.
+"""
+
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from src.input_validation import NUMERIC_RULES
+from src.what_if import PERCENT_INCOME
+
+ACTIONABLE_FIELDS = ('loan_amnt', 'loan_int_rate', PERCENT_INCOME)
+# Précision des valeurs proposées (décimales), comme dans loan_data.csv
+FIELD_DECIMALS = {'loan_amnt': 0, 'loan_int_rate': 2, PERCENT_INCOME: 2}
+# Ratio prêt/revenu maximal proposé (borne du curseur du tableau de bord) : au-delà, le prêt
+# dépasse le revenu annuel
+MAX_PERCENT_INCOME = 1.0
+TARGET_CLASS = 0
+
+TIME_BUDGET_MS = float(os.environ.get('COUNTERFACTUAL_TIME_BUDGET_MS', 250))
+MAX_TIME_BUDGET_MS = float(os.environ.get('COUNTERFACTUAL_MAX_TIME_BUDGET_MS', 2000))
+# Points de franchissement retenus par variable et lignes par appel au modèle. La taille d'un lot
+# est déduite de la durée mesurée du précédent (par modèle, d'une recherche à l'autre) ; sans
+# mesure, le premier lot est réduit (un appel coûte ~6 ms fixes, ~9 ms pour 1 024 lignes).
+CANDIDATES_PER_FIELD = 96
+FIRST_BATCH_ROWS = 1024
+BATCH_ROWS = 4096
+
+# Dernière mesure (lignes, secondes) d'un lot, par empreinte de modèle
+_batch_timings: Dict[str, Tuple[int, float]] = {}
+
+
+def parse_options(fields: Any, time_budget_ms: Any) -> Tuple[List[str], float, Dict[str, Any]]:
+    # Variables modifiables demandées (toutes par défaut) et budget de temps plafonné
+    errors = {}
+    if fields is None:
+        fields = list(ACTIONABLE_FIELDS)
+    elif not isinstance(fields, list) or not fields or any(field not in ACTIONABLE_FIELDS for field in fields):
+        errors['fields'] = f"Liste non vide attendue parmi {', '.join(ACTIONABLE_FIELDS)}"
+    else:
+        fields = list(dict.fromkeys(fields))
+    if time_budget_ms is None:
+        time_budget_ms = TIME_BUDGET_MS
+    elif not isinstance(time_budget_ms, (int, float)) or isinstance(time_budget_ms, bool) or time_budget_ms <= 0:
+        errors['time_budget_ms'] = "Le budget de temps doit être un nombre positif (ms)"
+    budget = min(float(time_budget_ms), MAX_TIME_BUDGET_MS) if not errors else 0.0
+    return fields, budget, errors
+
+
+def _crossings(thresholds: np.ndarray, current: float, decimals: int) -> np.ndarray:
+    # Valeur arrondie qui franchit chaque seuil en s'éloignant de la valeur actuelle :
+    # x <= seuil part à gauche, donc vers le haut il faut dépasser strictement le seuil
+    unit = 10.0 ** -decimals
+    below = thresholds[thresholds < current]
+    above = thresholds[thresholds >= current]
+    up = np.ceil(above / unit) * unit
+    up = np.where(up <= above, up + unit, up)
+    return np.round(np.concatenate([np.floor(below / unit) * unit, up]), decimals)
+
+
+def candidate_values(model, data: Dict[str, Any], field: str, linked: bool,
+                     limit: int = CANDIDATES_PER_FIELD) -> Tuple[np.ndarray, np.ndarray]:
+    # Valeurs candidates d'une variable, de la moins à la plus coûteuse, et leur coût. Avec
+    # linked, le ratio recalculé d'un montant candidat est borné et son écart compte dans le coût
+    current = float(data[field])
+    decimals = FIELD_DECIMALS[field]
+    values = _crossings(model.split_thresholds(field), current, decimals)
+    if field == 'loan_amnt' and linked:
+        # Le ratio suit le montant : ses seuils deviennent aussi des montants candidats
+        ratios = _crossings(model.split_thresholds(PERCENT_INCOME), float(data[PERCENT_INCOME]),
+                            FIELD_DECIMALS[PERCENT_INCOME])
+        values = np.concatenate([values, np.round(ratios * float(data['person_income']), decimals)])
+    values = values[values > 0]
+    if field in NUMERIC_RULES:
+        rule, _ = NUMERIC_RULES[field]
+        values = values[rule(values)]
+    if field == PERCENT_INCOME:
+        values = values[values <= MAX_PERCENT_INCOME]
+    values = np.unique(values[values != current])
+    _, _, scale = model.encoder.numeric_parameters(field)
+    costs = np.abs(values - current) / scale
+    if field == 'loan_amnt' and linked:
+        ratios = derived_percent_income(values, data)
+        allowed = ratios <= MAX_PERCENT_INCOME
+        values, ratios, costs = values[allowed], ratios[allowed], costs[allowed]
+        _, _, ratio_scale = model.encoder.numeric_parameters(PERCENT_INCOME)
+        costs = costs + np.abs(ratios - float(data[PERCENT_INCOME])) / ratio_scale
+    order = np.argsort(costs, kind='stable')
+    if len(values) > limit:
+        # Rangs espacés géométriquement : tous les franchissements proches, quelques lointains
+        order = order[np.unique(np.geomspace(1, len(values), limit).astype(np.int64)) - 1]
+    return values[order], costs[order]
+
+
+def derived_percent_income(amounts: np.ndarray, data: Dict[str, Any]) -> np.ndarray:
+    # Ratio recalculé pour des montants candidats, arrondi comme dans loan_data.csv
+    return np.round(amounts / float(data['person_income']), FIELD_DECIMALS[PERCENT_INCOME])
+
+
+class CombinationStream:
+    # Combinaisons (indices par variable, 0 = inchangée) modifiant au moins une variable, par coût
+    # croissant puis par indices, livrées par tranches de coût : seule la tranche demandée est
+    # construite et triée, l'espace complet (jusqu'à 97³ lignes) ne l'est jamais. Les coûts des
+    # premières variables sont combinés une fois ; ceux de la dernière, croissants, sont
+    # parcourus par recherche dichotomique.
+    def __init__(self, costs: List[np.ndarray]):
+        padded = [np.concatenate([[0.0], field_costs]) for field_costs in costs]
+        if len(padded) > 1:
+            self.head = np.indices([len(field) for field in padded[:-1]]).reshape(len(padded) - 1, -1).T
+        else:
+            self.head = np.zeros((1, 0), dtype=np.intp)
+        # Sommes dans l'ordre des variables, comme le coût d'une combinaison complète
+        self.head_costs = sum(field[self.head[:, i]] for i, field in enumerate(padded[:-1])) + np.zeros(len(self.head))
+        self.tail = padded[-1]
+        self.size = len(self.head) * len(self.tail) - 1
+        # Coût déjà livré (les coûts sont positifs ou nuls)
+        self.low = -1.0
+
+    def _threshold(self, rows: int) -> float:
+        # Coût maximal de la prochaine tranche : environ rows lignes (entre 3/4 et la totalité), et
+        # au moins le prochain coût, ex aequo compris
+        above = np.searchsorted(self.tail, self.low - self.head_costs, side='right')
+        count = lambda high: int((np.searchsorted(self.tail, high - self.head_costs, side='right') - above).sum())
+        low, high = self.low, float(self.head_costs.max() + self.tail[-1])
+        if count(high) <= rows:
+            return high
+        best = None
+        for _ in range(40):
+            middle = (low + high) / 2
+            counted = count(middle)
+            if counted <= rows:
+                low = best = middle
+                if counted >= rows * 3 // 4:
+                    break
+            else:
+                high = middle
+        if best is None or count(best) == 0:
+            # Prochain coût strictement supérieur à low (marge contre les arrondis de low - coût)
+            following = np.searchsorted(self.tail, self.low - self.head_costs + self._margin(self.low), side='right')
+            valid = following < len(self.tail)
+            best = float((self.head_costs[valid] + self.tail[following[valid]]).min())
+        return best
+
+    @staticmethod
+    def _margin(cost: float) -> float:
+        return 1e-9 * (1.0 + abs(cost))
+
+    def next(self, rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Tranche suivante (indices, coûts) d'au plus rows lignes hors ex aequo ; vide à la fin
+        end = float(self.head_costs.max() + self.tail[-1])
+        while self.low < end:
+            high = self._threshold(rows)
+            # Bornes élargies d'une marge puis filtrage sur les coûts exacts : les arrondis de
+            # low - coût et coût + valeur ne font ni perdre ni dupliquer une combinaison
+            start = np.searchsorted(self.tail, self.low - self.head_costs - self._margin(self.low), side='left')
+            stop = np.searchsorted(self.tail, high - self.head_costs + self._margin(high), side='right')
+            counts = np.maximum(stop - start, 0)
+            heads = np.repeat(np.arange(len(self.head)), counts)
+            tails = np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            totals = self.head_costs[heads] + self.tail[tails]
+            # La combinaison sans aucun changement (premières lignes de head et de tail) est exclue
+            keep = (totals > self.low) & (totals <= high) & ((heads != 0) | (tails != 0))
+            self.low = high
+            if keep.any():
+                indices = np.column_stack([self.head[heads[keep]], tails[keep]])
+                totals = totals[keep]
+                order = np.lexsort([indices[:, i] for i in range(indices.shape[1] - 1, -1, -1)] + [totals])
+                return indices[order], totals[order]
+        return np.empty((0, self.head.shape[1] + 1), dtype=np.intp), np.empty(0)
+
+
+def search_counterfactual(model, data: Dict[str, Any], fields: List[str], linked: bool, deadline: float,
+                          batch_rows: int = BATCH_ROWS) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    # Combinaison la moins coûteuse classée TARGET_CLASS (ou None) et statistiques de recherche ;
+    # stats['exhausted'] : tout l'espace a été scoré sans succès.
+    # L'échéance est vérifiée avant chaque étape, et un lot n'est généré et scoré que s'il tient
+    # dans le temps restant d'après la durée mesurée du précédent : sans mesure (première
+    # recherche du modèle), le premier lot de FIRST_BATCH_ROWS lignes peut dépasser le budget.
+    stats = {'candidates': 0, 'candidates_scored': 0, 'iterations': 0, 'exhausted': False}
+    options = []
+    for field in fields:
+        if time.perf_counter() > deadline:
+            return None, stats
+        options.append(candidate_values(model, data, field, linked))
+    combinations = CombinationStream([field_costs for _, field_costs in options])
+    stats['candidates'] = combinations.size
+
+    timing_key = getattr(model, 'model_hash', None)
+    previous = _batch_timings.get(timing_key)
+    while True:
+        started = time.perf_counter()
+        if started > deadline:
+            return None, stats
+        size = min(FIRST_BATCH_ROWS, batch_rows)
+        if previous is not None:
+            # Durée supposée proportionnelle au nombre de lignes. Un lot réduit pour tenir dans le
+            # reste du budget l'est de moitié en plus : le coût fixe d'un appel ne diminue pas
+            rows, duration = previous
+            remaining = deadline - started
+            size = batch_rows if duration <= 0 else int(rows * remaining / duration)
+            if duration > remaining:
+                size //= 2
+            size = min(size, batch_rows)
+            if size < rows // 4:
+                return None, stats
+        indices, costs = combinations.next(size)
+        if not len(indices):
+            stats['exhausted'] = True
+            return None, stats
+        columns = {
+            field: np.concatenate([[float(data[field])], values])[indices[:, i]]
+            for i, (field, (values, _)) in enumerate(zip(fields, options))
+        }
+        if linked:
+            ratio = derived_percent_income(columns['loan_amnt'], data)
+            columns[PERCENT_INCOME] = np.where(indices[:, fields.index('loan_amnt')] == 0, data[PERCENT_INCOME], ratio)
+        classes, probabilities = model.score_variants(data, columns)
+        stats['iterations'] += 1
+        stats['candidates_scored'] += len(indices)
+        hits = np.flatnonzero(classes == TARGET_CLASS)
+        if hits.size:
+            # Lot trié par coût : le premier succès est le changement le moins coûteux
+            i = hits[0]
+            return {
+                'values': {field: float(column[i]) for field, column in columns.items()},
+                'cost': float(costs[i]),
+                'prediction': classes[i],
+                'probability': probabilities[i]
+            }, stats
+        previous = (len(indices), time.perf_counter() - started)
+        if len(indices) >= min(FIRST_BATCH_ROWS, batch_rows):
+            # Les petites tranches (fin de l'espace) surestimeraient le coût par ligne
+            _batch_timings[timing_key] = previous
+
+
+def plain_value(field: str, value: float):
+    # Valeur renvoyée dans la réponse : montant entier, taux et ratio à 2 décimales
+    decimals = FIELD_DECIMALS[field]
+    return int(round(value)) if decimals == 0 else round(float(value), decimals)
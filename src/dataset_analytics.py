@@ -0,0 +1,217 @@
+"""
+Statistiques du dataset pour le tableau de bord Streamlit, calculées une fois par version
+des données.
+
+Les agrégats (répartition de la cible, taux de risque, moments croisés des variables
+numériques pour la matrice de corrélation, histogrammes pré-découpés) sont additifs :
+quand des lignes sont ajoutées à la fin de loan_data.csv, seules les nouvelles lignes sont
+lues et fusionnées. Ils sont persistés dans un petit .npz indexé par le chemin du CSV et
+validés par la taille, la date de modification et une empreinte des premiers et derniers
+octets couverts : une vérification ne lit jamais tout le fichier. L'interface ne reçoit que
+des tableaux de quelques centaines de valeurs, quelle que soit la taille du dataset.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get('ANALYTICS_CACHE_DIR', '/tmp/credit_risk_analytics')
+
+TARGET = 'loan_status'
+NUMERIC_COLUMNS = ['person_age', 'person_income', 'person_emp_exp', 'loan_amnt', 'loan_int_rate',
+                   'loan_percent_income', 'cb_person_cred_hist_length', 'credit_score']
+HISTOGRAM_COLUMNS = ['person_income', 'person_age', 'loan_amnt']
+HISTOGRAM_BINS = 50
+CACHE_FORMAT = 2
+# Octets lus en tête et en fin de la partie couverte du CSV pour son empreinte
+FINGERPRINT_BYTES = 4096
+
+
+class DatasetAnalytics:
+    def __init__(self, columns: List[str], shift: np.ndarray, edges: Dict[str, np.ndarray]):
+        # shift : moyennes du premier lot, retranchées avant le calcul des moments croisés pour
+        # éviter la perte de précision (revenus ~1e5, carrés sommés sur des dizaines de milliers de lignes)
+        k = len(NUMERIC_COLUMNS)
+        self.columns = columns
+        self.shift = shift
+        self.edges = edges
+        self.rows = 0
+        self.target_counts = np.zeros(2, dtype=np.int64)
+        # Moments par paire de variables sur les lignes où les deux sont renseignées (comme DataFrame.corr)
+        self.pair_counts = np.zeros((k, k))
+        self.pair_sums = np.zeros((k, k))
+        self.pair_squares = np.zeros((k, k))
+        self.cross_products = np.zeros((k, k))
+        self.histograms = {column: np.zeros(len(edges[column]) - 1, dtype=np.int64) for column in edges}
+        # Octets du CSV couverts, date de modification et empreinte (SHA-256 de la tête et de la fin)
+        self.size = 0
+        self.mtime_ns = 0
+        self.fingerprint = ''
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: List[str]) -> 'DatasetAnalytics':
+        values = df[NUMERIC_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(NUMERIC_COLUMNS))
+        edges = {}
+        for column in HISTOGRAM_COLUMNS:
+            observed = values[:, NUMERIC_COLUMNS.index(column)]
+            observed = observed[~np.isnan(observed)]
+            edges[column] = np.histogram_bin_edges(observed if len(observed) else [0.0, 1.0], bins=HISTOGRAM_BINS)
+        analytics = cls(columns, shift, edges)
+        analytics.update(df, values)
+        return analytics
+
+    def update(self, df: pd.DataFrame, values: np.ndarray = None) -> bool:
+        # Ajoute des lignes aux agrégats ; False (agrégats inchangés) si une valeur sort des
+        # bornes des histogrammes, qu'il faut alors redécouper sur tout le dataset
+        if values is None:
+            values = df[NUMERIC_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        positions = [NUMERIC_COLUMNS.index(column) for column in self.edges]
+        for column, i in zip(self.edges, positions):
+            observed = values[:, i][~np.isnan(values[:, i])]
+            if len(observed) and (observed.min() < self.edges[column][0] or observed.max() > self.edges[column][-1]):
+                return False
+
+        target = pd.to_numeric(df[TARGET], errors='coerce').to_numpy()
+        self.target_counts += [int((target == 0).sum()), int((target == 1).sum())]
+        present = ~np.isnan(values)
+        centered = np.where(present, values - self.shift, 0.0)
+        mask = present.astype(np.float64)
+        self.pair_counts += mask.T @ mask
+        self.pair_sums += centered.T @ mask
+        self.pair_squares += (centered ** 2).T @ mask
+        self.cross_products += centered.T @ centered
+        for column, i in zip(self.edges, positions):
+            observed = values[:, i][present[:, i]]
+            self.histograms[column] += np.histogram(observed, bins=self.edges[column])[0]
+        self.rows += len(df)
+        return True
+
+    @property
+    def risk_rate(self) -> float:
+        total = self.target_counts.sum()
+        return float(self.target_counts[1] / total) if total else 0.0
+
+    def correlation(self) -> pd.DataFrame:
+        n, sums, squares = self.pair_counts, self.pair_sums, self.pair_squares
+        covariance = n * self.cross_products - sums * sums.T
+        variance = (n * squares - sums ** 2) * (n * squares.T - sums.T ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.clip(covariance / np.sqrt(variance), -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.diag(variance) > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=NUMERIC_COLUMNS, columns=NUMERIC_COLUMNS)
+
+    def histogram(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Centres des classes et effectifs, prêts pour un diagramme en barres
+        edges = self.edges[column]
+        return (edges[:-1] + edges[1:]) / 2, self.histograms[column]
+
+    def save(self, path: str):
+        arrays = {
+            'meta': np.frombuffer(json.dumps({
+                'format': CACHE_FORMAT, 'columns': self.columns, 'rows': int(self.rows),
+                'size': int(self.size), 'mtime_ns': int(self.mtime_ns), 'fingerprint': self.fingerprint,
+                'histogram_columns': list(self.edges)
+            }).encode(), dtype=np.uint8),
+            'shift': self.shift, 'target_counts': self.target_counts, 'pair_counts': self.pair_counts,
+            'pair_sums': self.pair_sums, 'pair_squares': self.pair_squares, 'cross_products': self.cross_products
+        }
+        for column in self.edges:
+            arrays[f'edges_{column}'] = self.edges[column]
+            arrays[f'counts_{column}'] = self.histograms[column]
+        # Écriture atomique : un autre processus Streamlit ne lit jamais un fichier partiel
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['DatasetAnalytics']:
+        try:
+            with np.load(path) as arrays:
+                meta = json.loads(arrays['meta'].tobytes().decode())
+                if meta['format'] != CACHE_FORMAT:
+                    return None
+                edges = {column: arrays[f'edges_{column}'] for column in meta['histogram_columns']}
+                analytics = cls(meta['columns'], arrays['shift'], edges)
+                for name in ('target_counts', 'pair_counts', 'pair_sums', 'pair_squares', 'cross_products'):
+                    setattr(analytics, name, arrays[name])
+                analytics.histograms = {column: arrays[f'counts_{column}'] for column in edges}
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Cache d'analyse illisible ({path}): {e}")
+            return None
+        analytics.rows, analytics.size = meta['rows'], meta['size']
+        analytics.mtime_ns, analytics.fingerprint = meta['mtime_ns'], meta['fingerprint']
+        return analytics
+
+
+def _cache_path(csv_path: str, cache_dir: str) -> str:
+    name = hashlib.sha256(os.path.abspath(csv_path).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f'analytics_{name}.npz')
+
+
+def _fingerprint(f, size: int) -> Tuple[str, bool]:
+    # Empreinte des FINGERPRINT_BYTES premiers et derniers octets de f[:size] (en-tête et
+    # dernières lignes), et fin de ligne complète en dernière position
+    f.seek(0)
+    head = f.read(min(FINGERPRINT_BYTES, size))
+    f.seek(max(0, size - FINGERPRINT_BYTES))
+    tail = f.read(size - f.tell())
+    return hashlib.sha256(head + tail).hexdigest(), tail.endswith(b'\n')
+
+
+def _full_build(csv_path: str, f, stat: os.stat_result) -> DatasetAnalytics:
+    content = f.read(stat.st_size)
+    df = pd.read_csv(io.BytesIO(content))
+    analytics = DatasetAnalytics.from_frame(df, list(df.columns))
+    analytics.size, analytics.mtime_ns = len(content), stat.st_mtime_ns
+    analytics.fingerprint = _fingerprint(f, len(content))[0]
+    logger.info(f"Statistiques calculées sur {analytics.rows} lignes ({csv_path})")
+    return analytics
+
+
+def load_analytics(csv_path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> DatasetAnalytics:
+    # Statistiques du CSV : cache si taille et date de modification n'ont pas changé, mise à
+    # jour incrémentale (lecture à partir de cached.size) si des lignes ont seulement été
+    # ajoutées à la fin, recalcul complet sinon
+    path = _cache_path(csv_path, cache_dir)
+    cached = DatasetAnalytics.load(path) if os.path.exists(path) else None
+    with open(csv_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if cached is not None and cached.size == stat.st_size and cached.mtime_ns == stat.st_mtime_ns:
+            return cached
+
+        analytics = None
+        if cached is not None and 0 < cached.size < stat.st_size:
+            fingerprint, complete = _fingerprint(f, cached.size)
+            if fingerprint == cached.fingerprint and complete:
+                f.seek(cached.size)
+                tail = f.read(stat.st_size - cached.size)
+                appended = (pd.read_csv(io.BytesIO(tail), header=None, names=cached.columns) if tail.strip()
+                            else pd.DataFrame(columns=cached.columns))
+                if cached.update(appended):
+                    cached.size, cached.mtime_ns = cached.size + len(tail), stat.st_mtime_ns
+                    cached.fingerprint = _fingerprint(f, cached.size)[0]
+                    analytics = cached
+                    logger.info(f"Statistiques mises à jour avec {len(appended)} lignes ajoutées ({csv_path})")
+
+        if analytics is None:
+            f.seek(0)
+            analytics = _full_build(csv_path, f, stat)
+    try:
+        analytics.save(path)
+    except OSError as e:
+        logger.warning(f"Cache d'analyse non écrit ({path}): {e}")
+    return analytics
@@ -0,0 +1,226 @@
+"""
+Encodeur de features compilé : reproduit le ColumnTransformer du pipeline
+(StandardScaler + OneHotEncoder) directement en NumPy, sans pandas.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+logger = logging.getLogger(__name__)
+
+
+def _unwrap(transformer):
+    # Le workflow notebook enveloppe chaque transformeur dans un Pipeline à une étape
+    while isinstance(transformer, Pipeline):
+        if len(transformer.steps) != 1:
+            raise ValueError(f"Pipeline imbriqué non supporté: {transformer}")
+        transformer = transformer.steps[0][1]
+    return transformer
+
+
+class CompiledFeatureEncoder:
+    def __init__(self, preprocessor, feature_names: List[str]):
+        self.feature_names = list(feature_names)
+        input_names = list(getattr(preprocessor, 'feature_names_in_', self.feature_names))
+
+        numeric_features, numeric_positions, means, scales = [], [], [], []
+        categorical_features, categorical_lookups, categorical_errors = [], [], []
+        position = 0
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            columns = [input_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            transformer = _unwrap(transformer)
+
+            if transformer == 'passthrough':
+                numeric_features.extend(columns)
+                numeric_positions.extend(range(position, position + len(columns)))
+                means.extend([0.0] * len(columns))
+                scales.extend([1.0] * len(columns))
+                position += len(columns)
+            elif isinstance(transformer, StandardScaler):
+                n = len(columns)
+                numeric_features.extend(columns)
+                numeric_positions.extend(range(position, position + n))
+                means.extend(transformer.mean_ if transformer.mean_ is not None and transformer.with_mean else np.zeros(n))
+                scales.extend(transformer.scale_ if transformer.scale_ is not None and transformer.with_std else np.ones(n))
+                position += n
+            elif isinstance(transformer, OneHotEncoder):
+                if getattr(transformer, 'infrequent_categories_', None) is not None and any(
+                        c is not None for c in transformer.infrequent_categories_):
+                    raise ValueError("Catégories peu fréquentes non supportées par l'encodeur compilé")
+                drop_idx = transformer.drop_idx_
+                for i, (column, categories) in enumerate(zip(columns, transformer.categories_)):
+                    dropped = None if drop_idx is None else drop_idx[i]
+                    lookup = {}
+                    for j, category in enumerate(categories):
+                        if dropped is not None and j == dropped:
+                            lookup[category] = -1
+                        else:
+                            lookup[category] = position
+                            position += 1
+                    categorical_features.append(column)
+                    categorical_lookups.append(lookup)
+                    categorical_errors.append(transformer.handle_unknown == 'error')
+            else:
+                raise ValueError(f"Transformeur non supporté par l'encodeur compilé: {type(transformer).__name__}")
+
+        self.n_features_out = position
+        self._numeric_features = numeric_features
+        self._numeric_positions = np.asarray(numeric_positions, dtype=np.intp)
+        self._means = np.asarray(means, dtype=np.float64)
+        self._scales = np.asarray(scales, dtype=np.float64)
+        self._categorical = list(zip(categorical_features, categorical_lookups, categorical_errors))
+
+    @classmethod
+    def from_pipeline(cls, pipeline, feature_names: List[str]) -> Optional['CompiledFeatureEncoder']:
+        steps = getattr(pipeline, 'named_steps', {})
+        if 'preprocessor' not in steps:
+            return None
+        try:
+            return cls(steps['preprocessor'], feature_names)
+        except Exception as e:
+            logger.warning(f"Encodeur compilé indisponible, utilisation du ColumnTransformer: {str(e)}")
+            return None
+
+    def save(self, directory: str):
+        # Paramètres du scaler et tables de catégories en tableaux NumPy (sans pickle) ;
+        # la structure (ordre des colonnes, modes stricts) dans encoder.json
+        os.makedirs(directory, exist_ok=True)
+        categories, columns, layout = [], [], []
+        for feature, lookup, strict in self._categorical:
+            if not all(isinstance(category, str) for category in lookup):
+                raise ValueError(f"Catégories non textuelles pour {feature}: export impossible")
+            layout.append({'feature': feature, 'start': len(categories), 'stop': len(categories) + len(lookup),
+                           'strict': strict})
+            categories.extend(lookup)
+            columns.extend(lookup.values())
+        arrays = {
+            'numeric_positions': self._numeric_positions,
+            'means': self._means,
+            'scales': self._scales,
+            'category_values': np.asarray(categories, dtype=str),
+            'category_columns': np.asarray(columns, dtype=np.intp)
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f'{name}.npy'), array)
+        with open(os.path.join(directory, 'encoder.json'), 'w') as f:
+            json.dump({
+                'feature_names': self.feature_names,
+                'n_features_out': self.n_features_out,
+                'numeric_features': self._numeric_features,
+                'categorical': layout
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str) -> 'CompiledFeatureEncoder':
+        with open(os.path.join(directory, 'encoder.json')) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'))
+                  for name in ('numeric_positions', 'means', 'scales', 'category_values', 'category_columns')}
+        encoder = cls.__new__(cls)
+        encoder.feature_names = meta['feature_names']
+        encoder.n_features_out = meta['n_features_out']
+        encoder._numeric_features = meta['numeric_features']
+        encoder._numeric_positions = arrays['numeric_positions']
+        encoder._means = arrays['means']
+        encoder._scales = arrays['scales']
+        encoder._categorical = [
+            (item['feature'],
+             dict(zip(arrays['category_values'][item['start']:item['stop']].tolist(),
+                      arrays['category_columns'][item['start']:item['stop']].tolist())),
+             item['strict'])
+            for item in meta['categorical']
+        ]
+        return encoder
+
+    def numeric_parameters(self, field: str) -> Tuple[int, float, float]:
+        # Colonne produite, moyenne et échelle du StandardScaler pour une variable numérique
+        i = self._numeric_features.index(field)
+        return int(self._numeric_positions[i]), float(self._means[i]), float(self._scales[i])
+
+    def column_features(self) -> List[str]:
+        # Feature d'origine de chaque colonne produite (plusieurs colonnes one-hot par catégorielle)
+        owners = [None] * self.n_features_out
+        for feature, position in zip(self._numeric_features, self._numeric_positions):
+            owners[position] = feature
+        for feature, lookup, _ in self._categorical:
+            for column in lookup.values():
+                if column >= 0:
+                    owners[column] = feature
+        return owners
+
+    def _unknown(self, feature: str, value: Any):
+        raise ValueError(f"Catégorie inconnue pour {feature}: {value!r}")
+
+    def transform_record(self, data: Dict[str, Any]) -> np.ndarray:
+        row = np.zeros((1, self.n_features_out), dtype=np.float64)
+        values = np.fromiter((data[f] for f in self._numeric_features), dtype=np.float64,
+                             count=len(self._numeric_features))
+        row[0, self._numeric_positions] = (values - self._means) / self._scales
+        for feature, lookup, strict in self._categorical:
+            column = lookup.get(data[feature])
+            if column is None:
+                if strict:
+                    self._unknown(feature, data[feature])
+            elif column >= 0:
+                row[0, column] = 1.0
+        return row
+
+    def transform_records(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        if len(records) == 1:
+            return self.transform_record(records[0])
+        n = len(records)
+        out = np.zeros((n, self.n_features_out), dtype=np.float64)
+        numeric = np.array([[r[f] for f in self._numeric_features] for r in records], dtype=np.float64)
+        out[:, self._numeric_positions] = (numeric - self._means) / self._scales
+        rows = np.arange(n)
+        for feature, lookup, strict in self._categorical:
+            columns = np.fromiter((lookup.get(r[feature], -2) for r in records), dtype=np.intp, count=n)
+            if strict and (columns == -2).any():
+                self._unknown(feature, records[int(np.argmax(columns == -2))][feature])
+            hit = columns >= 0
+            out[rows[hit], columns[hit]] = 1.0
+        return out
+
+    def transform_variants(self, base: Dict[str, Any], columns: Dict[str, np.ndarray]) -> np.ndarray:
+        # Variantes d'un même demandeur : la ligne de base est encodée une fois puis répétée,
+        # seules les colonnes des champs modifiés sont réécrites (une valeur par variante)
+        n = len(next(iter(columns.values())))
+        out = np.repeat(self.transform_record(base), n, axis=0)
+        for field, values in columns.items():
+            if field in self._numeric_features:
+                i = self._numeric_features.index(field)
+                out[:, self._numeric_positions[i]] = (np.asarray(values, dtype=np.float64) - self._means[i]) / self._scales[i]
+                continue
+            feature, lookup, strict = next(item for item in self._categorical if item[0] == field)
+            positions = [column for column in lookup.values() if column >= 0]
+            out[:, positions] = 0.0
+            targets = np.fromiter((lookup.get(v, -2) for v in values), dtype=np.intp, count=n)
+            if strict and (targets == -2).any():
+                self._unknown(feature, values[int(np.argmax(targets == -2))])
+            hit = targets >= 0
+            out[np.flatnonzero(hit), targets[hit]] = 1.0
+        return out
+
+    def transform_frame(self, df: pd.DataFrame) -> np.ndarray:
+        n = len(df)
+        out = np.zeros((n, self.n_features_out), dtype=np.float64)
+        numeric = df[self._numeric_features].to_numpy(dtype=np.float64)
+        out[:, self._numeric_positions] = (numeric - self._means) / self._scales
+        rows = np.arange(n)
+        for feature, lookup, strict in self._categorical:
+            columns = df[feature].map(lookup).fillna(-2).to_numpy(dtype=np.intp)
+            if strict and (columns == -2).any():
+                self._unknown(feature, df[feature].iloc[int(np.argmax(columns == -2))])
+            hit = columns >= 0
+            out[rows[hit], columns[hit]] = 1.0
+        return out
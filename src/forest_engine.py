@@ -0,0 +1,191 @@
+"""
+Moteur d'inférence compilé pour les forêts d'arbres de décision sklearn.
+
+Tous les arbres sont aplatis une seule fois au chargement dans des tableaux contigus
+(feature, seuil, enfant gauche/droit, valeur de feuille) puis parcourus niveau par
+niveau pour tout un lot, sans la boucle Python par estimateur de sklearn.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Taille des tranches de lignes parcourues ensemble : borne la mémoire à
+# CHUNK_ROWS x n_arbres indices de nœuds.
+CHUNK_ROWS = 4096
+
+# Tableaux persistés par save() et projetés en mémoire par load()
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'children', 'is_leaf', 'value', 'roots')
+
+# Au-delà de ce nombre de lignes, le parcours NumPy (coût ~ lignes x arbres x profondeur)
+# devient plus lent que le Tree.apply natif de sklearn appelé arbre par arbre : on bascule
+# alors sur ce dernier quand les arbres d'origine sont disponibles.
+NATIVE_APPLY_MIN_ROWS = 32
+
+
+class CompiledForest:
+    def __init__(self, forest, dtype=np.float64):
+        estimators = getattr(forest, 'estimators_', None)
+        if not estimators or not all(hasattr(e, 'tree_') for e in estimators):
+            raise ValueError(f"Modèle non supporté par le moteur compilé: {type(forest).__name__}")
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Les forêts multi-sorties ne sont pas supportées")
+
+        self.dtype = np.dtype(dtype)
+        self.classes_ = forest.classes_
+        self.n_trees = len(estimators)
+        self.n_features = forest.n_features_in_
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count) + offset
+            # Les feuilles bouclent sur elles-mêmes : le parcours peut continuer sans branchement
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            values.append(value / np.where(totals == 0, 1.0, totals))
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.node_count = offset
+        self.max_depth = max_depth
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.threshold = self._cast_thresholds(np.concatenate(thresholds))
+        self.left = np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp)
+        self.right = np.ascontiguousarray(np.concatenate(rights), dtype=np.intp)
+        # children[2 * nœud + (x > seuil)] donne le nœud suivant en une seule indexation
+        self.children = np.ascontiguousarray(np.stack([self.left, self.right], axis=1).ravel())
+        self.is_leaf = self.left == np.arange(self.node_count)
+        # Stockage classe par classe (n_classes, n_nœuds) : np.take sur une ligne contiguë
+        # est bien plus rapide que l'indexation d'un tableau (n_nœuds, n_classes).
+        self.value = np.ascontiguousarray(np.concatenate(values).T, dtype=self.dtype)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self._trees = [estimator.tree_ for estimator in estimators]
+
+    def _cast_thresholds(self, thresholds: np.ndarray) -> np.ndarray:
+        if self.dtype != np.float32:
+            return np.ascontiguousarray(thresholds, dtype=np.float64)
+        # x (float32) <= t (float64) équivaut à x <= plus grand float32 <= t :
+        # on arrondit vers le bas pour garder exactement les mêmes branches.
+        cast = thresholds.astype(np.float32)
+        too_high = cast.astype(np.float64) > thresholds
+        cast[too_high] = np.nextafter(cast[too_high], np.float32(-np.inf))
+        return np.ascontiguousarray(cast)
+
+    def save(self, directory: str):
+        # Écriture dans un répertoire temporaire puis renommage atomique : plusieurs workers
+        # peuvent exporter le même modèle en même temps sans jamais lire un export partiel.
+        if os.path.isdir(directory):
+            return
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix='.forest-')
+        try:
+            for name in ARRAY_NAMES:
+                np.save(os.path.join(staging, f'{name}.npy'), getattr(self, name))
+            with open(os.path.join(staging, 'forest.json'), 'w') as f:
+                json.dump({
+                    'dtype': self.dtype.name,
+                    'classes': self.classes_.tolist(),
+                    'n_trees': self.n_trees,
+                    'n_features': self.n_features,
+                    'node_count': self.node_count,
+                    'max_depth': self.max_depth
+                }, f)
+            os.rename(staging, directory)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(directory):
+                raise
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r', classifier=None) -> 'CompiledForest':
+        # Avec mmap_mode='r', les tableaux restent dans le cache de pages du noyau et sont
+        # partagés par tous les processus qui projettent le même fichier. classifier : forêt
+        # sklearn d'origine, dont les arbres servent au Tree.apply natif des gros lots.
+        with open(os.path.join(directory, 'forest.json')) as f:
+            meta = json.load(f)
+        forest = cls.__new__(cls)
+        forest.dtype = np.dtype(meta['dtype'])
+        forest.classes_ = np.asarray(meta['classes'])
+        forest.n_trees = meta['n_trees']
+        forest.n_features = meta['n_features']
+        forest.node_count = meta['node_count']
+        forest.max_depth = meta['max_depth']
+        for name in ARRAY_NAMES:
+            setattr(forest, name, np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode))
+        forest._trees = []
+        estimators = getattr(classifier, 'estimators_', None) or []
+        if estimators:
+            if len(estimators) != forest.n_trees or sum(e.tree_.node_count for e in estimators) != forest.node_count:
+                raise ValueError(f"Arbres sklearn incompatibles avec la forêt exportée dans {directory}")
+            forest._trees = [estimator.tree_ for estimator in estimators]
+        return forest
+
+    @classmethod
+    def from_classifier(cls, classifier, dtype=np.float64) -> Optional['CompiledForest']:
+        try:
+            return cls(classifier, dtype=dtype)
+        except Exception as e:
+            logger.warning(f"Moteur de forêt compilé indisponible: {str(e)}")
+            return None
+
+    def _prepare(self, X: np.ndarray) -> np.ndarray:
+        # sklearn évalue les arbres en float32 : on arrondit de la même façon pour
+        # retomber exactement sur les mêmes branches.
+        X = np.asarray(X).astype(np.float32)
+        return X if self.dtype == np.float32 else X.astype(np.float64)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        if self._trees and n >= NATIVE_APPLY_MIN_ROWS:
+            X32 = np.ascontiguousarray(X, dtype=np.float32)
+            return np.stack([tree.apply(X32) for tree in self._trees], axis=1) + self.roots
+        X = self._prepare(X)
+        leaves = np.empty((n, self.n_trees), dtype=np.intp)
+        for start in range(0, n, CHUNK_ROWS):
+            leaves[start:start + CHUNK_ROWS] = self._walk(X[start:start + CHUNK_ROWS])
+        return leaves
+
+    def _walk(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        flat = X.ravel()
+        leaves = np.repeat(self.roots[None, :], n, axis=0).ravel()
+        # Seules les paires (ligne, arbre) qui ne sont pas encore sur une feuille avancent
+        active = np.arange(n * self.n_trees, dtype=np.intp)
+        base = np.repeat(np.arange(n, dtype=np.intp) * self.n_features, self.n_trees)
+        nodes = leaves.copy()
+        for _ in range(self.max_depth):
+            go_right = flat[base + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right]
+            at_leaf = self.is_leaf[nodes]
+            if at_leaf.any():
+                leaves[active[at_leaf]] = nodes[at_leaf]
+                keep = ~at_leaf
+                active, base, nodes = active[keep], base[keep], nodes[keep]
+                if active.size == 0:
+                    break
+        return leaves.reshape(n, self.n_trees)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X)
+        return np.stack(
+            [np.take(class_value, leaves).sum(axis=1, dtype=np.float64) for class_value in self.value], axis=1
+        ) / self.n_trees
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
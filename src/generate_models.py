@@ -3,6 +3,7 @@ Script pour générer le pipeline complet de prédiction de risque de crédit
 """
 
 import os
+import sys
 import joblib
 import pandas as pd
 import numpy as np  # Import manquant
@@ -13,6 +14,13 @@ from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report, accuracy_score
 
+# Exécutable depuis la racine du dépôt (python src/generate_models.py)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.synthetic_data import risk_probability
+
 print("=== Génération du pipeline de prédiction de risque de crédit ===")
 print(f"Version de scikit-learn: {__import__('sklearn').__version__}")
 
@@ -39,42 +47,8 @@ data = {
 
 print("Génération des probabilités de risque...")
 
-# Génération de la variable cible avec logique métier
-risk_probabilities = []
-for i in range(1000):
-    base_risk = 0.3
-    
-    # Impact du score de crédit
-    if data['credit_score'][i] < 600:
-        base_risk += 0.3
-    elif data['credit_score'][i] < 700:
-        base_risk += 0.1
-    
-    # Impact du ratio revenu/prêt
-    if data['loan_percent_income'][i] > 0.5:
-        base_risk += 0.2
-    elif data['loan_percent_income'][i] > 0.3:
-        base_risk += 0.1
-    
-    # Impact des défauts précédents
-    if data['previous_loan_defaults_on_file'][i] == 'Yes':
-        base_risk += 0.4
-    
-    # Impact de l'âge
-    if data['person_age'][i] < 25:
-        base_risk += 0.1
-    
-    # Impact de l'expérience professionnelle
-    if data['person_emp_exp'][i] < 2:
-        base_risk += 0.15
-    
-    # Impact du taux d'intérêt (indicateur de risque)
-    if data['loan_int_rate'][i] > 15:
-        base_risk += 0.1
-    
-    # Limiter entre 5% et 95%
-    base_risk = min(max(base_risk, 0.05), 0.95)
-    risk_probabilities.append(base_risk)
+# Génération de la variable cible avec logique métier (règles vectorisées, cf. src/synthetic_data.py)
+risk_probabilities = risk_probability(data)
 
 # Génération de la variable cible binaire
 data['loan_status'] = np.random.binomial(1, risk_probabilities)
@@ -0,0 +1,132 @@
+"""
+Règles de validation des données d'entrée et validation vectorisée par colonne
+pour les lots (masques NumPy sur les numériques, codes catégoriels pour les modalités).
+"""
+
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Chaque règle s'applique aussi bien à un scalaire qu'à un tableau NumPy
+NUMERIC_RULES = {
+    'person_age': (lambda x: (18 <= x) & (x <= 100), "L'âge doit être entre 18 et 100 ans"),
+    'person_income': (lambda x: x > 0, "Le revenu doit être positif"),
+    'credit_score': (lambda x: (300 <= x) & (x <= 850), "Le score de crédit doit être entre 300 et 850"),
+    'loan_amnt': (lambda x: x > 0, "Le montant du prêt doit être positif"),
+    'loan_int_rate': (lambda x: (0 <= x) & (x <= 50), "Le taux d'intérêt doit être entre 0 et 50%"),
+}
+
+CATEGORICAL_VALUES = {
+    'person_gender': ['Male', 'Female'],
+    'person_education': ['High School', 'Bachelor', 'Master', 'Doctorate'],
+    'person_home_ownership': ['RENT', 'OWN', 'MORTGAGE', 'OTHER'],
+    'loan_intent': ['PERSONAL', 'EDUCATION', 'MEDICAL', 'VENTURE', 'HOMEIMPROVEMENT', 'DEBTCONSOLIDATION'],
+    'previous_loan_defaults_on_file': ['No', 'Yes']
+}
+
+# Variantes connues ramenées à la modalité attendue par le modèle (casse, espaces) :
+# loan_data.csv contient par exemple 'female'/'male'.
+CATEGORICAL_ALIASES = {
+    field: {value.casefold(): value for value in values}
+    for field, values in CATEGORICAL_VALUES.items()
+}
+
+NUMERIC_TYPE_ERROR = "Valeur numérique attendue"
+
+
+def categorical_error(field: str) -> str:
+    return f"Valeur invalide. Valeurs acceptées: {', '.join(CATEGORICAL_VALUES[field])}"
+
+
+def canonical_value(field: str, value: Any):
+    # Modalité attendue par le modèle pour une valeur reçue (None si inconnue), comme dans validate_frame
+    return CATEGORICAL_ALIASES[field].get(value.strip().casefold()) if isinstance(value, str) else None
+
+
+def coerce_numeric_text(df: pd.DataFrame, feature_names: List[str]) -> pd.DataFrame:
+    # Fichiers texte (CSV) : une seule cellule illisible fait lire toute la colonne en chaînes.
+    # Conversion cellule par cellule ; la cellule illisible reste une chaîne, et validate_frame
+    # ne rejette que sa ligne.
+    for field in feature_names:
+        if field in df and field not in CATEGORICAL_VALUES and df[field].dtype == object:
+            column = df[field]
+            values = pd.to_numeric(column, errors='coerce')
+            unparsed = values.isna().to_numpy() & column.notna().to_numpy()
+            df[field] = values.astype(object).where(~unparsed, column) if unparsed.any() else values
+    return df
+
+
+def is_number(value: Any) -> bool:
+    # Les booléens sont des int en Python mais pas des valeurs numériques valides
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _numeric_column(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    if pd.api.types.is_bool_dtype(column) or not (
+            pd.api.types.is_numeric_dtype(column) or column.dtype == object):
+        return np.full(len(column), np.nan), np.zeros(len(column), dtype=bool)
+    if column.dtype == object:
+        # Même contrôle de type que validate_input : pas de conversion implicite des chaînes
+        numeric = column.map(is_number).to_numpy(dtype=bool)
+        values = pd.to_numeric(column.where(numeric), errors='coerce').to_numpy(dtype=np.float64)
+        return values, numeric
+    values = column.to_numpy(dtype=np.float64)
+    return values, ~np.isnan(values)
+
+
+def _categorical_column(field: str, column: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    codes, uniques = pd.factorize(column)
+    canonical = [canonical_value(field, u) for u in uniques]
+    known = np.asarray([c is not None for c in canonical] + [False], dtype=bool)
+    # Le code -1 (valeur manquante) pointe sur l'entrée ajoutée en fin de table
+    missing = codes == -1
+    return np.asarray(canonical + [None], dtype=object)[codes], missing, ~missing & ~known[codes]
+
+
+def validate_frame(df: pd.DataFrame, feature_names: List[str]) -> Tuple[pd.DataFrame, np.ndarray, Dict[int, Dict[str, Any]]]:
+    n = len(df)
+    normalized = {}
+    missing_masks = {}
+    error_masks = []
+
+    for field in feature_names:
+        if field not in df:
+            missing_masks[field] = np.ones(n, dtype=bool)
+            normalized[field] = np.full(n, np.nan)
+            continue
+        column = df[field]
+        if field in CATEGORICAL_VALUES:
+            normalized[field], missing_masks[field], unknown = _categorical_column(field, column)
+            error_masks.append((field, unknown, categorical_error(field)))
+            continue
+
+        missing = column.isna().to_numpy(dtype=bool)
+        missing_masks[field] = missing
+        values, numeric = _numeric_column(column)
+        normalized[field] = values
+        if field in NUMERIC_RULES:
+            rule, message = NUMERIC_RULES[field]
+            with np.errstate(invalid='ignore'):
+                in_range = rule(values)
+            error_masks.append((field, ~missing & ~(numeric & in_range), message))
+        else:
+            error_masks.append((field, ~missing & ~numeric, NUMERIC_TYPE_ERROR))
+
+    invalid = np.zeros(n, dtype=bool)
+    for mask in missing_masks.values():
+        invalid |= mask
+    for _, mask, _ in error_masks:
+        invalid |= mask
+
+    # Le rapport n'est construit que pour les lignes en erreur
+    errors: Dict[int, Dict[str, Any]] = {}
+    for field, mask in missing_masks.items():
+        for row in np.flatnonzero(mask):
+            errors.setdefault(int(row), {}).setdefault('missing_fields', []).append(field)
+    for field, mask, message in error_masks:
+        for row in np.flatnonzero(mask):
+            errors.setdefault(int(row), {})[field] = message
+
+    normalized_df = pd.DataFrame(normalized, index=df.index, columns=feature_names)
+    return normalized_df, ~invalid, errors
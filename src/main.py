@@ -1,7 +1,7 @@
 import os
 import sys
 import logging
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, send_from_directory, jsonify, Response
 from flask_cors import CORS
 
 # Ajouter les handlers Gunicorn pour Railway
@@ -19,17 +19,30 @@ project_root = os.path.dirname(current_dir)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+from src.api_reference import ENDPOINTS
+from src.model_watcher import clear_pointer
+
 # Import after path setup
 try:
     from src.models.user import db
     from src.routes.prediction import prediction_bp
-    from src.prediction_service import predictor
+    from src.model_loader import model_loader
+    from src.metrics import metrics, clear as clear_metrics
 except ImportError as e:
     logger.error(f"Import error: {e}")
     # Create minimal imports for testing
     db = None
     prediction_bp = None
-    predictor = None
+    model_loader = None
+    metrics = None
+
+# État d'une exécution précédente (flask run, client de test) : instantanés de métriques et
+# modèle activé par l'administration. Sous Gunicorn, le maître l'écarte dans on_starting et un
+# worker ne doit pas effacer celui des autres
+if 'gunicorn' not in os.environ.get('SERVER_SOFTWARE', ''):
+    if metrics:
+        clear_metrics()
+    clear_pointer()
 
 # Initialisation de l'application Flask
 # Fix static folder path for Railway
@@ -80,25 +93,24 @@ def serve(path):
             'version': '1.0.0',
             'status': 'running',
             'environment': 'production' if os.environ.get('RAILWAY_ENVIRONMENT') else 'development',
-            'endpoints': {
-                'predict': '/api/v1/predict',
-                'health': '/api/v1/health',
-                'model_info': '/api/v1/model/info',
-                'features': '/api/v1/features',
-                'example': '/api/v1/example'
-            },
+            'endpoints': ENDPOINTS,
             'documentation': 'Consultez /api/v1/example pour un exemple de requête'
         })
 
-# Health check endpoint
+# Health check endpoint (liveness : répond même pendant le chargement du modèle)
 @app.route('/health')
 def health_check():
     return jsonify({
         'status': 'healthy',
         'database': 'connected' if db else 'not available',
-        'model': 'loaded' if predictor and hasattr(predictor, 'pipeline') else 'not loaded'
+        'model': model_loader.state if model_loader else 'not available'
     })
 
+# Métriques Prometheus, agrégées sur tous les workers (cf. src/metrics.py)
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render() if metrics else '', mimetype='text/plain; version=0.0.4')
+
 # Gestion des erreurs 404
 @app.errorhandler(404)
 def not_found(error):
@@ -106,14 +118,7 @@ def not_found(error):
         'status': 'error',
         'error_code': 'NOT_FOUND',
         'message': 'Endpoint non trouvé',
-        'available_endpoints': [
-            '/api/v1/predict',
-            '/api/v1/health',
-            '/api/v1/model/info',
-            '/api/v1/features',
-            '/api/v1/example',
-            '/health'
-        ]
+        'available_endpoints': list(ENDPOINTS.values())
     }), 404
 
 # Gestion des erreurs 500
@@ -126,38 +131,41 @@ def internal_error(error):
         'message': 'Erreur interne du serveur'
     }), 500
 
-# Chargement du modèle ML
+# Chargement du modèle ML (exécuté en arrière-plan : pandas et scikit-learn ne sont
+# importés qu'ici, le serveur répond déjà à /health)
 def initialize_model():
-    if not predictor:
-        logger.warning("Predictor not available, skipping model initialization")
-        return
-        
-    try:
-        # Try multiple possible paths for the model
-        possible_paths = [
-            os.path.join(current_dir, 'models', 'credit_risk_pipeline.pkl'),
-            os.path.join(project_root, 'src', 'models', 'credit_risk_pipeline.pkl'),
-            os.path.join(project_root, 'models', 'credit_risk_pipeline.pkl')
-        ]
-        
-        for pipeline_path in possible_paths:
-            if os.path.exists(pipeline_path):
-                success = predictor.load_model(pipeline_path)
-                if success:
-                    logger.info(f"Modèle chargé avec succès depuis: {pipeline_path}")
-                    return
-                else:
-                    logger.warning(f"Échec du chargement depuis: {pipeline_path}")
-        
-        logger.warning("Aucun modèle trouvé dans les emplacements suivants:")
-        for path in possible_paths:
-            logger.warning(f"  - {path}")
-            
-    except Exception as e:
-        logger.error(f"Erreur lors de l'initialisation du modèle: {str(e)}")
+    from src.prediction_service import predictor
+
+    from src.model_artifact import resolve_model_path
+
+    # MODEL_PATH d'abord, puis les emplacements habituels ; pour chacun, l'artefact projeté en
+    # mémoire (<nom>.artifact) est préféré au pickle quand il est à jour
+    possible_paths = [os.environ['MODEL_PATH']] if os.environ.get('MODEL_PATH') else []
+    for models_dir in (os.path.join(current_dir, 'models'), os.path.join(project_root, 'src', 'models'),
+                       os.path.join(project_root, 'models')):
+        pipeline_path = os.path.join(models_dir, 'credit_risk_pipeline.pkl')
+        artifact_path = resolve_model_path(pipeline_path)
+        possible_paths += [artifact_path, pipeline_path] if artifact_path != pipeline_path else [pipeline_path]
+
+    for pipeline_path in possible_paths:
+        if os.path.exists(pipeline_path):
+            success = predictor.load_model(pipeline_path)
+            if success:
+                logger.info(f"Modèle chargé avec succès depuis: {pipeline_path}")
+                return predictor
+            else:
+                logger.warning(f"Échec du chargement depuis: {pipeline_path}")
+
+    logger.warning("Aucun modèle trouvé dans les emplacements suivants:")
+    for path in possible_paths:
+        logger.warning(f"  - {path}")
+    return None
 
 # Initialisation du modèle au démarrage
-initialize_model()
+if model_loader:
+    model_loader.start(initialize_model)
+else:
+    logger.warning("Model loader not available, skipping model initialization")
 
 # For development
 if __name__ == '__main__':
@@ -0,0 +1,327 @@
+"""
+Métriques de service au format texte Prometheus, agrégées entre workers Gunicorn.
+
+Chaque processus tient ses compteurs et histogrammes en mémoire et un thread en publie
+un instantané chaque seconde dans METRICS_DIR/<pid>-<démarrage>.json ; /metrics
+additionne les instantanés de tous les processus. Les instantanés des processus arrêtés
+sont fusionnés dans METRICS_DIR/retired.json : leurs compteurs restent comptés, le
+répertoire ne grossit pas à chaque redémarrage de worker, et un pid réutilisé n'écrase
+rien (la date de démarrage du processus fait partie du nom). Les jauges (requêtes en
+cours, modèle servi) ne portent que sur les processus vivants. Le répertoire est vidé au
+démarrage du serveur (clear) : Gunicorn, application ASGI ou import de src.main hors Gunicorn.
+
+Les durées par étape (validation, construction du DataFrame, prétraitement, classifieur,
+sérialisation) sont mesurées avec une horloge monotone : dans une requête, elles sont
+cumulées par étape puis observées une fois à la fin de la requête.
+"""
+
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+METRICS_DIR = os.environ.get('METRICS_DIR', '/tmp/credit_risk_metrics')
+FLUSH_INTERVAL = 1.0
+RETIRED = 'retired.json'
+
+# Bornes (s) des histogrammes de latence
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    'credit_risk_requests_total': ('counter', "Requêtes API par endpoint, statut HTTP et error_code"),
+    'credit_risk_request_duration_seconds': ('histogram', "Durée des requêtes API par endpoint"),
+    'credit_risk_stage_duration_seconds': ('histogram', "Durée par étape du chemin de prédiction"),
+    'credit_risk_requests_in_flight': ('gauge', "Requêtes API en cours de traitement"),
+    'credit_risk_model_info': ('gauge', "Modèle servi (1 par version chargée dans un worker vivant)"),
+    'credit_risk_model_requests_total': ('counter', "Requêtes de prédiction par version du registre de modèles"),
+    'credit_risk_shadow_predictions_total': ('counter', "Prédictions fantômes comparées, par couple de versions et accord de classe"),
+    'credit_risk_shadow_score_diff_total': ('counter', "Somme des écarts absolus de probabilité entre version servie et fantôme"),
+    'credit_risk_shadow_dropped_total': ('counter', "Comparaisons fantômes abandonnées (file pleine)"),
+}
+
+_local = threading.local()
+
+
+def _key(labels: Dict[str, str]) -> str:
+    return json.dumps(sorted(labels.items()), ensure_ascii=False)
+
+
+class MetricsRegistry:
+    def __init__(self, directory: str = METRICS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self._histograms: Dict[str, Dict[str, List[float]]] = {}
+        self._gauges: Dict[str, Dict[str, float]] = {}
+        self._pid = os.getpid()
+        self._started = _process_start(self._pid)
+        self._dirty = False
+        self._flusher = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Un worker forké hérite des valeurs du maître (et peut-être d'un verrou pris par
+        # son thread de publication) : il repart de zéro sous son propre pid
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._started = _process_start(self._pid)
+        self._counters, self._histograms = {}, {}
+        self._gauges = {name: values for name, values in self._gauges.items() if name == 'credit_risk_model_info'}
+        self._dirty = bool(self._gauges)
+        self._flusher = None
+
+    def _changed(self):
+        # Appelé sous verrou : publication paresseuse, un thread par processus
+        self._dirty = True
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run_flusher, name='metrics-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            if self._dirty:
+                self.flush()
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1.0):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0.0) + value
+            self._changed()
+
+    def observe(self, name: str, labels: Dict[str, str], seconds: float):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # [compteurs par borne..., +Inf, somme]
+            values = series.setdefault(_key(labels), [0.0] * (len(LATENCY_BUCKETS) + 2))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    values[i] += 1
+                    break
+            else:
+                values[len(LATENCY_BUCKETS)] += 1
+            values[-1] += seconds
+            self._changed()
+
+    def set_gauge(self, name: str, labels: Dict[str, str], value: float, exclusive: bool = False):
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            if exclusive:
+                series.clear()
+            series[_key(labels)] = value
+            self._changed()
+
+    def add_gauge(self, name: str, labels: Dict[str, str], delta: float):
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0.0) + delta
+            self._changed()
+
+    def flush(self):
+        with self._lock:
+            snapshot = {'pid': self._pid, 'started': self._started, 'counters': self._counters,
+                        'histograms': self._histograms, 'gauges': self._gauges}
+            data = json.dumps(snapshot, ensure_ascii=False)
+            self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'{self._pid}-{self._started}.json')
+            with open(path + '.tmp', 'w') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass
+
+    def _snapshots(self) -> Iterator[Tuple[Dict[str, Any], bool]]:
+        self._retire()
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            snapshot = _read(path)
+            if snapshot is not None:
+                yield snapshot, path != os.path.join(self.directory, RETIRED)
+
+    def _retire(self):
+        # Instantanés des processus arrêtés (ou dont le pid a été réutilisé) fusionnés dans
+        # retired.json, sous verrou : deux /metrics simultanés ne les comptent pas deux fois
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                retired_path = os.path.join(self.directory, RETIRED)
+                retired, dead = None, []
+                for path in glob.glob(os.path.join(self.directory, '*-*.json')):
+                    snapshot = _read(path)
+                    if snapshot is None or _alive(snapshot['pid'], snapshot.get('started')):
+                        continue
+                    if retired is None:
+                        retired = _read(retired_path) or {'counters': {}, 'histograms': {}, 'gauges': {}}
+                    _merge(retired, snapshot)
+                    dead.append(path)
+                if not dead:
+                    return
+                with open(retired_path + '.tmp', 'w') as f:
+                    json.dump(retired, f, ensure_ascii=False)
+                os.replace(retired_path + '.tmp', retired_path)
+                for path in dead:
+                    os.remove(path)
+        except OSError:
+            pass
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        self.flush()
+        counters: Dict[str, Dict[str, float]] = {}
+        histograms: Dict[str, Dict[str, List[float]]] = {}
+        gauges: Dict[str, Dict[str, float]] = {}
+        for snapshot, alive in self._snapshots():
+            _merge({'counters': counters, 'histograms': histograms}, snapshot)
+            if not alive:
+                continue
+            for name, series in snapshot['gauges'].items():
+                for key, value in series.items():
+                    gauges.setdefault(name, {})
+                    if name == 'credit_risk_model_info':
+                        gauges[name][key] = 1.0
+                    else:
+                        gauges[name][key] = gauges[name].get(key, 0.0) + value
+        return {'counter': counters, 'histogram': histograms, 'gauge': gauges}
+
+    def render(self) -> str:
+        collected = self.collect()
+        lines = []
+        for name, (kind, help_text) in METRIC_HELP.items():
+            series = collected[kind].get(name, {})
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, value in sorted(series.items()):
+                labels = json.loads(key)
+                if kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels + [["le", str(bound)]])} {_format_value(cumulative)}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]!r}')
+                lines.append(f'{name}_count{_format_labels(labels)} {_format_value(cumulative)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(total: Dict[str, Any], snapshot: Dict[str, Any]):
+    # Compteurs et histogrammes de snapshot ajoutés à total (les jauges ne se cumulent pas)
+    for name, series in snapshot['counters'].items():
+        for key, value in series.items():
+            total['counters'].setdefault(name, {})
+            total['counters'][name][key] = total['counters'][name].get(key, 0.0) + value
+    for name, series in snapshot['histograms'].items():
+        for key, values in series.items():
+            merged = total['histograms'].setdefault(name, {}).setdefault(key, [0.0] * len(values))
+            for i, value in enumerate(values):
+                merged[i] += value
+
+
+def _read(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _process_start(pid: int) -> str:
+    # Date de démarrage du processus (tops d'horloge depuis le boot, /proc/<pid>/stat) :
+    # distingue un pid réutilisé du processus qui a écrit l'instantané
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return '0'
+
+
+def _alive(pid: int, started: str = None) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return started is None or _process_start(pid) == started
+
+
+def _format_labels(labels: List[List[str]]) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{k}="{_escape(v)}"' for k, v in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def clear(directory: str = METRICS_DIR):
+    # Au démarrage du serveur : les instantanés d'une exécution précédente sont écartés
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stages = getattr(_local, 'stages', None)
+        if stages is None:
+            # Hors requête (thread de micro-batching, scoring hors ligne) : observation directe
+            metrics.observe('credit_risk_stage_duration_seconds', {'stage': name}, elapsed)
+        else:
+            stages[name] = stages.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def detached_stages():
+    # Travail hors chemin de requête (scoring fantôme) : ses étapes ne sont pas comptées
+    previous = getattr(_local, 'stages', None)
+    _local.stages = {}
+    try:
+        yield
+    finally:
+        _local.stages = previous
+
+
+def begin_request():
+    _local.stages = {}
+    _local.start = time.perf_counter()
+    metrics.add_gauge('credit_risk_requests_in_flight', {}, 1)
+
+
+def end_request(endpoint: str, status: int, error_code: str = ''):
+    elapsed = time.perf_counter() - getattr(_local, 'start', time.perf_counter())
+    stages = getattr(_local, 'stages', None) or {}
+    _local.stages = None
+    for name, seconds in stages.items():
+        metrics.observe('credit_risk_stage_duration_seconds', {'stage': name}, seconds)
+    metrics.observe('credit_risk_request_duration_seconds', {'endpoint': endpoint}, elapsed)
+    metrics.inc('credit_risk_requests_total', {'endpoint': endpoint, 'status': str(status), 'error_code': error_code})
+
+
+def finish_request():
+    _local.stages = None
+    metrics.add_gauge('credit_risk_requests_in_flight', {}, -1)
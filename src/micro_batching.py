@@ -0,0 +1,125 @@
+"""
+Micro-batching des prédictions unitaires concurrentes.
+
+Les appels concurrents (workers gthread ou asynchrones) déposent leur demande dans une
+file ; un thread de regroupement les rassemble jusqu'à max_batch_size demandes ou
+max_wait_ms après la première, les évalue en un seul appel, puis rend à chaque
+appelant son propre résultat.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bornes supérieures des classes de l'histogramme des tailles de lot
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    def __init__(self, score_fn: Callable[[List[Dict[str, Any]]], Tuple[np.ndarray, np.ndarray]],
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.score_fn = score_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self._queue: 'queue.Queue[Tuple[Dict[str, Any], Future]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._batches = 0
+        self._requests = 0
+        self._largest = 0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    @classmethod
+    def from_env(cls, score_fn) -> Optional['MicroBatcher']:
+        if os.environ.get('PREDICTION_MICRO_BATCHING', '0').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            score_fn,
+            max_batch_size=int(os.environ.get('PREDICTION_MAX_BATCH_SIZE', 32)),
+            max_wait_ms=float(os.environ.get('PREDICTION_MAX_WAIT_MS', 2.0))
+        )
+
+    def _ensure_started(self):
+        # Démarrage paresseux et par processus : un thread créé avant le fork de
+        # Gunicorn n'existe pas dans les workers.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, data: Dict[str, Any]) -> Future:
+        self._ensure_started()
+        future = Future()
+        self._queue.put((data, future))
+        return future
+
+    def score(self, data: Dict[str, Any]) -> Tuple[Any, float]:
+        return self.submit(data).result()
+
+    def _collect(self) -> List[Tuple[Dict[str, Any], Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            live = [(data, future) for data, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            records = [data for data, _ in live]
+            futures = [future for _, future in live]
+            try:
+                predictions, probabilities = self.score_fn(records)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'évaluation d'un micro-lot: {str(e)}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, prediction, probability in zip(futures, predictions, probabilities):
+                future.set_result((prediction, probability))
+            self._record(len(records))
+
+    def _record(self, size: int):
+        with self._lock:
+            self._batches += 1
+            self._requests += size
+            self._largest = max(self._largest, size)
+            bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+                          len(BATCH_SIZE_BUCKETS))
+            self._histogram[bucket] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                'enabled': True,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': self._batches,
+                'requests': self._requests,
+                'mean_batch_size': round(self._requests / self._batches, 2) if self._batches else 0.0,
+                'largest_batch': self._largest,
+                'batch_size_histogram': dict(zip(labels, self._histogram)),
+                'queue_depth': self._queue.qsize()
+            }
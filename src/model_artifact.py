@@ -0,0 +1,191 @@
+"""
+Format d'artefact compact et versionné pour les modèles servis.
+
+Un artefact est un répertoire (<modèle>.artifact) sans aucun pickle :
+    manifest.json   format, version, ordre des features, classes, empreinte du modèle
+                    source, métriques, versions des bibliothèques à l'export
+    encoder/        paramètres du StandardScaler et tables de catégories (.npy, encoder.json)
+    forest/         tableaux de nœuds de la forêt aplatie (.npy, forest.json)
+
+Les tableaux sont projetés en mémoire au chargement (quelques millisecondes, pages
+partagées entre workers) et scorés par CompiledFeatureEncoder + CompiledForest, sans
+dépendre de la version de scikit-learn qui a produit le pickle.
+CreditRiskPredictor.load_model accepte indifféremment un pickle ou un artefact.
+
+Usage :
+    python -m src.model_artifact src/models/credit_risk_pipeline.pkl
+    python -m src.model_artifact src/models/best_credit_risk_model.pkl --metrics src/models/model_performance.txt
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+import joblib
+import numpy as np
+import sklearn
+
+from src.api_reference import EXAMPLE_REQUEST, FEATURE_DESCRIPTIONS
+from src.feature_encoder import CompiledFeatureEncoder
+from src.forest_engine import CompiledForest
+from src.input_validation import CATEGORICAL_VALUES
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 'credit-risk-artifact'
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+ARTIFACT_SUFFIX = '.artifact'
+
+# Écart toléré entre le pipeline source et l'artefact sur les lignes de contrôle
+PARITY_TOLERANCE = 1e-9
+
+
+def warm_up_records() -> List[Dict[str, Any]]:
+    # L'exemple de l'API, puis une variante par modalité : toutes les branches de l'encodeur servent
+    base = EXAMPLE_REQUEST['body']
+    records = [dict(base)]
+    for field, values in CATEGORICAL_VALUES.items():
+        records.extend({**base, field: value} for value in values if value != base[field])
+    return records
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def resolve_model_path(pipeline_path: str) -> str:
+    # Artefact exporté à côté du pickle (<modèle>.artifact) s'il correspond au pickle actuel :
+    # le démarrage projette alors la forêt en mémoire au lieu de la dépickler
+    artifact_path = os.path.splitext(pipeline_path)[0] + ARTIFACT_SUFFIX
+    if is_artifact(pipeline_path) or not is_artifact(artifact_path):
+        return pipeline_path
+    if os.path.exists(pipeline_path) and read_manifest(artifact_path).get('model_hash') != file_digest(pipeline_path):
+        logger.warning(f"Artefact {artifact_path} périmé (pickle modifié depuis l'export), chargement du pickle")
+        return pipeline_path
+    return artifact_path
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} n'est pas un artefact de modèle")
+    if manifest.get('format_version', 0) > FORMAT_VERSION:
+        raise ValueError(f"Version d'artefact {manifest['format_version']} non supportée (max {FORMAT_VERSION})")
+    return manifest
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def read_metrics(report_path: str) -> Dict[str, float]:
+    # En-tête de model_performance.txt : « ROC AUC: 0.7617 », « Accuracy: 0.6950 »...
+    metrics = {}
+    with open(report_path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip():
+                break
+            match = re.match(r'^([\w ]+):\s*([-+0-9.eE]+)\s*$', line.strip())
+            if match:
+                metrics[match.group(1).strip().lower().replace(' ', '_')] = float(match.group(2))
+    return metrics
+
+
+def export_artifact(pipeline_path: str, output_path: str = None, metrics: Dict[str, float] = None,
+                    feature_names: List[str] = None) -> str:
+    feature_names = feature_names or list(FEATURE_DESCRIPTIONS)
+    output_path = output_path or os.path.splitext(pipeline_path)[0] + ARTIFACT_SUFFIX
+    pipeline = joblib.load(pipeline_path)
+    encoder = CompiledFeatureEncoder.from_pipeline(pipeline, feature_names)
+    if encoder is None:
+        raise ValueError("Préprocesseur non compilable : seul un ColumnTransformer StandardScaler/OneHotEncoder est exportable")
+    classifier = pipeline.steps[-1][1]
+    forest = CompiledForest(classifier)
+
+    # Contrôle de parité avant écriture : l'artefact doit reproduire le pipeline source
+    import pandas as pd
+    records = warm_up_records()
+    expected = pipeline.predict_proba(pd.DataFrame(records, columns=feature_names))
+    actual = forest.predict_proba(encoder.transform_records(records))
+    if not np.allclose(expected, actual, atol=PARITY_TOLERANCE, rtol=0):
+        raise ValueError(f"Artefact non conforme au pipeline (écart max {np.abs(expected - actual).max():.3g})")
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': FORMAT_VERSION,
+        'model_name': type(classifier).__name__,
+        # Même version que le pickle source : les deux formats du même modèle partagent le cache
+        'model_hash': file_digest(pipeline_path),
+        'source': os.path.basename(pipeline_path),
+        'feature_names': feature_names,
+        'classes': np.asarray(forest.classes_).tolist(),
+        'n_trees': forest.n_trees,
+        'node_count': forest.node_count,
+        'metrics': metrics or {},
+        'exported_at': datetime.now().isoformat(),
+        'exported_with': {'python': platform.python_version(), 'scikit_learn': sklearn.__version__,
+                          'numpy': np.__version__}
+    }
+    # Répertoire temporaire puis renommage : la surveillance du modèle ne voit jamais un export partiel
+    parent = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.artifact-')
+    try:
+        encoder.save(os.path.join(staging, 'encoder'))
+        forest.save(os.path.join(staging, 'forest'))
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.chmod(staging, 0o755)
+        if os.path.isdir(output_path):
+            shutil.rmtree(output_path)
+        os.rename(staging, output_path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return output_path
+
+
+def load_artifact(path: str, mmap_mode: str = 'r'):
+    manifest = read_manifest(path)
+    encoder = CompiledFeatureEncoder.load(os.path.join(path, 'encoder'))
+    forest = CompiledForest.load(os.path.join(path, 'forest'), mmap_mode=mmap_mode)
+    return manifest, encoder, forest
+
+
+def _directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export d'un pipeline en artefact compact projetable en mémoire")
+    parser.add_argument('pipeline', help='Pipeline joblib (.pkl)')
+    parser.add_argument('--output', help='Répertoire de sortie (défaut : <pipeline>.artifact)')
+    parser.add_argument('--metrics', help='Rapport model_performance.txt dont les métriques sont reprises')
+    args = parser.parse_args()
+
+    output = export_artifact(args.pipeline, args.output, read_metrics(args.metrics) if args.metrics else None)
+    start = time.perf_counter()
+    manifest, _, _ = load_artifact(output)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"✅ Artefact {manifest['model_hash']} écrit dans {output} "
+          f"({_directory_size(output) / 1e6:.1f} Mo, pickle {os.path.getsize(args.pipeline) / 1e6:.1f} Mo) ; "
+          f"chargement {load_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
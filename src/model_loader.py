@@ -0,0 +1,103 @@
+"""
+Chargement du modèle en arrière-plan.
+
+Le serveur répond dès son démarrage (liveness) pendant qu'un thread importe pandas /
+scikit-learn, charge le pipeline puis exécute une prédiction de chauffe ; le service
+n'est déclaré prêt (readiness) qu'une fois ces étapes réussies.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional
+
+from src.api_reference import EXAMPLE_REQUEST
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoader:
+    def __init__(self):
+        self.state = 'idle'
+        self.error = None
+        self._predictor = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._timings: Dict[str, float] = {}
+        self._ready_at = None
+
+    def start(self, load_fn: Callable[[], Any], background: bool = True):
+        with self._lock:
+            if self.state != 'idle':
+                return
+            self.state = 'loading'
+            self._started_at = time.monotonic()
+        if background:
+            self._thread = threading.Thread(target=self._run, args=(load_fn,), name='model-loader', daemon=True)
+            self._thread.start()
+        else:
+            self._run(load_fn)
+
+    def _run(self, load_fn: Callable[[], Any]):
+        try:
+            predictor = load_fn()
+            # Un modèle chargé depuis un artefact n'a pas de pipeline scikit-learn (pipeline=None)
+            if predictor is None or predictor.model is None:
+                raise RuntimeError("Aucun modèle chargé")
+            self._timings['load_s'] = round(time.monotonic() - self._started_at, 3)
+
+            # Chauffe par le chemin batch : il ne passe pas par le cache de prédictions
+            warm_up_start = time.monotonic()
+            result = predictor.predict_batch([EXAMPLE_REQUEST['body']])
+            if result['status'] != 'success':
+                raise RuntimeError(f"Échec de la prédiction de chauffe: {result}")
+            self._timings['warm_up_s'] = round(time.monotonic() - warm_up_start, 3)
+
+            # Versions secondaires du registre (routage, scoring fantôme), prêtes avant la readiness
+            from src.model_registry import model_registry
+            versions_start = time.monotonic()
+            model_registry.start(predictor)
+            if len(model_registry.versions()) > 1:
+                self._timings['versions_s'] = round(time.monotonic() - versions_start, 3)
+
+            self._predictor = predictor
+            self._ready_at = datetime.now().isoformat()
+            self.state = 'ready'
+            # Rechargement à chaud : surveillance du fichier du modèle et du pointeur d'administration
+            from src.model_watcher import model_watcher
+            model_watcher.start(predictor)
+            logger.info(f"Modèle prêt en {self._timings['load_s'] + self._timings['warm_up_s']:.2f}s "
+                        f"(chargement {self._timings['load_s']}s, chauffe {self._timings['warm_up_s']}s)")
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            logger.error(f"Échec du chargement du modèle: {str(e)}")
+
+    def wait(self, timeout: float = None) -> bool:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    @property
+    def predictor(self) -> Optional[Any]:
+        return self._predictor
+
+    def status(self) -> Dict[str, Any]:
+        status = {'state': self.state, **self._timings}
+        if self.state == 'loading':
+            status['elapsed_s'] = round(time.monotonic() - self._started_at, 3)
+        if self._ready_at:
+            status['ready_at'] = self._ready_at
+        if self.error:
+            status['error'] = self.error
+        return status
+
+
+model_loader = ModelLoader()
@@ -0,0 +1,210 @@
+"""
+Registre de modèles : plusieurs versions nommées chargées côte à côte.
+
+La version par défaut ('primary') est le modèle du prédicteur, y compris après un
+rechargement à chaud ; les autres sont déclarées dans MODEL_VERSIONS
+(« nom=fichier.pkl,... », fichiers de src/models/). Chaque requête est routée par
+l'en-tête X-Model-Version, sinon par tirage pondéré (MODEL_ROUTING, « nom=poids,... »),
+sinon vers la version par défaut.
+
+Une version fantôme (MODEL_SHADOW) score les mêmes entrées dans un thread d'arrière-plan,
+après la réponse : elle n'ajoute aucune latence au chemin de requête. L'accord des classes
+et les écarts de probabilité sont cumulés par couple (version servie, version fantôme),
+dans /api/v1/models et dans /metrics.
+"""
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Dict, Any, List
+
+from src.metrics import metrics, stage, detached_stages
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+DEFAULT_VERSION = 'primary'
+SHADOW_QUEUE_SIZE = int(os.environ.get('MODEL_SHADOW_QUEUE_SIZE', 1000))
+
+# Bornes des écarts absolus de probabilité (répartition exposée dans /api/v1/models)
+DIFF_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def parse_mapping(value: str) -> Dict[str, str]:
+    # « a=x,b=y » -> {'a': 'x', 'b': 'y'}
+    mapping = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _, setting = item.partition('=')
+        if not name.strip() or not setting.strip():
+            raise ValueError(f"Entrée invalide '{item}' (format attendu : nom=valeur)")
+        mapping[name.strip()] = setting.strip()
+    return mapping
+
+
+class ModelRegistry:
+    def __init__(self, versions: Dict[str, str] = None, weights: Dict[str, float] = None,
+                 shadow: str = None, queue_size: int = SHADOW_QUEUE_SIZE):
+        self.predictor = None
+        self.paths = versions if versions is not None else parse_mapping(os.environ.get('MODEL_VERSIONS'))
+        self.weights = weights if weights is not None else {
+            name: float(weight) for name, weight in parse_mapping(os.environ.get('MODEL_ROUTING')).items()}
+        self.shadow = shadow if shadow is not None else (os.environ.get('MODEL_SHADOW') or None)
+        self.queue_size = queue_size
+        self.errors: Dict[str, str] = {}
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._stats: Dict[tuple, Dict[str, Any]] = {}
+        self._dropped = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def start(self, predictor):
+        # Appelé par le chargeur du modèle, avant la readiness : les versions secondaires
+        # sont chargées et chauffées comme le modèle principal. Une version en échec est
+        # écartée du routage sans bloquer le service.
+        from src.prediction_service import LoadedModel, warm_up_records
+        self.predictor = predictor
+        for name, path in self.paths.items():
+            if name == DEFAULT_VERSION:
+                continue
+            try:
+                start = time.monotonic()
+                model = LoadedModel.load(os.path.realpath(os.path.join(MODELS_DIR, path)), predictor.feature_names,
+                                         predictor.engine, predictor.use_compiled_encoder, predictor.mmap_dir)
+                model.warm_up(warm_up_records())
+                self._models[name] = model
+                logger.info(f"Version '{name}' chargée: {model.info['model_name']} ({model.model_hash}) "
+                            f"en {time.monotonic() - start:.2f}s")
+            except Exception as e:
+                self.errors[name] = str(e)
+                logger.error(f"Échec du chargement de la version '{name}' ({path}): {str(e)}")
+        unknown = [name for name in self.weights if name not in self.versions()]
+        if unknown:
+            logger.warning(f"Versions de routage inconnues ou non chargées, ignorées: {', '.join(unknown)}")
+        if self.shadow and self.shadow not in self.versions():
+            logger.warning(f"Version fantôme '{self.shadow}' indisponible, scoring fantôme désactivé")
+
+    def versions(self) -> List[str]:
+        return [DEFAULT_VERSION] + list(self._models)
+
+    def get(self, name: str = DEFAULT_VERSION):
+        if name == DEFAULT_VERSION:
+            return self.predictor.model if self.predictor is not None else None
+        return self._models[name]
+
+    def route(self, requested: str = None) -> str:
+        # En-tête explicite, sinon tirage pondéré parmi les versions chargées, sinon défaut
+        if requested:
+            if requested not in self.versions():
+                raise KeyError(requested)
+            return requested
+        names = [name for name in self.weights if name in self.versions() and self.weights[name] > 0]
+        if not names:
+            return DEFAULT_VERSION
+        return random.choices(names, weights=[self.weights[name] for name in names])[0]
+
+    def observe(self, version: str, records: List[Dict[str, Any]], predictions: List[Dict[str, Any]]):
+        # Après la réponse principale : comptage par version et mise en file pour la version fantôme
+        metrics.inc('credit_risk_model_requests_total', {'version': version})
+        shadow = self.shadow
+        if not shadow or shadow == version or shadow not in self._models or not records:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((version, records, predictions))
+        except queue.Full:
+            # Le scoring fantôme ne doit jamais ralentir le service : au-delà de la file, on abandonne
+            with self._lock:
+                self._dropped += 1
+            metrics.inc('credit_risk_shadow_dropped_total', {'shadow': shadow})
+
+    def _ensure_worker(self):
+        # Un thread par processus (le thread du maître n'existe pas après le fork)
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._run_shadow, name='shadow-scoring', daemon=True)
+            self._thread.start()
+
+    def _run_shadow(self):
+        while True:
+            version, records, predictions = self._queue.get()
+            try:
+                with stage('shadow'), detached_stages():
+                    self.compare(version, self.shadow, records, predictions)
+            except Exception as e:
+                logger.error(f"Scoring fantôme ({self.shadow}): {str(e)}")
+
+    def compare(self, version: str, shadow: str, records: List[Dict[str, Any]], predictions: List[Dict[str, Any]]):
+        # Import différé : ni NumPy ni pandas ne sont chargés avec les routes
+        import numpy as np
+        df, valid_mask, _ = self.predictor.validate_batch(records)
+        shadow_classes, shadow_probabilities = self._models[shadow].score_frame(df[valid_mask])
+        served_classes = np.array([p['risk_class'] for p in predictions])[valid_mask]
+        served_probabilities = np.array([p['probability_score'] for p in predictions])[valid_mask]
+
+        agree = int((served_classes == shadow_classes).sum())
+        diffs = np.abs(served_probabilities - shadow_probabilities)
+        bucket_counts = np.bincount(np.searchsorted(DIFF_BUCKETS, diffs), minlength=len(DIFF_BUCKETS))
+        with self._lock:
+            stats = self._stats.setdefault((version, shadow), {
+                'compared': 0, 'agreements': 0, 'abs_diff_sum': 0.0, 'max_abs_diff': 0.0,
+                'diff_buckets': [0] * len(DIFF_BUCKETS)})
+            stats['compared'] += len(diffs)
+            stats['agreements'] += agree
+            stats['abs_diff_sum'] += float(diffs.sum())
+            stats['max_abs_diff'] = max(stats['max_abs_diff'], float(diffs.max(initial=0.0)))
+            for i, count in enumerate(bucket_counts[:len(DIFF_BUCKETS)]):
+                stats['diff_buckets'][i] += int(count)
+        labels = {'version': version, 'shadow': shadow}
+        metrics.inc('credit_risk_shadow_predictions_total', {**labels, 'agreement': 'true'}, agree)
+        metrics.inc('credit_risk_shadow_predictions_total', {**labels, 'agreement': 'false'}, len(diffs) - agree)
+        metrics.inc('credit_risk_shadow_score_diff_total', labels, float(diffs.sum()))
+
+    def status(self) -> Dict[str, Any]:
+        versions = {}
+        for name in self.versions():
+            model = self.get(name)
+            versions[name] = {key: model.info[key] for key in ('model_name', 'model_version', 'model_path', 'loaded_at')} \
+                if model is not None else None
+        with self._lock:
+            comparisons = []
+            for (version, shadow), stats in self._stats.items():
+                compared = stats['compared']
+                comparisons.append({
+                    'version': version,
+                    'shadow': shadow,
+                    'compared': compared,
+                    'agreement_rate': round(stats['agreements'] / compared, 4) if compared else None,
+                    'mean_abs_diff': round(stats['abs_diff_sum'] / compared, 4) if compared else None,
+                    'max_abs_diff': round(stats['max_abs_diff'], 4),
+                    'abs_diff_distribution': {f'<={bound}': count for bound, count in zip(DIFF_BUCKETS, stats['diff_buckets'])}
+                })
+            pending = self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+        return {
+            'default': DEFAULT_VERSION,
+            'versions': versions,
+            'failed': self.errors,
+            'routing': {name: weight for name, weight in self.weights.items() if name in versions} or {DEFAULT_VERSION: 1.0},
+            'shadow': {
+                'version': self.shadow if self.shadow in versions else None,
+                'pending': pending,
+                'dropped': self._dropped,
+                'comparisons': comparisons
+            },
+            'pid': os.getpid()
+        }
+
+
+model_registry = ModelRegistry()
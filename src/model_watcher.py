@@ -0,0 +1,148 @@
+"""
+Rechargement à chaud du modèle.
+
+Un thread par processus surveille le fichier du modèle actif (src/models/ par défaut) et
+un fichier pointeur partagé, écrit par l'endpoint d'administration : dès que l'un ou
+l'autre change, le nouveau pipeline est chargé, validé et chauffé en arrière-plan puis
+substitué d'un bloc (CreditRiskPredictor.load_model). Chaque worker Gunicorn détecte le
+changement de lui-même ; la version (empreinte du contenu) et l'heure de chargement sont
+visibles dans /api/v1/model/info et dans /metrics.
+
+Le pointeur ne vaut que pour l'exécution en cours : il est effacé au démarrage du serveur
+(clear_pointer, comme les métriques), sinon un redémarrage chargerait MODEL_PATH puis
+rebasculerait sur le modèle choisi lors d'un déploiement précédent.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+POINTER_PATH = os.environ.get('MODEL_POINTER_PATH', '/tmp/credit_risk_active_model.json')
+WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5))
+
+
+def clear_pointer(pointer_path: str = POINTER_PATH):
+    # Au démarrage du serveur : le modèle activé par l'administration lors d'une exécution
+    # précédente ne remplace pas celui de la configuration (MODEL_PATH, artefact, pickle)
+    try:
+        os.remove(pointer_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Pointeur de modèle {pointer_path} non effacé: {str(e)}")
+
+
+def _signature_file(path: str) -> str:
+    # Artefact (répertoire) : son manifeste, écrit en dernier, signale chaque nouvel export
+    return os.path.join(path, 'manifest.json') if os.path.isdir(path) else path
+
+
+class ModelWatcher:
+    def __init__(self, interval: float = WATCH_INTERVAL, pointer_path: str = POINTER_PATH):
+        self.interval = interval
+        self.pointer_path = pointer_path
+        self.predictor = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._failed: Optional[tuple] = None
+        self._force = False
+        self._status: Dict[str, Any] = {'state': 'idle'}
+
+    def start(self, predictor=None):
+        # Démarrage paresseux et par processus (le thread du maître n'existe pas après le fork)
+        if predictor is not None:
+            self.predictor = predictor
+        if self.predictor is None:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._wake = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+            self._thread.start()
+
+    def resolve(self, model_path: str) -> str:
+        # Seuls les pickles et artefacts du répertoire des modèles peuvent être activés depuis l'API
+        path = os.path.realpath(os.path.join(MODELS_DIR, model_path.rstrip('/')))
+        if os.path.dirname(path) != os.path.realpath(MODELS_DIR) or not path.endswith(('.pkl', '.artifact')):
+            raise ValueError(f"Le modèle doit être un fichier .pkl ou un artefact .artifact de {MODELS_DIR}")
+        if not os.path.exists(_signature_file(path)):
+            raise FileNotFoundError(f"Modèle introuvable: {model_path}")
+        return path
+
+    def request_reload(self, model_path: str = None) -> Dict[str, Any]:
+        if model_path:
+            # Le pointeur partagé propage le choix aux autres workers
+            path = self.resolve(model_path)
+            data = json.dumps({'model_path': path, 'requested_at': datetime.now().isoformat()})
+            with open(self.pointer_path + '.tmp', 'w') as f:
+                f.write(data)
+            os.replace(self.pointer_path + '.tmp', self.pointer_path)
+        self._failed = None
+        self._force = True
+        self.start()
+        self._wake.set()
+        return self.status()
+
+    def _target_path(self) -> Optional[str]:
+        try:
+            with open(self.pointer_path) as f:
+                return json.load(f)['model_path']
+        except (OSError, ValueError, KeyError):
+            return self.predictor.model_path
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval if self.interval > 0 else None)
+            self._wake.clear()
+            force, self._force = self._force, False
+            try:
+                self.check(force)
+            except Exception as e:
+                logger.error(f"Surveillance du modèle: {str(e)}")
+
+    def check(self, force: bool = False):
+        path = self._target_path()
+        model = self.predictor.model
+        if not path or not os.path.exists(_signature_file(path)):
+            return
+        stat = os.stat(_signature_file(path))
+        signature = (path, stat.st_size, stat.st_mtime_ns)
+        unchanged = model is not None and (model.path, *model.stat) == signature
+        if (unchanged and not force) or (signature == self._failed and not force):
+            return
+        self._reload(path, signature)
+
+    def _reload(self, path: str, signature: tuple):
+        previous = self.predictor.model_info.get('model_version')
+        started = time.monotonic()
+        self._status = {'state': 'reloading', 'model_path': path, 'started_at': datetime.now().isoformat()}
+        logger.info(f"Rechargement du modèle depuis {path}")
+        success = self.predictor.load_model(path)
+        self._failed = None if success else signature
+        self._status = {
+            'state': 'succeeded' if success else 'failed',
+            'model_path': path,
+            'previous_version': previous,
+            'model_version': self.predictor.model_info.get('model_version'),
+            'duration_s': round(time.monotonic() - started, 3),
+            'finished_at': datetime.now().isoformat()
+        }
+        if not success:
+            self._status['error'] = "Chargement ou validation du nouveau modèle en échec, modèle précédent conservé"
+
+    def status(self) -> Dict[str, Any]:
+        return {**self._status, 'watch_interval_s': self.interval, 'pid': os.getpid()}
+
+
+model_watcher = ModelWatcher()
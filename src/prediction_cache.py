@@ -0,0 +1,230 @@
+"""
+Cache des résultats de prédiction partagé entre les workers Gunicorn (désactivé par défaut,
+PREDICTION_CACHE_ENABLED=1 pour l'activer).
+
+La table est stockée dans un fichier SQLite local (mode WAL) : tous les processus d'un
+même conteneur la lisent et l'écrivent. Éviction LRU, expiration (TTL) et invalidation
+automatique lorsque le modèle chargé change (empreinte du fichier dans la clé).
+
+Une lecture est un simple SELECT, sans verrou d'écriture. Les dates d'accès (LRU) et les
+compteurs sont accumulés en mémoire par processus et écrits en une transaction, avec
+l'insertion suivante ou au plus tard toutes les FLUSH_EVERY lectures / FLUSH_INTERVAL secondes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join('/tmp' if os.path.exists('/tmp') else os.path.dirname(__file__),
+                                  'prediction_cache.db')
+
+# L'éviction LRU est appliquée toutes les PRUNE_EVERY insertions : la table peut
+# dépasser max_entries d'au plus PRUNE_EVERY lignes entre deux passes.
+PRUNE_EVERY = 64
+
+# Dates d'accès et compteurs en attente d'écriture, par processus
+FLUSH_EVERY = 256
+FLUSH_INTERVAL = 5.0
+
+STAT_NAMES = ('hits', 'misses', 'evictions', 'expirations')
+
+
+class PredictionCache:
+    def __init__(self, feature_names: List[str], path: str = None,
+                 max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.feature_names = list(feature_names)
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.model_version = None
+        self._local = threading.local()
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._touches: Dict[str, float] = {}
+        self._counters = dict.fromkeys(STAT_NAMES, 0)
+        self._last_flush = time.monotonic()
+        self._pid = os.getpid()
+        self._init_schema()
+
+    @classmethod
+    def from_env(cls, feature_names: List[str]) -> Optional['PredictionCache']:
+        if os.environ.get('PREDICTION_CACHE_ENABLED', '0').lower() not in ('1', 'true', 'yes'):
+            return None
+        try:
+            return cls(
+                feature_names,
+                path=os.environ.get('PREDICTION_CACHE_PATH'),
+                max_entries=int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', 10000)),
+                ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+            )
+        except Exception as e:
+            logger.warning(f"Cache de prédiction désactivé: {str(e)}")
+            return None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Une connexion par thread (workers gthread) et par processus
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.execute('''CREATE TABLE IF NOT EXISTS predictions (
+            key TEXT PRIMARY KEY,
+            model_version TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_predictions_last_access ON predictions (last_access)')
+        conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        conn.executemany('INSERT OR IGNORE INTO stats (name, value) VALUES (?, 0)', [(n,) for n in STAT_NAMES])
+
+    def _key(self, data: Dict[str, Any], model_version: str = None) -> str:
+        # Tuple canonique : numériques en float, modalités en chaîne, dans l'ordre des features
+        canonical = [
+            float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else str(value)
+            for value in (data[f] for f in self.feature_names)
+        ]
+        digest = hashlib.sha1(json.dumps(canonical, separators=(',', ':')).encode()).hexdigest()
+        return f"{model_version or self.model_version}:{digest}"
+
+    def _bump(self, conn: sqlite3.Connection, name: str, amount: int = 1):
+        if amount:
+            conn.execute('UPDATE stats SET value = value + ? WHERE name = ?', (amount, name))
+
+    def set_model_version(self, model_version: str):
+        # Seules les entrées du modèle principal sortant sont purgées : celles des versions
+        # secondaires du registre (X-Model-Version) restent lues ; les autres expirent (TTL, LRU)
+        outgoing, self.model_version = self.model_version, model_version
+        if outgoing is None or outgoing == model_version:
+            return
+        try:
+            conn = self._connection()
+            deleted = conn.execute('DELETE FROM predictions WHERE model_version = ?', (outgoing,)).rowcount
+            if deleted:
+                logger.info(f"Cache de prédiction invalidé: {deleted} entrées du modèle {outgoing} supprimées")
+        except sqlite3.Error as e:
+            logger.warning(f"Invalidation du cache impossible: {str(e)}")
+
+    def _record(self, counter: str, key: str = None, now: float = None) -> bool:
+        # Accès et compteur notés en mémoire ; True quand il est temps de les écrire
+        with self._lock:
+            if self._pid != os.getpid():
+                # Processus forké : les accès en attente appartiennent au parent
+                self._touches, self._counters = {}, dict.fromkeys(STAT_NAMES, 0)
+                self._pid, self._last_flush = os.getpid(), time.monotonic()
+            self._counters[counter] += 1
+            if key is not None:
+                self._touches[key] = now
+            return (len(self._touches) >= FLUSH_EVERY or sum(self._counters.values()) >= FLUSH_EVERY
+                    or time.monotonic() - self._last_flush > FLUSH_INTERVAL)
+
+    def _flush(self, conn: sqlite3.Connection):
+        # À appeler dans une transaction d'écriture
+        with self._lock:
+            touches, self._touches = self._touches, {}
+            counters, self._counters = self._counters, dict.fromkeys(STAT_NAMES, 0)
+            self._last_flush = time.monotonic()
+        if touches:
+            conn.executemany('UPDATE predictions SET last_access = MAX(last_access, ?) WHERE key = ?',
+                             [(now, key) for key, now in touches.items()])
+        for name, amount in counters.items():
+            self._bump(conn, name, amount)
+
+    def flush(self):
+        try:
+            with self._transaction() as conn:
+                self._flush(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Écriture des accès au cache impossible: {str(e)}")
+
+    def get(self, data: Dict[str, Any], model_version: str = None) -> Optional[Dict[str, Any]]:
+        # model_version : modèle qui a servi la requête (il peut avoir été remplacé depuis).
+        # Lecture seule : une entrée expirée compte comme absente et sera remplacée par put
+        # ou supprimée par la prochaine passe d'éviction.
+        try:
+            key = self._key(data, model_version)
+            now = time.time()
+            row = self._connection().execute(
+                'SELECT result, created_at FROM predictions WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Lecture du cache impossible: {str(e)}")
+            return None
+        if row is not None and now - row[1] > self.ttl_seconds:
+            self._record('expirations')
+            row = None
+        if row is None:
+            # Une absence est suivie de put, qui écrit les compteurs en attente
+            self._record('misses')
+            return None
+        if self._record('hits', key, now):
+            self.flush()
+        return json.loads(row[0])
+
+    def put(self, data: Dict[str, Any], result: Dict[str, Any], model_version: str = None):
+        try:
+            now = time.time()
+            with self._transaction() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO predictions (key, model_version, result, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (self._key(data, model_version), model_version or self.model_version, json.dumps(result), now, now)
+                )
+                self._flush(conn)
+                self._inserts += 1
+                if self._inserts % PRUNE_EVERY == 0:
+                    self._prune(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Écriture dans le cache impossible: {str(e)}")
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        expired = conn.execute('DELETE FROM predictions WHERE created_at < ?', (now - self.ttl_seconds,)).rowcount
+        self._bump(conn, 'expirations', expired)
+        evicted = conn.execute(
+            'DELETE FROM predictions WHERE key IN ('
+            'SELECT key FROM predictions ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        ).rowcount
+        self._bump(conn, 'evictions', evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        # Les compteurs en attente de ce processus sont écrits avant la lecture
+        self.flush()
+        try:
+            conn = self._connection()
+            counters = dict(conn.execute('SELECT name, value FROM stats').fetchall())
+            entries = conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+        except sqlite3.Error as e:
+            return {'enabled': True, 'error': str(e)}
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        return {
+            'enabled': True,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            **{name: counters.get(name, 0) for name in STAT_NAMES},
+            'hit_rate': round(counters.get('hits', 0) / lookups, 4) if lookups else 0.0
+        }
@@ -1,93 +1,401 @@
 import os
+import json
+import time
 import joblib
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
-from typing import Dict, Any, Tuple
+import threading
+from typing import Dict, Any, List, Tuple
 from flask import Blueprint, request, jsonify
+from src.feature_encoder import CompiledFeatureEncoder
+from src.forest_engine import CompiledForest
+from src.explanations import TreeContributions
+from src.prediction_cache import PredictionCache
+from src.micro_batching import MicroBatcher
+from src.process_memory import memory_usage
+from src.metrics import metrics, stage
+from src.what_if import parse_sweeps, build_grid, PERCENT_INCOME
+from src.counterfactuals import parse_options, search_counterfactual, plain_value, TARGET_CLASS
+from src.model_artifact import is_artifact, load_artifact, file_digest, warm_up_records, resolve_model_path, MANIFEST
+from src.input_validation import (
+    NUMERIC_RULES, NUMERIC_TYPE_ERROR, CATEGORICAL_VALUES, canonical_value, categorical_error, is_number, validate_frame
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 prediction_bp = Blueprint('prediction', __name__)
 
+DEFAULT_PIPELINE_PATH = os.path.join(os.path.dirname(__file__), 'models', 'credit_risk_pipeline.pkl')
+
+
+def default_model_path() -> str:
+    # MODEL_PATH (pickle ou artefact), sinon l'artefact du pipeline par défaut s'il est à jour, sinon le pickle
+    return os.environ.get('MODEL_PATH') or resolve_model_path(DEFAULT_PIPELINE_PATH)
+
+# Moteurs d'inférence du classifieur : 'sklearn' (predict_proba natif) ou forêt compilée
+PREDICTION_ENGINES = {
+    'sklearn': None,
+    'compiled': np.float64,
+    'compiled-float32': np.float32
+}
+
+def decision_region(probability: np.ndarray) -> np.ndarray:
+    # Classe et niveau de confiance ne dépendent que de la région de la probabilité :
+    # [0, 0.2] (0, Élevé), ]0.2, 0.4] (0, Moyen), ]0.4, 0.5] (0, Faible),
+    # ]0.5, 0.6[ (1, Faible), [0.6, 0.8[ (1, Moyen), [0.8, 1] (1, Élevé)
+    return np.searchsorted((0.2, 0.4, 0.5), probability, side='left') + \
+        np.searchsorted((0.6, 0.8), probability, side='right')
+
+# Niveau de confiance de chaque région de decision_region
+REGION_CONFIDENCE = np.array(['Élevé', 'Moyen', 'Faible', 'Faible', 'Moyen', 'Élevé'], dtype=object)
+
+class LoadedModel:
+    # Un pipeline chargé et tout ce qui en dérive (encodeur compilé, forêt, empreinte).
+    # Immuable une fois construit : un rechargement en crée un nouveau puis remplace la
+    # référence du prédicteur d'un bloc, les requêtes en cours finissent sur l'ancien.
+    def __init__(self, pipeline, path: str, feature_names: List[str], engine: str,
+                 use_compiled_encoder: bool = True, mmap_dir: str = None):
+        self.pipeline = pipeline
+        self.path = path
+        self.stat = self.file_stat(path)
+        self.feature_names = feature_names
+        self.engine = engine
+        self.model_hash = self.file_digest(path)
+        self.encoder, self.forest = None, None
+        self.preprocessor, self.classifier = pipeline[:-1], pipeline.steps[-1][1]
+        self.classes_ = self.classifier.classes_
+        # Encodeur NumPy compilé à partir du ColumnTransformer ajusté ; repli sur le pipeline sinon
+        if use_compiled_encoder:
+            self.encoder = CompiledFeatureEncoder.from_pipeline(pipeline, feature_names)
+        if self.encoder is not None:
+            dtype = PREDICTION_ENGINES[self.engine]
+            if dtype is not None:
+                self.forest = CompiledForest.from_classifier(self.classifier, dtype=dtype)
+        if self.forest is not None and mmap_dir:
+            self._share_forest(mmap_dir)
+        self.explainer = self._build_explainer()
+        self.info = {
+            'model_name': self._get_model_name(),
+            # Version = empreinte du contenu : identique dans tous les workers pour un même fichier
+            'model_version': self.model_hash,
+            'model_hash': self.model_hash,
+            'model_path': path,
+            'model_format': 'joblib',
+            'features_count': len(feature_names),
+            'loaded_at': datetime.now().isoformat()
+        }
+
+    @classmethod
+    def load(cls, path: str, feature_names: List[str], engine: str, use_compiled_encoder: bool = True,
+             mmap_dir: str = None) -> 'LoadedModel':
+        if is_artifact(path):
+            return cls.from_artifact(path, feature_names)
+        return cls(joblib.load(path), path, feature_names, engine, use_compiled_encoder, mmap_dir)
+
+    @classmethod
+    def from_artifact(cls, path: str, feature_names: List[str]) -> 'LoadedModel':
+        # Artefact compact (src/model_artifact.py) : encodeur et forêt projetés en mémoire,
+        # aucun pickle ni objet sklearn ; la version est celle du pickle source
+        manifest, encoder, forest = load_artifact(path)
+        if sorted(manifest['feature_names']) != sorted(feature_names):
+            raise ValueError(f"Features de l'artefact incompatibles: {manifest['feature_names']}")
+        model = cls.__new__(cls)
+        model.pipeline, model.preprocessor, model.classifier = None, None, None
+        model.path = path
+        model.stat = cls.file_stat(path)
+        model.feature_names = feature_names
+        model.engine = 'compiled'
+        model.model_hash = manifest['model_hash']
+        model.encoder, model.forest = encoder, forest
+        model.classes_ = forest.classes_
+        model.explainer = model._build_explainer()
+        model.info = {
+            'model_name': manifest['model_name'],
+            'model_version': model.model_hash,
+            'model_hash': model.model_hash,
+            'model_path': path,
+            'model_format': f"artifact-v{manifest['format_version']}",
+            'features_count': len(feature_names),
+            'metrics': manifest['metrics'],
+            'loaded_at': datetime.now().isoformat()
+        }
+        return model
+
+    @staticmethod
+    def file_stat(path: str) -> Tuple[int, int]:
+        # Pour un artefact, le manifeste (écrit en dernier) fait foi
+        stat = os.stat(os.path.join(path, MANIFEST) if os.path.isdir(path) else path)
+        return stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        return file_digest(path)
+
+    def _share_forest(self, mmap_dir: str):
+        # Les tableaux de la forêt sont exportés une fois puis projetés en lecture seule :
+        # tous les workers lisent les mêmes pages. Les arbres sklearn sont conservés : le
+        # pipeline reste complet pour les replis, et les gros lots gardent le Tree.apply natif.
+        directory = os.path.join(mmap_dir, f"{self.model_hash}-{self.forest.dtype.name}")
+        try:
+            self.forest.save(directory)
+            self.forest = CompiledForest.load(directory, mmap_mode='r', classifier=self.classifier)
+            logger.info(f"Forêt compilée projetée en mémoire depuis {directory}")
+        except Exception as e:
+            logger.warning(f"Partage mmap de la forêt impossible, copie locale conservée: {str(e)}")
+
+    def _build_explainer(self):
+        # Contributions par nœud précalculées au chargement ; avec le moteur sklearn, la forêt
+        # compilée ne sert qu'aux explications (les arbres natifs sont partagés, pas copiés)
+        if self.encoder is None:
+            return None
+        forest = self.forest if self.forest is not None else CompiledForest.from_classifier(self.classifier)
+        return TreeContributions.build(forest, self.encoder.column_features(), self.feature_names)
+
+    @property
+    def has_split_thresholds(self) -> bool:
+        return self.encoder is not None and (self.forest is not None or self.explainer is not None)
+
+    def split_thresholds(self, field: str) -> np.ndarray:
+        # Seuils de décision de la forêt sur une variable numérique, en unités d'origine :
+        # entre deux seuils consécutifs, la prédiction ne dépend plus de cette variable
+        if not self.has_split_thresholds:
+            raise ValueError("Seuils de décision indisponibles (forêt d'arbres et encodeur compilé requis)")
+        forest = self.forest if self.forest is not None else self.explainer.forest
+        position, mean, scale = self.encoder.numeric_parameters(field)
+        splits = ~np.asarray(forest.is_leaf) & (np.asarray(forest.feature) == position)
+        return np.unique(np.asarray(forest.threshold)[splits].astype(np.float64) * scale + mean)
+
+    def _get_model_name(self) -> str:
+        if hasattr(self.pipeline, 'named_steps') and 'classifier' in self.pipeline.named_steps:
+            classifier = self.pipeline.named_steps['classifier']
+            return classifier.__class__.__name__
+        return type(self.pipeline).__name__
+
+    def warm_up(self, records: List[Dict[str, Any]]):
+        # Validation avant mise en service : chaque chemin (ligne seule, lot) doit produire
+        # des probabilités valides, sans quoi le modèle courant reste en place
+        predictions, probabilities = self.score_records(records)
+        single_prediction, single_probability = self.score_records(records[:1])
+        if len(probabilities) != len(records) or not np.all((probabilities >= 0) & (probabilities <= 1)):
+            raise ValueError("Probabilités invalides lors de la chauffe")
+        if not set(np.unique(predictions)) <= set(self.classes_):
+            raise ValueError("Classes prédites inconnues lors de la chauffe")
+        if abs(float(single_probability[0]) - float(probabilities[0])) > 1e-9:
+            raise ValueError("Résultats incohérents entre les chemins ligne seule et lot")
+        if self.explainer is not None:
+            _, explained, contributions = self.explain_records(records)
+            if np.abs(self.explainer.base_value + contributions.sum(axis=1) - explained).max() > 1e-9:
+                raise ValueError("Contributions incohérentes avec les probabilités lors de la chauffe")
+
+    def score_records(self, records: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        if self.encoder is not None:
+            with stage('preprocessing'):
+                features = self.encoder.transform_records(records)
+            return self.score_features(features)
+        with stage('frame'):
+            df = pd.DataFrame(records, columns=self.feature_names)
+        return self.score_pipeline(df)
+
+    def score_frame(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        if self.encoder is not None:
+            with stage('preprocessing'):
+                features = self.encoder.transform_frame(df)
+            return self.score_features(features)
+        return self.score_pipeline(df[self.feature_names])
+
+    def score_variants(self, base: Dict[str, Any], columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        # Grille de variantes d'un demandeur (src/what_if.py), en un seul appel au classifieur
+        if self.encoder is not None:
+            with stage('preprocessing'):
+                features = self.encoder.transform_variants(base, columns)
+            return self.score_features(features)
+        with stage('frame'):
+            n = len(next(iter(columns.values())))
+            df = pd.DataFrame({field: columns[field] if field in columns else [base[field]] * n
+                               for field in self.feature_names})
+        return self.score_pipeline(df)
+
+    def score_features(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scorer = self.forest if self.forest is not None else self.classifier
+        with stage('classifier'):
+            probabilities = scorer.predict_proba(features)
+        return self._split_probabilities(probabilities, scorer.classes_)
+
+    def explain_records(self, records: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self.explainer is None:
+            raise ValueError("Explications indisponibles pour ce modèle")
+        with stage('preprocessing'):
+            features = self.encoder.transform_records(records)
+        return self._explain(features)
+
+    def explain_frame(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self.explainer is None:
+            raise ValueError("Explications indisponibles pour ce modèle")
+        with stage('preprocessing'):
+            features = self.encoder.transform_frame(df)
+        return self._explain(features)
+
+    def _explain(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with stage('classifier'):
+            probabilities, contributions = self.explainer.explain(features)
+        return (*self._split_probabilities(probabilities, self.explainer.forest.classes_), contributions)
+
+    def score_pipeline(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        # Mêmes calculs que pipeline.predict_proba, étape par étape pour les mesurer séparément
+        with stage('preprocessing'):
+            features = self.preprocessor.transform(df)
+        with stage('classifier'):
+            probabilities = self.classifier.predict_proba(features)
+        return self._split_probabilities(probabilities, self.pipeline.classes_)
+
+    @staticmethod
+    def _split_probabilities(probabilities: np.ndarray, classes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # predict() se déduit de predict_proba : un seul passage dans le modèle
+        predictions = classes[np.argmax(probabilities, axis=1)]
+        prob_high_risk = probabilities[:, 1] if probabilities.shape[1] > 1 else probabilities[:, 0]
+        return predictions, prob_high_risk
+
 class CreditRiskPredictor:
-    def __init__(self, pipeline_path: str = None):
-        self.pipeline = None
-        self.model_info = {}
+    def __init__(self, pipeline_path: str = None, use_compiled_encoder: bool = True, engine: str = None):
+        self.model = None
+        self.use_compiled_encoder = use_compiled_encoder
+        # Répertoire où la forêt compilée est exportée puis projetée en mémoire (partagée entre processus)
+        self.mmap_dir = os.environ.get('MODEL_MMAP_DIR')
+        self.engine = engine or os.environ.get('PREDICTION_ENGINE', 'sklearn')
+        if self.engine not in PREDICTION_ENGINES:
+            logger.warning(f"Moteur d'inférence inconnu '{self.engine}', utilisation de 'sklearn'")
+            self.engine = 'sklearn'
         self.feature_names = [
             'person_age', 'person_income', 'person_emp_exp', 'loan_amnt',
             'loan_int_rate', 'loan_percent_income', 'cb_person_cred_hist_length',
             'credit_score', 'person_gender', 'person_education',
             'person_home_ownership', 'loan_intent', 'previous_loan_defaults_on_file'
         ]
+        self._load_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            # Un fork pendant un rechargement (thread de surveillance du maître) laisserait le verrou pris
+            os.register_at_fork(after_in_child=self._reset_load_lock)
+        self.cache = PredictionCache.from_env(self.feature_names)
+        self.batcher = MicroBatcher.from_env(self._score_records)
         if pipeline_path:
             self.load_model(pipeline_path)
         else:
             self.load_model()
 
+    def _reset_load_lock(self):
+        self._load_lock = threading.Lock()
+
+    # Accès au modèle courant (compatibilité : un seul objet LoadedModel est remplacé à chaque chargement)
+    @property
+    def pipeline(self):
+        return self.model.pipeline if self.model is not None else None
+
+    @property
+    def encoder(self):
+        return self.model.encoder if self.model is not None else None
+
+    @property
+    def forest(self):
+        return self.model.forest if self.model is not None else None
+
+    @property
+    def classifier(self):
+        return self.model.classifier if self.model is not None else None
+
+    @property
+    def model_path(self):
+        return self.model.path if self.model is not None else None
+
+    @property
+    def model_info(self) -> Dict[str, Any]:
+        return self.model.info if self.model is not None else {}
+
     def load_model(self, pipeline_path: str = None) -> bool:
+        # Chargement, compilation et chauffe du nouveau modèle pendant que l'ancien continue
+        # de servir ; la bascule est une simple affectation de self.model
         try:
             if pipeline_path is None:
-                pipeline_path = os.path.join(os.path.dirname(__file__), 'models', 'credit_risk_pipeline.pkl')
-            self.pipeline = joblib.load(pipeline_path)
-            self.model_info = {
-                'model_name': self._get_model_name(),
-                'model_version': '1.0',
-                'features_count': len(self.feature_names),
-                'loaded_at': datetime.now().isoformat()
-            }
-            logger.info(f"Modèle chargé avec succès: {self.model_info['model_name']}")
+                pipeline_path = default_model_path()
+            pipeline_path = os.path.realpath(pipeline_path)
+            with self._load_lock:
+                current = self.model
+                # Un seul chargement par processus : le même fichier, inchangé, n'est pas relu
+                if current is not None and pipeline_path == current.path and LoadedModel.file_stat(pipeline_path) == current.stat:
+                    logger.info(f"Modèle déjà chargé depuis {pipeline_path}, rechargement ignoré")
+                    return True
+
+                model = LoadedModel.load(pipeline_path, self.feature_names, self.engine,
+                                         self.use_compiled_encoder, self.mmap_dir)
+                model.warm_up(warm_up_records())
+                if current is not None and model.model_hash == current.model_hash and model.path == current.path:
+                    # Fichier réécrit à l'identique : on garde le modèle en service
+                    current.stat = model.stat
+                    logger.info(f"Contenu du modèle inchangé ({model.model_hash}), bascule inutile")
+                    return True
+                self.model = model
+
+            if self.cache is not None:
+                self.cache.set_model_version(model.model_hash)
+            metrics.set_gauge('credit_risk_model_info', {
+                'model_name': model.info['model_name'],
+                'model_version': model.info['model_version'],
+                'model_hash': model.model_hash
+            }, 1, exclusive=True)
+            if current is None:
+                logger.info(f"Modèle chargé avec succès: {model.info['model_name']} ({model.model_hash})")
+            else:
+                logger.info(f"Modèle remplacé à chaud: {current.model_hash} -> {model.model_hash} ({pipeline_path})")
             return True
         except Exception as e:
             logger.error(f"Erreur lors du chargement du pipeline: {str(e)}")
             return False
 
-    def _get_model_name(self) -> str:
-        if hasattr(self.pipeline, 'named_steps') and 'classifier' in self.pipeline.named_steps:
-            classifier = self.pipeline.named_steps['classifier']
-            return classifier.__class__.__name__
-        return type(self.pipeline).__name__
-
-    def validate_input(self, data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+    def validate_input(self, data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any], Dict[str, Any]]:
+        # Renvoie aussi la demande normalisée ('female' -> 'Female'), à scorer à la place de
+        # la demande reçue : mêmes variantes acceptées que par validate_frame pour les lots
         errors = {}
         missing_fields = [f for f in self.feature_names if f not in data]
         if missing_fields:
             errors['missing_fields'] = missing_fields
 
-        if 'person_age' in data and (not isinstance(data['person_age'], (int, float)) or not 18 <= data['person_age'] <= 100):
-            errors['person_age'] = "L'âge doit être entre 18 et 100 ans"
-        if 'person_income' in data and (not isinstance(data['person_income'], (int, float)) or data['person_income'] <= 0):
-            errors['person_income'] = "Le revenu doit être positif"
-        if 'credit_score' in data and (not isinstance(data['credit_score'], (int, float)) or not 300 <= data['credit_score'] <= 850):
-            errors['credit_score'] = "Le score de crédit doit être entre 300 et 850"
-        if 'loan_amnt' in data and (not isinstance(data['loan_amnt'], (int, float)) or data['loan_amnt'] <= 0):
-            errors['loan_amnt'] = "Le montant du prêt doit être positif"
-        if 'loan_int_rate' in data and (not isinstance(data['loan_int_rate'], (int, float)) or not 0 <= data['loan_int_rate'] <= 50):
-            errors['loan_int_rate'] = "Le taux d'intérêt doit être entre 0 et 50%"
-
-        categorical_validations = {
-            'person_gender': ['Male', 'Female'],
-            'person_education': ['High School', 'Bachelor', 'Master', 'Doctorate'],
-            'person_home_ownership': ['RENT', 'OWN', 'MORTGAGE', 'OTHER'],
-            'loan_intent': ['PERSONAL', 'EDUCATION', 'MEDICAL', 'VENTURE', 'HOMEIMPROVEMENT', 'DEBTCONSOLIDATION'],
-            'previous_loan_defaults_on_file': ['No', 'Yes']
-        }
+        for field in self.feature_names:
+            if field not in data or field in CATEGORICAL_VALUES:
+                continue
+            # Même contrôle que validate_frame, y compris pour les champs sans règle de plage
+            if not is_number(data[field]):
+                errors[field] = NUMERIC_RULES[field][1] if field in NUMERIC_RULES else NUMERIC_TYPE_ERROR
+            elif field in NUMERIC_RULES and not NUMERIC_RULES[field][0](data[field]):
+                errors[field] = NUMERIC_RULES[field][1]
+
+        record = dict(data)
+        for field in CATEGORICAL_VALUES:
+            if field in data:
+                record[field] = canonical_value(field, data[field])
+                if record[field] is None:
+                    errors[field] = categorical_error(field)
 
-        for field, valid in categorical_validations.items():
-            if field in data and data[field] not in valid:
-                errors[field] = f"Valeur invalide. Valeurs acceptées: {', '.join(valid)}"
+        return len(errors) == 0, errors, record
 
-        return len(errors) == 0, errors
+    def validate_batch(self, data) -> Tuple[pd.DataFrame, np.ndarray, Dict[int, Dict[str, Any]]]:
+        # Validation colonne par colonne : renvoie le lot normalisé, le masque des lignes
+        # valides et le rapport d'erreurs par position de ligne
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data, columns=self.feature_names)
+        return validate_frame(df, self.feature_names)
 
-    def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        start_time = datetime.now()
+    def predict(self, data: Dict[str, Any], model: LoadedModel = None) -> Dict[str, Any]:
+        start_time = time.perf_counter()
+        # Modèle figé pour toute la requête : un rechargement à chaud ne l'affecte pas.
+        # Une autre version du registre peut être imposée (routage par requête).
+        model = model or self.model
         try:
-            if self.pipeline is None:
+            if model is None:
                 raise ValueError("Pipeline non chargé")
 
-            is_valid, validation_errors = self.validate_input(data)
+            with stage('validation'):
+                is_valid, validation_errors, data = self.validate_input(data)
             if not is_valid:
                 return {
                     'status': 'error',
@@ -97,25 +405,24 @@ class CreditRiskPredictor:
                     'timestamp': datetime.now().isoformat()
                 }
 
-            df = pd.DataFrame([data])
-            df = df[self.feature_names]
-            prediction = self.pipeline.predict(df)[0]
-            probability = self.pipeline.predict_proba(df)[0]
-            prob_high_risk = probability[1] if len(probability) > 1 else probability[0]
-            confidence_level = self._get_confidence_level(prob_high_risk)
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            # Les demandes identiques (relances, rafraîchissements) sont servies par le cache partagé
+            with stage('cache'):
+                prediction = self.cache.get(data, model.model_hash) if self.cache is not None else None
+            if prediction is None:
+                scored = self._score_one(data, model)
+                with stage('serialization'):
+                    prediction = self._format_prediction(*scored)
+                if self.cache is not None:
+                    with stage('cache'):
+                        self.cache.put(data, prediction, model.model_hash)
+            processing_time = (time.perf_counter() - start_time) * 1000
 
             return {
                 'status': 'success',
-                'prediction': {
-                    'risk_class': int(prediction),
-                    'risk_label': 'Risque élevé' if prediction == 1 else 'Faible risque',
-                    'probability_score': round(float(prob_high_risk), 4),
-                    'confidence_level': confidence_level
-                },
+                'prediction': prediction,
                 'model_info': {
-                    'model_name': self.model_info.get('model_name', 'Unknown'),
-                    'model_version': self.model_info.get('model_version', '1.0'),
+                    'model_name': model.info['model_name'],
+                    'model_version': model.info['model_version'],
                     'features_used': len(self.feature_names)
                 },
                 'timestamp': datetime.now().isoformat(),
@@ -132,30 +439,375 @@ class CreditRiskPredictor:
                 'timestamp': datetime.now().isoformat()
             }
 
+    def explain(self, data: Dict[str, Any], model: LoadedModel = None) -> Dict[str, Any]:
+        # Prédiction et contributions par feature en un seul parcours de la forêt (sans cache ni micro-batching)
+        start_time = time.perf_counter()
+        model = model or self.model
+        try:
+            if model is None:
+                raise ValueError("Pipeline non chargé")
+
+            with stage('validation'):
+                is_valid, validation_errors, data = self.validate_input(data)
+            if not is_valid:
+                return {
+                    'status': 'error',
+                    'error_code': 'VALIDATION_ERROR',
+                    'message': "Données d'entrée invalides",
+                    'details': validation_errors,
+                    'timestamp': datetime.now().isoformat()
+                }
+
+            predictions, probabilities, contributions = model.explain_records([data])
+            with stage('serialization'):
+                prediction = self._format_prediction(predictions[0], probabilities[0])
+                explanation = self._format_explanation(model, contributions[0])
+            processing_time = (time.perf_counter() - start_time) * 1000
+
+            return {
+                'status': 'success',
+                'prediction': prediction,
+                'explanation': explanation,
+                'model_info': {
+                    'model_name': model.info['model_name'],
+                    'model_version': model.info['model_version'],
+                    'features_used': len(self.feature_names)
+                },
+                'timestamp': datetime.now().isoformat(),
+                'processing_time_ms': round(processing_time, 2)
+            }
+
+        except Exception as e:
+            logger.error(f"Erreur lors de l'explication: {str(e)}")
+            return {
+                'status': 'error',
+                'error_code': 'EXPLANATION_ERROR',
+                'message': "Erreur lors de l'explication",
+                'details': {'error': str(e)},
+                'timestamp': datetime.now().isoformat()
+            }
+
+    def what_if(self, data: Dict[str, Any], sweeps: Any, model: LoadedModel = None,
+                link_percent_income: bool = True) -> Dict[str, Any]:
+        # Courbe (une variable) ou surface (deux variables) de probabilité autour d'un demandeur,
+        # toute la grille en un seul appel au modèle (src/what_if.py)
+        start_time = time.perf_counter()
+        model = model or self.model
+        try:
+            if model is None:
+                raise ValueError("Pipeline non chargé")
+
+            with stage('validation'):
+                is_valid, validation_errors, data = self.validate_input(data)
+                parsed, sweep_errors = parse_sweeps(sweeps, self.feature_names) if is_valid else ([], {})
+            if not is_valid or sweep_errors:
+                return {
+                    'status': 'error',
+                    'error_code': 'VALIDATION_ERROR' if not is_valid else 'INVALID_SWEEP',
+                    'message': "Données d'entrée invalides" if not is_valid else 'Balayage invalide',
+                    'details': validation_errors or sweep_errors,
+                    'timestamp': datetime.now().isoformat()
+                }
+
+            columns, derived = build_grid(data, parsed, link_percent_income)
+            predictions, probabilities = model.score_variants(data, columns)
+            shape = [len(values) for _, values in parsed]
+            with stage('serialization'):
+                grid_probabilities = probabilities[1:]
+                sweep = {
+                    'fields': [field for field, _ in parsed],
+                    'values': {field: values.tolist() for field, values in parsed},
+                    'shape': shape,
+                    'points': len(grid_probabilities),
+                    'derived_fields': derived,
+                    'probability_score': grid_probabilities.round(4).reshape(shape).tolist(),
+                    'risk_class': predictions[1:].astype(int).reshape(shape).tolist(),
+                    'confidence_level': REGION_CONFIDENCE[decision_region(grid_probabilities)].reshape(shape).tolist()
+                }
+                base_prediction = self._format_prediction(predictions[0], probabilities[0])
+            processing_time = (time.perf_counter() - start_time) * 1000
+
+            return {
+                'status': 'success',
+                'base_prediction': base_prediction,
+                'sweep': sweep,
+                'model_info': {
+                    'model_name': model.info['model_name'],
+                    'model_version': model.info['model_version'],
+                    'features_used': len(self.feature_names)
+                },
+                'timestamp': datetime.now().isoformat(),
+                'processing_time_ms': round(processing_time, 2)
+            }
+
+        except Exception as e:
+            logger.error(f"Erreur lors de l'analyse what-if: {str(e)}")
+            return {
+                'status': 'error',
+                'error_code': 'PREDICTION_ERROR',
+                'message': "Erreur lors de l'analyse what-if",
+                'details': {'error': str(e)},
+                'timestamp': datetime.now().isoformat()
+            }
+
+    def counterfactual(self, data: Dict[str, Any], fields: List[str] = None, model: LoadedModel = None,
+                       time_budget_ms: float = None, link_percent_income: bool = True) -> Dict[str, Any]:
+        # Plus petit changement de montant, taux ou ratio prêt/revenu menant à « Faible risque »
+        # (src/counterfactuals.py), dans la limite du budget de temps
+        start_time = time.perf_counter()
+        model = model or self.model
+        try:
+            if model is None:
+                raise ValueError("Pipeline non chargé")
+
+            with stage('validation'):
+                is_valid, validation_errors, data = self.validate_input(data)
+                fields, budget_ms, option_errors = parse_options(fields, time_budget_ms)
+            if not is_valid or option_errors:
+                return {
+                    'status': 'error',
+                    'error_code': 'VALIDATION_ERROR' if not is_valid else 'INVALID_PARAMETERS',
+                    'message': "Données d'entrée invalides" if not is_valid else 'Paramètres de recherche invalides',
+                    'details': validation_errors or option_errors,
+                    'timestamp': datetime.now().isoformat()
+                }
+
+            # Ratio lié au montant : il suit loan_amnt au lieu d'être cherché séparément
+            linked = link_percent_income and 'loan_amnt' in fields
+            searched = [field for field in fields if not (linked and field == PERCENT_INCOME)]
+            predictions, probabilities = model.score_records([data])
+            current = self._format_prediction(predictions[0], probabilities[0])
+            found, stats = None, {'candidates': 0, 'candidates_scored': 0, 'iterations': 0, 'exhausted': False}
+            if predictions[0] != TARGET_CLASS:
+                found, stats = search_counterfactual(model, data, searched, linked, start_time + budget_ms / 1000)
+
+            counterfactual = None
+            if found is not None:
+                counterfactual = {
+                    'changes': {
+                        field: {
+                            'from': data[field],
+                            'to': plain_value(field, value),
+                            'delta': plain_value(field, value - float(data[field]))
+                        }
+                        for field, value in found['values'].items() if value != float(data[field])
+                    },
+                    'cost': round(found['cost'], 4),
+                    'prediction': self._format_prediction(found['prediction'], found['probability'])
+                }
+            processing_time = (time.perf_counter() - start_time) * 1000
+
+            return {
+                'status': 'success',
+                'already_low_risk': bool(predictions[0] == TARGET_CLASS),
+                'current_prediction': current,
+                'counterfactual': counterfactual,
+                'search': {
+                    'fields': searched,
+                    'derived_fields': [PERCENT_INCOME] if linked else [],
+                    'time_budget_ms': budget_ms,
+                    **stats
+                },
+                'model_info': {
+                    'model_name': model.info['model_name'],
+                    'model_version': model.info['model_version'],
+                    'features_used': len(self.feature_names)
+                },
+                'timestamp': datetime.now().isoformat(),
+                'processing_time_ms': round(processing_time, 2)
+            }
+
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche contrefactuelle: {str(e)}")
+            return {
+                'status': 'error',
+                'error_code': 'PREDICTION_ERROR',
+                'message': 'Erreur lors de la recherche contrefactuelle',
+                'details': {'error': str(e)},
+                'timestamp': datetime.now().isoformat()
+            }
+
+    def predict_batch(self, records: List[Dict[str, Any]], model: LoadedModel = None,
+                      explain: bool = False) -> Dict[str, Any]:
+        start_time = time.perf_counter()
+        model = model or self.model
+        try:
+            if model is None:
+                raise ValueError("Pipeline non chargé")
+
+            # Les lignes invalides reçoivent leur propre erreur sans bloquer le reste du lot
+            results: List[Dict[str, Any]] = [None] * len(records)
+            row_indices = []
+            for index, data in enumerate(records):
+                if isinstance(data, dict):
+                    row_indices.append(index)
+                else:
+                    results[index] = {
+                        'index': index,
+                        'status': 'error',
+                        'error_code': 'INVALID_ROW',
+                        'message': 'Chaque demandeur doit être un objet JSON',
+                        'details': {}
+                    }
+
+            succeeded = 0
+            if row_indices:
+                with stage('frame'):
+                    df = pd.DataFrame([records[i] for i in row_indices], columns=self.feature_names)
+                chunk_results = self.predict_chunk(df, model=model, explain=explain)
+                for result in chunk_results:
+                    result['index'] = row_indices[result['index']]
+                    results[result['index']] = result
+                succeeded = sum(1 for result in chunk_results if result['status'] == 'success')
+
+            processing_time = (time.perf_counter() - start_time) * 1000
+            return {
+                'status': 'success',
+                'results': results,
+                'summary': {
+                    'total': len(records),
+                    'succeeded': succeeded,
+                    'failed': len(records) - succeeded
+                },
+                'model_info': {
+                    'model_name': model.info['model_name'],
+                    'model_version': model.info['model_version'],
+                    'features_used': len(self.feature_names)
+                },
+                'timestamp': datetime.now().isoformat(),
+                'processing_time_ms': round(processing_time, 2)
+            }
+
+        except Exception as e:
+            logger.error(f"Erreur lors de la prédiction par lot: {str(e)}")
+            return {
+                'status': 'error',
+                'error_code': 'PREDICTION_ERROR',
+                'message': 'Erreur lors de la prédiction par lot',
+                'details': {'error': str(e)},
+                'timestamp': datetime.now().isoformat()
+            }
+
+    def predict_chunk(self, df: pd.DataFrame, start_index: int = 0, model: LoadedModel = None,
+                      explain: bool = False) -> List[Dict[str, Any]]:
+        # Résultat par ligne d'un bloc déjà tabulaire (lot JSON, morceau de CSV / NDJSON) :
+        # validation vectorisée puis un seul predict_proba pour les lignes valides
+        model = model or self.model
+        with stage('validation'):
+            df, valid_mask, validation_errors = self.validate_batch(df)
+        results: List[Dict[str, Any]] = [None] * len(df)
+        for position, errors in validation_errors.items():
+            results[position] = {
+                'index': start_index + position,
+                'status': 'error',
+                'error_code': 'VALIDATION_ERROR',
+                'message': "Données d'entrée invalides",
+                'details': errors
+            }
+        if valid_mask.any() and explain:
+            predictions, probabilities, contributions = model.explain_frame(df[valid_mask])
+            with stage('serialization'):
+                for position, prediction, prob_high_risk, row in zip(np.flatnonzero(valid_mask), predictions,
+                                                                     probabilities, contributions):
+                    results[position] = {
+                        'index': start_index + int(position),
+                        'status': 'success',
+                        'prediction': self._format_prediction(prediction, prob_high_risk),
+                        'explanation': self._format_explanation(model, row)
+                    }
+        elif valid_mask.any():
+            predictions, probabilities = model.score_frame(df[valid_mask])
+            with stage('serialization'):
+                for position, prediction, prob_high_risk in zip(np.flatnonzero(valid_mask), predictions, probabilities):
+                    results[position] = {
+                        'index': start_index + int(position),
+                        'status': 'success',
+                        'prediction': self._format_prediction(prediction, prob_high_risk)
+                    }
+        return results
+
+    def predict_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Variante colonnaire de predict_chunk pour le scoring hors ligne : aucun dict par ligne,
+        # les lignes invalides gardent des valeurs vides et leur rapport d'erreurs en JSON
+        model = self.model
+        df, valid_mask, validation_errors = self.validate_batch(df)
+        risk_class = np.zeros(len(df), dtype=np.int64)
+        probability = np.full(len(df), np.nan)
+        if valid_mask.any():
+            risk_class[valid_mask], probability[valid_mask] = model.score_frame(df[valid_mask])
+        confidence = REGION_CONFIDENCE[decision_region(probability)]
+        confidence[~valid_mask] = None
+        errors = np.full(len(df), None, dtype=object)
+        for position, details in validation_errors.items():
+            errors[position] = json.dumps(details, ensure_ascii=False)
+        return pd.DataFrame({
+            'risk_class': pd.arrays.IntegerArray(risk_class, ~valid_mask),
+            'probability_score': probability.round(4),
+            'confidence_level': confidence,
+            'validation_errors': errors
+        })
+
+    def _score_one(self, data: Dict[str, Any], model: LoadedModel) -> Tuple[Any, float]:
+        # Avec le micro-batching, les appels concurrents du worker partagent un même predict_proba
+        # (évalué par le modèle courant au moment du lot) ; les autres versions sont scorées directement
+        if self.batcher is not None and model is self.model:
+            return self.batcher.score(data)
+        predictions, probabilities = model.score_records([data])
+        return predictions[0], probabilities[0]
+
+    def _score_records(self, records: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        return self.model.score_records(records)
+
+    def _format_prediction(self, prediction: Any, prob_high_risk: float) -> Dict[str, Any]:
+        return {
+            'risk_class': int(prediction),
+            'risk_label': 'Risque élevé' if prediction == 1 else 'Faible risque',
+            'probability_score': round(float(prob_high_risk), 4),
+            'confidence_level': self._get_confidence_level(prob_high_risk)
+        }
+
+    def _format_explanation(self, model: LoadedModel, contributions: np.ndarray) -> Dict[str, Any]:
+        # Valeur de base (probabilité moyenne de la forêt) + somme des contributions = probability_score
+        names = model.explainer.feature_names
+        order = np.argsort(-np.abs(contributions), kind='stable')
+        return {
+            'base_value': round(model.explainer.base_value, 4),
+            'contributions': {names[i]: round(float(contributions[i]), 4) for i in order},
+            'top_risk_factors': [names[i] for i in order if contributions[i] > 0][:3],
+            'top_protective_factors': [names[i] for i in order if contributions[i] < 0][:3]
+        }
+
     def _get_confidence_level(self, probability: float) -> str:
-        if probability >= 0.8 or probability <= 0.2:
-            return "Élevé"
-        elif probability >= 0.6 or probability <= 0.4:
-            return "Moyen"
-        else:
-            return "Faible"
+        # Même découpage que decision_region (lots, what-if)
+        return REGION_CONFIDENCE[decision_region(probability)]
 
     def get_model_info(self) -> Dict[str, Any]:
-        if self.pipeline is None:
+        model = self.model
+        if model is None:
             return {'error': 'Aucun pipeline chargé'}
         return {
-            'model_name': self.model_info.get('model_name', 'Unknown'),
-            'model_version': self.model_info.get('model_version', '1.0'),
+            'model_name': model.info['model_name'],
+            'model_version': model.info['model_version'],
+            'model_hash': model.model_hash,
+            'model_path': model.path,
             'features': self.feature_names,
             'features_count': len(self.feature_names),
-            'loaded_at': self.model_info.get('loaded_at'),
+            'model_format': model.info['model_format'],
+            'loaded_at': model.info['loaded_at'],
+            'feature_encoder': 'compiled' if model.encoder is not None else 'pipeline',
+            'inference_engine': model.engine if model.forest is not None else 'sklearn',
+            'explanations': model.explainer is not None,
+            **({'metrics': model.info['metrics']} if model.info.get('metrics') else {}),
             'status': 'loaded'
         }
 
     def health_check(self) -> Dict[str, Any]:
         return {
-            'status': 'healthy' if self.pipeline else 'unhealthy',
-            'pipeline_loaded': self.pipeline is not None,
+            'status': 'healthy' if self.model is not None else 'unhealthy',
+            'pipeline_loaded': self.model is not None,
+            'prediction_cache': self.cache.stats() if self.cache is not None else {'enabled': False},
+            'micro_batching': self.batcher.stats() if self.batcher is not None else {'enabled': False},
+            'process': memory_usage(),
             'timestamp': datetime.now().isoformat()
         }
 
@@ -0,0 +1,110 @@
+"""
+Cache du prétraitement pour l'entraînement.
+
+Le ColumnTransformer est ajusté une seule fois par instantané de données : la clé est
+l'empreinte des jeux train/test (valeurs et cibles) et de la configuration du
+préprocesseur. Les matrices transformées sont écrites en .npy et relues par projection
+mémoire (mmap) : tous les candidats, dans tous les processus, et tous les plis de
+validation croisée lisent les mêmes pages sans refaire fit/transform.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get('PREPROCESSING_CACHE_DIR', '/tmp/credit_risk_preprocessing')
+
+ARRAY_NAMES = ('X_train', 'X_test', 'y_train', 'y_test')
+
+
+def data_key(preprocessor, X_train: pd.DataFrame, y_train: pd.Series, X_test: pd.DataFrame, y_test: pd.Series) -> str:
+    digest = hashlib.sha256()
+    for frame in (X_train, y_train, X_test, y_test):
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        columns = list(frame.columns) if isinstance(frame, pd.DataFrame) else [frame.name]
+        digest.update(json.dumps(columns).encode())
+    # Configuration (hyperparamètres, colonnes) et version de scikit-learn
+    digest.update(repr(preprocessor).encode())
+    digest.update(json.dumps(preprocessor.get_params(deep=False), default=repr, sort_keys=True).encode())
+    digest.update(sklearn.__version__.encode())
+    return digest.hexdigest()[:16]
+
+
+class PreparedData:
+    # Préprocesseur ajusté et matrices transformées en lecture seule (projetées en mémoire)
+    def __init__(self, directory: str, mmap_mode: Optional[str] = 'r'):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        self.key = self.manifest['key']
+        self.feature_names_out: List[str] = self.manifest['feature_names_out']
+        for name in ARRAY_NAMES:
+            setattr(self, name, np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode))
+
+    @property
+    def preprocessor(self):
+        return joblib.load(os.path.join(self.directory, 'preprocessor.pkl'))
+
+
+class PreprocessingCache:
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+
+    def prepare(self, preprocessor, X_train: pd.DataFrame, y_train: pd.Series,
+                X_test: pd.DataFrame, y_test: pd.Series) -> PreparedData:
+        key = data_key(preprocessor, X_train, y_train, X_test, y_test)
+        directory = os.path.join(self.directory, key)
+        if os.path.isdir(directory):
+            logger.info(f"Prétraitement en cache ({key}), ajustement évité")
+            return PreparedData(directory)
+
+        preprocessor.fit(X_train)
+        arrays = {
+            'X_train': self._dense(preprocessor.transform(X_train)),
+            'X_test': self._dense(preprocessor.transform(X_test)),
+            'y_train': np.asarray(y_train),
+            'y_test': np.asarray(y_test)
+        }
+        manifest = {
+            'key': key,
+            'feature_names_out': preprocessor.get_feature_names_out().tolist(),
+            'shapes': {name: list(array.shape) for name, array in arrays.items()},
+            'scikit_learn': sklearn.__version__,
+            'created_at': datetime.now().isoformat()
+        }
+        # Écriture dans un répertoire temporaire puis renommage atomique (exécutions concurrentes)
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.prep-')
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f'{name}.npy'), array)
+            joblib.dump(preprocessor, os.path.join(staging, 'preprocessor.pkl'))
+            with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(staging, directory)
+            logger.info(f"Prétraitement ajusté et mis en cache dans {directory}")
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(directory):
+                raise
+        return PreparedData(directory)
+
+    @staticmethod
+    def _dense(matrix) -> np.ndarray:
+        # Format dense float64 : projetable en mémoire tel quel (26 colonnes, matrice peu creuse)
+        if sparse.issparse(matrix):
+            matrix = matrix.toarray()
+        return np.ascontiguousarray(matrix, dtype=np.float64)
@@ -0,0 +1,60 @@
+"""
+Mesure de la mémoire d'un processus (RSS, PSS, part partagée / privée).
+
+Sous Linux, /proc/<pid>/smaps_rollup distingue les pages partagées entre workers
+(modèle préchargé par le maître Gunicorn, fichiers projetés en mémoire) des pages
+propres à chaque processus.
+"""
+
+import os
+from typing import Dict, Any, List, Optional
+
+_SMAPS_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Shared_Dirty': 'shared_dirty_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb',
+}
+
+
+def memory_usage(pid: Optional[int] = None) -> Dict[str, Any]:
+    pid = pid or os.getpid()
+    usage = {'pid': pid}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in _SMAPS_FIELDS:
+                    usage[_SMAPS_FIELDS[key]] = round(int(rest.split()[0]) / 1024, 1)
+        usage['shared_mb'] = round(usage.get('shared_clean_mb', 0) + usage.get('shared_dirty_mb', 0), 1)
+        usage['private_mb'] = round(usage.get('private_clean_mb', 0) + usage.get('private_dirty_mb', 0), 1)
+        return usage
+    except OSError:
+        pass
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    usage['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+        return usage
+    except OSError:
+        pass
+    if pid == os.getpid():
+        import resource
+        # ru_maxrss : pic de RSS (Ko sous Linux, octets sous macOS)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage['max_rss_mb'] = round(maxrss / (1024 * 1024 if os.uname().sysname == 'Darwin' else 1024), 1)
+    return usage
+
+
+def child_pids(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(c) for c in f.read().split())
+    except OSError:
+        pass
+    return sorted(set(children))
@@ -1,10 +1,49 @@
-from flask import Blueprint, request, jsonify
-from src.prediction_service import predictor
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import datetime
+import hmac
+import os
+from src.model_loader import model_loader
+from src.model_watcher import model_watcher
+from src.model_registry import model_registry
+from src.metrics import stage, begin_request, end_request, finish_request
+from src.api_reference import API_VERSION, MAX_BATCH_SIZE, FEATURE_DESCRIPTIONS, EXAMPLE_REQUEST
 import logging
 
 logger = logging.getLogger(__name__)
 prediction_bp = Blueprint('prediction', __name__)
 
+@prediction_bp.before_request
+def start_request_metrics():
+    begin_request()
+
+@prediction_bp.after_request
+def record_request_metrics(response):
+    error_code = ''
+    if response.status_code >= 400 and response.is_json:
+        error_code = (response.get_json(silent=True) or {}).get('error_code', '')
+    end_request(request.url_rule.rule if request.url_rule else request.path, response.status_code, error_code)
+    return response
+
+@prediction_bp.teardown_request
+def finish_request_metrics(exception):
+    finish_request()
+
+def unknown_model_version(version):
+    return jsonify({
+        'status': 'error',
+        'error_code': 'UNKNOWN_MODEL_VERSION',
+        'message': f'Version de modèle inconnue: {version}',
+        'details': {'available_versions': model_registry.versions()}
+    }), 400
+
+def model_not_ready():
+    return jsonify({
+        'status': 'error',
+        'error_code': 'MODEL_NOT_READY',
+        'message': 'Modèle en cours de chargement' if model_loader.state == 'loading' else 'Modèle indisponible',
+        'details': model_loader.status()
+    }), 503
+
 @prediction_bp.route('/predict', methods=['POST'])
 def predict_credit_risk():
     if not request.is_json:
@@ -22,10 +61,24 @@ def predict_credit_risk():
             'message': 'Corps de requête vide'
         }), 400
 
+    predictor = model_loader.predictor
+    if predictor is None:
+        return model_not_ready()
+
     try:
-        result = predictor.predict(data)
+        version = model_registry.route(request.headers.get('X-Model-Version'))
+    except KeyError:
+        return unknown_model_version(request.headers.get('X-Model-Version'))
+
+    try:
+        result = predictor.predict(data, model=model_registry.get(version))
         status_code = 200 if result['status'] == 'success' else 400
-        return jsonify(result), status_code
+        if result['status'] == 'success':
+            result['model_info']['version_name'] = version
+            model_registry.observe(version, [data], [result['prediction']])
+        with stage('serialization'):
+            response = jsonify(result)
+        return response, status_code
     except Exception as e:
         logger.error(f"Erreur dans l'endpoint /predict: {str(e)}")
         return jsonify({
@@ -35,15 +88,317 @@ def predict_credit_risk():
             'details': {'error': str(e)}
         }), 500
 
+@prediction_bp.route('/predict/batch', methods=['POST'])
+def predict_credit_risk_batch():
+    if not request.is_json:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_CONTENT_TYPE',
+            'message': 'Content-Type doit être application/json'
+        }), 400
+
+    data = request.get_json()
+    records = data.get('applicants') if isinstance(data, dict) else data
+    if not isinstance(records, list) or not records:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'EMPTY_REQUEST',
+            'message': 'Le corps doit contenir une liste non vide de demandeurs (ou {"applicants": [...]})'
+        }), 400
+
+    if len(records) > MAX_BATCH_SIZE:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'BATCH_TOO_LARGE',
+            'message': f'Le lot ne peut pas dépasser {MAX_BATCH_SIZE} demandeurs',
+            'details': {'received': len(records), 'max_batch_size': MAX_BATCH_SIZE}
+        }), 413
+
+    predictor = model_loader.predictor
+    if predictor is None:
+        return model_not_ready()
+
+    try:
+        version = model_registry.route(request.headers.get('X-Model-Version'))
+    except KeyError:
+        return unknown_model_version(request.headers.get('X-Model-Version'))
+
+    try:
+        result = predictor.predict_batch(records, model=model_registry.get(version))
+        status_code = 200 if result['status'] == 'success' else 400
+        if result['status'] == 'success':
+            result['model_info']['version_name'] = version
+            succeeded = [r for r in result['results'] if r['status'] == 'success']
+            model_registry.observe(version, [records[r['index']] for r in succeeded], [r['prediction'] for r in succeeded])
+        with stage('serialization'):
+            response = jsonify(result)
+        return response, status_code
+    except Exception as e:
+        logger.error(f"Erreur dans l'endpoint /predict/batch: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INTERNAL_ERROR',
+            'message': 'Erreur interne du serveur',
+            'details': {'error': str(e)}
+        }), 500
+
+def explanation_unavailable(version):
+    return jsonify({
+        'status': 'error',
+        'error_code': 'EXPLANATION_UNAVAILABLE',
+        'message': f"Explications indisponibles pour la version {version} (forêt d'arbres et encodeur compilé requis)"
+    }), 501
+
+@prediction_bp.route('/explain', methods=['POST'])
+def explain_credit_risk():
+    if not request.is_json:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_CONTENT_TYPE',
+            'message': 'Content-Type doit être application/json'
+        }), 400
+
+    data = request.get_json()
+    if not data:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'EMPTY_REQUEST',
+            'message': 'Corps de requête vide'
+        }), 400
+
+    predictor = model_loader.predictor
+    if predictor is None:
+        return model_not_ready()
+
+    try:
+        version = model_registry.route(request.headers.get('X-Model-Version'))
+    except KeyError:
+        return unknown_model_version(request.headers.get('X-Model-Version'))
+    model = model_registry.get(version)
+    if model.explainer is None:
+        return explanation_unavailable(version)
+
+    try:
+        result = predictor.explain(data, model=model)
+        status_code = 200 if result['status'] == 'success' else 400
+        if result['status'] == 'success':
+            result['model_info']['version_name'] = version
+        with stage('serialization'):
+            response = jsonify(result)
+        return response, status_code
+    except Exception as e:
+        logger.error(f"Erreur dans l'endpoint /explain: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INTERNAL_ERROR',
+            'message': 'Erreur interne du serveur',
+            'details': {'error': str(e)}
+        }), 500
+
+@prediction_bp.route('/explain/batch', methods=['POST'])
+def explain_credit_risk_batch():
+    if not request.is_json:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_CONTENT_TYPE',
+            'message': 'Content-Type doit être application/json'
+        }), 400
+
+    data = request.get_json()
+    records = data.get('applicants') if isinstance(data, dict) else data
+    if not isinstance(records, list) or not records:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'EMPTY_REQUEST',
+            'message': 'Le corps doit contenir une liste non vide de demandeurs (ou {"applicants": [...]})'
+        }), 400
+
+    if len(records) > MAX_BATCH_SIZE:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'BATCH_TOO_LARGE',
+            'message': f'Le lot ne peut pas dépasser {MAX_BATCH_SIZE} demandeurs',
+            'details': {'received': len(records), 'max_batch_size': MAX_BATCH_SIZE}
+        }), 413
+
+    predictor = model_loader.predictor
+    if predictor is None:
+        return model_not_ready()
+
+    try:
+        version = model_registry.route(request.headers.get('X-Model-Version'))
+    except KeyError:
+        return unknown_model_version(request.headers.get('X-Model-Version'))
+    model = model_registry.get(version)
+    if model.explainer is None:
+        return explanation_unavailable(version)
+
+    try:
+        result = predictor.predict_batch(records, model=model, explain=True)
+        status_code = 200 if result['status'] == 'success' else 400
+        if result['status'] == 'success':
+            result['model_info']['version_name'] = version
+        with stage('serialization'):
+            response = jsonify(result)
+        return response, status_code
+    except Exception as e:
+        logger.error(f"Erreur dans l'endpoint /explain/batch: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INTERNAL_ERROR',
+            'message': 'Erreur interne du serveur',
+            'details': {'error': str(e)}
+        }), 500
+
+@prediction_bp.route('/what-if', methods=['POST'])
+def what_if_sweep():
+    if not request.is_json:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_CONTENT_TYPE',
+            'message': 'Content-Type doit être application/json'
+        }), 400
+
+    data = request.get_json()
+    if not isinstance(data, dict) or not isinstance(data.get('applicant'), dict) or not data.get('sweeps'):
+        return jsonify({
+            'status': 'error',
+            'error_code': 'EMPTY_REQUEST',
+            'message': 'Le corps doit contenir {"applicant": {...}, "sweeps": [{"field": ..., "start": ..., "stop": ..., "step": ...}]}'
+        }), 400
+
+    predictor = model_loader.predictor
+    if predictor is None:
+        return model_not_ready()
+
+    try:
+        version = model_registry.route(request.headers.get('X-Model-Version'))
+    except KeyError:
+        return unknown_model_version(request.headers.get('X-Model-Version'))
+
+    try:
+        result = predictor.what_if(data['applicant'], data['sweeps'], model=model_registry.get(version),
+                                   link_percent_income=data.get('link_percent_income', True) is not False)
+        status_code = 200 if result['status'] == 'success' else 400
+        if result['status'] == 'success':
+            result['model_info']['version_name'] = version
+        with stage('serialization'):
+            response = jsonify(result)
+        return response, status_code
+    except Exception as e:
+        logger.error(f"Erreur dans l'endpoint /what-if: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INTERNAL_ERROR',
+            'message': 'Erreur interne du serveur',
+            'details': {'error': str(e)}
+        }), 500
+
+def counterfactual_unavailable(version):
+    return jsonify({
+        'status': 'error',
+        'error_code': 'COUNTERFACTUAL_UNAVAILABLE',
+        'message': f"Recherche contrefactuelle indisponible pour la version {version} (forêt d'arbres et encodeur compilé requis)"
+    }), 501
+
+@prediction_bp.route('/counterfactual', methods=['POST'])
+def counterfactual_search():
+    if not request.is_json:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_CONTENT_TYPE',
+            'message': 'Content-Type doit être application/json'
+        }), 400
+
+    data = request.get_json()
+    if not isinstance(data, dict) or not isinstance(data.get('applicant'), dict):
+        return jsonify({
+            'status': 'error',
+            'error_code': 'EMPTY_REQUEST',
+            'message': 'Le corps doit contenir {"applicant": {...}} (fields et time_budget_ms optionnels)'
+        }), 400
+
+    predictor = model_loader.predictor
+    if predictor is None:
+        return model_not_ready()
+
+    try:
+        version = model_registry.route(request.headers.get('X-Model-Version'))
+    except KeyError:
+        return unknown_model_version(request.headers.get('X-Model-Version'))
+    model = model_registry.get(version)
+    if not model.has_split_thresholds:
+        return counterfactual_unavailable(version)
+
+    try:
+        result = predictor.counterfactual(data['applicant'], fields=data.get('fields'), model=model,
+                                          time_budget_ms=data.get('time_budget_ms'),
+                                          link_percent_income=data.get('link_percent_income', True) is not False)
+        status_code = 200 if result['status'] == 'success' else 400
+        if result['status'] == 'success':
+            result['model_info']['version_name'] = version
+        with stage('serialization'):
+            response = jsonify(result)
+        return response, status_code
+    except Exception as e:
+        logger.error(f"Erreur dans l'endpoint /counterfactual: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INTERNAL_ERROR',
+            'message': 'Erreur interne du serveur',
+            'details': {'error': str(e)}
+        }), 500
+
+@prediction_bp.route('/predict/stream', methods=['POST'])
+def predict_credit_risk_stream():
+    # Import différé : pandas n'est chargé qu'avec le modèle (cf. src/model_loader.py)
+    from src.stream_scoring import INPUT_FORMATS, OUTPUT_MIMETYPES, open_input, score_stream, \
+        format_csv, format_ndjson, encode, negotiate_output
+
+    input_format = INPUT_FORMATS.get(request.mimetype)
+    if input_format is None:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'UNSUPPORTED_MEDIA_TYPE',
+            'message': 'Content-Type doit être text/csv ou application/x-ndjson',
+            'details': {'supported': sorted(INPUT_FORMATS)}
+        }), 415
+
+    predictor = model_loader.predictor
+    if predictor is None:
+        return model_not_ready()
+
+    output_format = negotiate_output(request.args.get('format'), request.headers.get('Accept', ''))
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    stream = open_input(request.stream, request.headers.get('Content-Encoding', ''))
+    results = score_stream(predictor, stream, input_format)
+    lines = format_csv(results) if output_format == 'csv' else format_ndjson(results)
+
+    response = Response(stream_with_context(encode(lines, compress=compress)), mimetype=OUTPUT_MIMETYPES[output_format])
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    return response
+
 @prediction_bp.route('/health', methods=['GET'])
 def health_check():
     try:
-        health_status = predictor.health_check()
+        predictor = model_loader.predictor
+        if predictor is not None:
+            health_status = predictor.health_check()
+        else:
+            # Liveness : le processus répond pendant le chargement ; seul un échec le rend « unhealthy »
+            health_status = {
+                'status': 'unhealthy' if model_loader.state == 'failed' else 'starting',
+                'pipeline_loaded': False,
+                'timestamp': datetime.now().isoformat()
+            }
         health_status.update({
-            'version': '1.0.0',
+            'model_loader': model_loader.status(),
+            'version': API_VERSION,
             'api_status': 'running'
         })
-        status_code = 200 if health_status['status'] == 'healthy' else 503
+        status_code = 503 if health_status['status'] == 'unhealthy' else 200
         return jsonify(health_status), status_code
     except Exception as e:
         logger.error(f"Erreur dans l'endpoint /health: {str(e)}")
@@ -53,8 +408,21 @@ def health_check():
             'details': {'error': str(e)}
         }), 500
 
+@prediction_bp.route('/ready', methods=['GET'])
+def readiness_check():
+    # Readiness : vert uniquement après chargement du modèle et prédiction de chauffe réussie
+    return jsonify({
+        'status': 'ready' if model_loader.ready else 'not_ready',
+        'model_loader': model_loader.status(),
+        'timestamp': datetime.now().isoformat()
+    }), 200 if model_loader.ready else 503
+
 @prediction_bp.route('/model/info', methods=['GET'])
 def get_model_info():
+    predictor = model_loader.predictor
+    if predictor is None:
+        return model_not_ready()
+
     try:
         model_info = predictor.get_model_info()
         if 'error' in model_info:
@@ -62,6 +430,7 @@ def get_model_info():
                 'status': 'error',
                 'message': model_info['error']
             }), 503
+        model_info['reload'] = model_watcher.status()
         return jsonify(model_info), 200
     except Exception as e:
         logger.error(f"Erreur dans l'endpoint /model/info: {str(e)}")
@@ -71,27 +440,67 @@ def get_model_info():
             'details': {'error': str(e)}
         }), 500
 
+@prediction_bp.route('/models', methods=['GET'])
+def list_models():
+    # Versions chargées, routage et comparaison avec la version fantôme (statistiques du worker courant)
+    if model_loader.predictor is None:
+        return model_not_ready()
+    return jsonify(model_registry.status()), 200
+
+def admin_forbidden():
+    # Endpoints d'administration désactivés tant que MODEL_ADMIN_TOKEN n'est pas défini
+    token = os.environ.get('MODEL_ADMIN_TOKEN')
+    provided = request.headers.get('X-Admin-Token', '')
+    if token and hmac.compare_digest(provided.encode(), token.encode()):
+        return None
+    return jsonify({
+        'status': 'error',
+        'error_code': 'FORBIDDEN',
+        'message': 'Jeton d\'administration absent ou invalide (en-tête X-Admin-Token)'
+    }), 403
+
+@prediction_bp.route('/admin/model/reload', methods=['POST'])
+def reload_model():
+    forbidden = admin_forbidden()
+    if forbidden is not None:
+        return forbidden
+    if model_loader.predictor is None:
+        return model_not_ready()
+
+    data = request.get_json(silent=True) or {}
+    try:
+        reload_status = model_watcher.request_reload(data.get('model_path'))
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_MODEL_PATH',
+            'message': str(e)
+        }), 400
+    # Chargement, validation et chauffe en arrière-plan ; les requêtes restent servies par le modèle courant
+    return jsonify({
+        'status': 'accepted',
+        'message': 'Rechargement du modèle lancé',
+        'current_model': model_loader.predictor.get_model_info().get('model_version'),
+        'reload': reload_status
+    }), 202
+
+@prediction_bp.route('/admin/model/reload', methods=['GET'])
+def reload_status():
+    forbidden = admin_forbidden()
+    if forbidden is not None:
+        return forbidden
+    return jsonify({
+        'reload': model_watcher.status(),
+        'model': model_loader.predictor.get_model_info() if model_loader.predictor else None
+    }), 200
+
 @prediction_bp.route('/features', methods=['GET'])
 def get_features():
     try:
         features_info = {
-            'features': predictor.feature_names,
-            'count': len(predictor.feature_names),
-            'description': {
-                'person_age': 'Âge (18-100)',
-                'person_income': 'Revenu annuel',
-                'person_emp_exp': 'Années d\'expérience',
-                'loan_amnt': 'Montant du prêt',
-                'loan_int_rate': 'Taux d\'intérêt (%)',
-                'loan_percent_income': 'Pourcentage revenu/prêt',
-                'cb_person_cred_hist_length': 'Historique crédit',
-                'credit_score': 'Score (300-850)',
-                'person_gender': 'Genre',
-                'person_education': 'Niveau d\'étude',
-                'person_home_ownership': 'Statut logement',
-                'loan_intent': 'Objet du prêt',
-                'previous_loan_defaults_on_file': 'Défauts précédents'
-            }
+            'features': list(FEATURE_DESCRIPTIONS),
+            'count': len(FEATURE_DESCRIPTIONS),
+            'description': FEATURE_DESCRIPTIONS
         }
         return jsonify(features_info), 200
     except Exception as e:
@@ -105,43 +514,7 @@ def get_features():
 @prediction_bp.route('/example', methods=['GET'])
 def get_example_request():
     try:
-        example = {
-            'description': 'Exemple de requête',
-            'endpoint': '/api/v1/predict',
-            'method': 'POST',
-            'headers': {
-                'Content-Type': 'application/json'
-            },
-            'body': {
-                "person_age": 30,
-                "person_income": 50000,
-                "person_emp_exp": 5,
-                "loan_amnt": 15000,
-                "loan_int_rate": 10.5,
-                "loan_percent_income": 0.3,
-                "cb_person_cred_hist_length": 7,
-                "credit_score": 680,
-                "person_gender": "Male",
-                "person_education": "Bachelor",
-                "person_home_ownership": "RENT",
-                "loan_intent": "PERSONAL",
-                "previous_loan_defaults_on_file": "No"
-            },
-            'expected_response': {
-                'status': 'success',
-                'prediction': {
-                    'risk_class': 0,
-                    'risk_label': 'Faible risque',
-                    'probability_score': 0.23,
-                    'confidence_level': 'Élevé'
-                },
-                'model_info': {
-                    'model_name': 'RandomForestClassifier',
-                    'model_version': '1.0',
-                    'features_used': 13
-                }
-            }
-        }
+        example = EXAMPLE_REQUEST
         return jsonify(example), 200
     except Exception as e:
         logger.error(f"Erreur dans l'endpoint /example: {str(e)}")
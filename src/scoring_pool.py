@@ -0,0 +1,100 @@
+"""
+Pool de processus de scoring pré-chauffés.
+
+Chaque processus du pool charge le pipeline une seule fois à son démarrage et exécute
+une prédiction de chauffe dans l'initialiseur, avant toute tâche (y compris un processus
+qui en remplace un autre) ; les appels sont ensuite distribués sur tous les cœurs sans
+bloquer la boucle d'événements du serveur ASGI.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from src.api_reference import EXAMPLE_REQUEST
+
+logger = logging.getLogger(__name__)
+
+_worker_predictor = None
+_worker_warm_up = None
+
+
+def _init_worker(pipeline_path: Optional[str]):
+    global _worker_predictor, _worker_warm_up
+    from src.prediction_service import predictor
+    if pipeline_path:
+        predictor.load_model(pipeline_path)
+    _worker_predictor = predictor
+    _worker_warm_up = predictor.predict(EXAMPLE_REQUEST['body'])['status']
+
+
+def _status() -> Dict[str, Any]:
+    return {
+        'pid': os.getpid(),
+        'warm_up': _worker_warm_up,
+        'model_info': _worker_predictor.get_model_info(),
+        'health': _worker_predictor.health_check()
+    }
+
+
+def _model_info() -> Dict[str, Any]:
+    return _worker_predictor.get_model_info()
+
+
+def _predict(data: Dict[str, Any]) -> Dict[str, Any]:
+    return _worker_predictor.predict(data)
+
+
+def _predict_batch(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return _worker_predictor.predict_batch(records)
+
+
+class ScoringPool:
+    def __init__(self, workers: int = None, pipeline_path: str = None):
+        self.workers = workers or int(os.environ.get('SCORING_WORKERS', 0)) or os.cpu_count() or 1
+        self.pipeline_path = pipeline_path
+        self.executor = None
+        self.worker_status: List[Dict[str, Any]] = []
+
+    def start(self) -> List[Dict[str, Any]]:
+        # 'spawn' : le serveur parent a déjà des threads (boucle d'événements), un fork serait fragile
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.pipeline_path,)
+        )
+        # Une tâche d'état par processus, soumises d'un coup pour forcer le démarrage de tous ;
+        # chacun est chauffé par l'initialiseur, même s'il ne reçoit aucune de ces tâches
+        futures = [self.executor.submit(_status) for _ in range(self.workers)]
+        self.worker_status = [f.result() for f in futures]
+        pids = sorted({status['pid'] for status in self.worker_status})
+        logger.info(f"Pool de scoring prêt: {len(pids)} processus ({', '.join(map(str, pids))})")
+        return self.worker_status
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._run(_predict, data)
+
+    async def predict_batch(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self._run(_predict_batch, records)
+
+    async def model_info(self) -> Dict[str, Any]:
+        # Demandé à un processus vivant : reflète un modèle rechargé depuis le démarrage
+        return await self._run(_model_info)
+
+    @property
+    def ready(self) -> bool:
+        return self.executor is not None and bool(self.worker_status) and all(
+            status['warm_up'] == 'success' for status in self.worker_status)
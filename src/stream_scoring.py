@@ -0,0 +1,172 @@
+"""
+Scoring en flux de fichiers CSV / NDJSON (même schéma que loan_data.csv).
+
+Le corps de la requête est lu par blocs de taille fixe ; chaque bloc passe par le chemin
+batch du prédicteur et ses résultats sont émis aussitôt (NDJSON ou CSV), éventuellement
+compressés en gzip au fil de l'eau. La mémoire reste bornée par la taille d'un bloc,
+quelle que soit la taille du fichier.
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from src.api_reference import FEATURE_DESCRIPTIONS
+from src.input_validation import coerce_numeric_text
+
+logger = logging.getLogger(__name__)
+
+FEATURES = list(FEATURE_DESCRIPTIONS)
+CHUNK_ROWS = int(os.environ.get('PREDICTION_STREAM_CHUNK_ROWS', 5000))
+
+INPUT_FORMATS = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/x-jsonlines': 'ndjson',
+}
+
+OUTPUT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CSV_COLUMNS = ['index', 'status', 'risk_class', 'risk_label', 'probability_score',
+               'confidence_level', 'error_code', 'details']
+
+
+def open_input(stream, content_encoding: str = ''):
+    # Les extractions peuvent être envoyées compressées (Content-Encoding: gzip)
+    if content_encoding.strip().lower() == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    return stream
+
+
+def iter_csv_chunks(stream, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[pd.DataFrame, List[Dict[str, Any]]]]:
+    for chunk in pd.read_csv(stream, chunksize=chunk_rows, skipinitialspace=True):
+        yield coerce_numeric_text(chunk, FEATURES), []
+
+
+def iter_ndjson_chunks(stream, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[pd.DataFrame, List[Dict[str, Any]]]]:
+    # Les lignes illisibles reçoivent leur erreur à leur position sans interrompre le flux
+    records, errors, position = [], [], 0
+    for line in io.TextIOWrapper(stream, encoding='utf-8'):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            records.append(record)
+        else:
+            records.append({})
+            errors.append({
+                'index': position,
+                'status': 'error',
+                'error_code': 'INVALID_ROW',
+                'message': 'Chaque ligne doit être un objet JSON',
+                'details': {}
+            })
+        position += 1
+        if len(records) == chunk_rows:
+            yield _records_frame(records), errors
+            records, errors = [], []
+    if records:
+        yield _records_frame(records), errors
+
+
+def _records_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    # Index explicite : un bloc de lignes vides ({}) garde son nombre de lignes
+    return pd.DataFrame(records, index=pd.RangeIndex(len(records)))
+
+
+def score_stream(predictor, stream, input_format: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[Dict[str, Any]]:
+    chunks = iter_csv_chunks(stream, chunk_rows) if input_format == 'csv' else iter_ndjson_chunks(stream, chunk_rows)
+    total = succeeded = 0
+    try:
+        for df, row_errors in chunks:
+            results = predictor.predict_chunk(df, start_index=total)
+            for error in row_errors:
+                results[error['index'] - total] = error
+            for result in results:
+                succeeded += result['status'] == 'success'
+                yield result
+            total += len(results)
+    except Exception as e:
+        # L'en-tête HTTP est déjà parti : l'erreur est signalée dans le flux lui-même
+        logger.error(f"Erreur lors du scoring en flux après {total} lignes: {str(e)}")
+        yield {'status': 'error', 'error_code': 'STREAM_ERROR', 'message': 'Lecture du flux interrompue',
+               'details': {'error': str(e), 'rows_read': total}}
+    yield {'status': 'complete', 'summary': {'total': total, 'succeeded': succeeded, 'failed': total - succeeded}}
+
+
+def format_ndjson(results: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for result in results:
+        yield json.dumps(result, ensure_ascii=False) + '\n'
+
+
+def format_csv(results: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for result in results:
+        if result['status'] == 'complete':
+            continue
+        prediction = result.get('prediction', {})
+        details = result.get('details')
+        writer.writerow([
+            result.get('index', ''), result['status'],
+            prediction.get('risk_class', ''), prediction.get('risk_label', ''),
+            prediction.get('probability_score', ''), prediction.get('confidence_level', ''),
+            result.get('error_code', ''), json.dumps(details, ensure_ascii=False) if details else ''
+        ])
+        # Vidage par bloc de résultats plutôt qu'à chaque ligne
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode(chunks: Iterator[str], compress: bool = False, flush_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    if not compress:
+        pending = []
+        size = 0
+        for chunk in chunks:
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= flush_bytes:
+                yield ''.join(pending).encode('utf-8')
+                pending, size = [], 0
+        if pending:
+            yield ''.join(pending).encode('utf-8')
+        return
+
+    # gzip (wbits=31) avec Z_SYNC_FLUSH : le client décompresse au fur et à mesure
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    size = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        size += len(chunk)
+        if size >= flush_bytes:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            size = 0
+        if data:
+            yield data
+    yield compressor.flush(zlib.Z_FINISH)
+
+
+def negotiate_output(requested: Optional[str], accept: str) -> str:
+    if requested in OUTPUT_MIMETYPES:
+        return requested
+    return 'csv' if 'text/csv' in accept else 'ndjson'
@@ -0,0 +1,213 @@
+"""
+Générateur vectorisé de demandeurs synthétiques (tests de charge et d'endurance, sans données réelles).
+
+Les données sont produites par blocs de taille fixe avec NumPy : la mémoire reste constante
+quel que soit le nombre de lignes, et chaque bloc est écrit avant que le suivant ne soit
+généré (CSV, NDJSON ou répertoire de fichiers Parquet, '-' pour la sortie standard).
+Par défaut, les distributions sont celles du script de démonstration (src/generate_models.py).
+Avec --match, elles reproduisent les distributions marginales de loan_data.csv (quantiles
+des numériques, fréquences des modalités). La cible loan_status suit les mêmes règles
+métier que le script de démonstration.
+
+Usage :
+    python -m src.synthetic_data --rows 10000000 --output synthetic.csv
+    python -m src.synthetic_data --rows 1000000 --match src/loan_data.csv --format ndjson --output -
+    python -m src.synthetic_data --rows 50000000 --output synthetic.parquet --chunk-rows 500000 --seed 7
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Dict, Any, Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.api_reference import FEATURE_DESCRIPTIONS
+from src.input_validation import CATEGORICAL_VALUES, validate_frame
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+TARGET = 'loan_status'
+COLUMNS = list(FEATURE_DESCRIPTIONS) + [TARGET]
+OUTPUT_FORMATS = ('csv', 'ndjson', 'parquet')
+
+# Niveaux de quantiles conservés par variable numérique (échantillonnage par CDF inverse)
+QUANTILE_LEVELS = np.linspace(0, 1, 1001)
+
+# Distributions du script de démonstration : bornes [basse, haute[ et arrondi
+DEMO_INTEGERS = {
+    'person_age': (18, 70),
+    'person_income': (15000, 150000),
+    'person_emp_exp': (0, 40),
+    'loan_amnt': (1000, 35000),
+    'cb_person_cred_hist_length': (0, 30),
+    'credit_score': (300, 850),
+}
+DEMO_FLOATS = {
+    'loan_int_rate': (5.0, 20.0, 2),
+    'loan_percent_income': (0.05, 0.7, 3),
+}
+DEMO_DEFAULT_PROBABILITY = 0.2
+
+
+def risk_probability(data) -> np.ndarray:
+    # Règles métier du script de démonstration, appliquées à des colonnes entières
+    credit_score = np.asarray(data['credit_score'])
+    percent_income = np.asarray(data['loan_percent_income'])
+    risk = np.full(len(credit_score), 0.3)
+    risk += np.where(credit_score < 600, 0.3, np.where(credit_score < 700, 0.1, 0.0))
+    risk += np.where(percent_income > 0.5, 0.2, np.where(percent_income > 0.3, 0.1, 0.0))
+    risk += np.where(np.asarray(data['previous_loan_defaults_on_file']) == 'Yes', 0.4, 0.0)
+    risk += np.where(np.asarray(data['person_age']) < 25, 0.1, 0.0)
+    risk += np.where(np.asarray(data['person_emp_exp']) < 2, 0.15, 0.0)
+    risk += np.where(np.asarray(data['loan_int_rate']) > 15, 0.1, 0.0)
+    return np.clip(risk, 0.05, 0.95)
+
+
+def fit_marginals(data_path: str, valid_only: bool = False) -> Dict[str, Any]:
+    # Profil des distributions marginales : quantiles et précision des numériques, fréquences
+    # des modalités. Avec valid_only, seules les lignes acceptées par l'API (normalisées) comptent.
+    df = pd.read_csv(data_path, usecols=list(FEATURE_DESCRIPTIONS))
+    if valid_only:
+        normalized, valid_mask, _ = validate_frame(df, list(FEATURE_DESCRIPTIONS))
+        df = normalized[valid_mask]
+    profile = {'rows': len(df), 'numeric': {}, 'categorical': {}}
+    for field in FEATURE_DESCRIPTIONS:
+        column = df[field].dropna()
+        if field in CATEGORICAL_VALUES:
+            frequencies = column.astype(str).value_counts(normalize=True)
+            profile['categorical'][field] = (frequencies.index.to_numpy(dtype=object), frequencies.to_numpy())
+            continue
+        values = column.to_numpy(dtype=np.float64)
+        decimals = next((d for d in range(5) if np.allclose(np.round(values, d), values)), 6)
+        profile['numeric'][field] = (np.quantile(values, QUANTILE_LEVELS), decimals)
+    return profile
+
+
+def generate_chunk(rng: np.random.Generator, rows: int, profile: Dict[str, Any] = None) -> pd.DataFrame:
+    data = {}
+    if profile is None:
+        for field, (low, high) in DEMO_INTEGERS.items():
+            data[field] = rng.integers(low, high, rows)
+        for field, (low, high, decimals) in DEMO_FLOATS.items():
+            data[field] = np.round(rng.uniform(low, high, rows), decimals)
+        for field, values in CATEGORICAL_VALUES.items():
+            if field == 'previous_loan_defaults_on_file':
+                data[field] = rng.choice(values, rows, p=[1 - DEMO_DEFAULT_PROBABILITY, DEMO_DEFAULT_PROBABILITY])
+            else:
+                data[field] = rng.choice(values, rows)
+    else:
+        for field, (quantiles, decimals) in profile['numeric'].items():
+            # CDF inverse interpolée entre quantiles : reproduit la forme de la distribution (queues comprises)
+            values = np.round(np.interp(rng.random(rows), QUANTILE_LEVELS, quantiles), decimals)
+            data[field] = values.astype(np.int64) if decimals == 0 else values
+        for field, (values, probabilities) in profile['categorical'].items():
+            data[field] = values[rng.choice(len(values), rows, p=probabilities)]
+    data[TARGET] = rng.binomial(1, risk_probability(data))
+    return pd.DataFrame(data, columns=COLUMNS)
+
+
+def generate(rows: int, seed: int = 42, chunk_rows: int = 100000, profile: Dict[str, Any] = None) -> Iterator[pd.DataFrame]:
+    # Un générateur indépendant par bloc (SeedSequence) : même graine et même taille de bloc,
+    # même sortie, sans dépendre de l'état du bloc précédent
+    seeds = np.random.SeedSequence(seed)
+    produced = 0
+    while produced < rows:
+        size = min(chunk_rows, rows - produced)
+        yield generate_chunk(np.random.default_rng(seeds.spawn(1)[0]), size, profile)
+        produced += size
+
+
+class ChunkWriter:
+    # CSV / NDJSON : un seul flux (fichier ou sortie standard), en-tête CSV écrit une fois.
+    # Parquet : un répertoire de fichiers part-NNNNN.parquet, un par bloc (comme src/batch_scoring.py).
+    def __init__(self, output_path: str, output_format: str):
+        self.output_path = output_path
+        self.output_format = output_format
+        self.chunks = 0
+        self._file = None
+        if output_format == 'parquet':
+            if output_path == '-':
+                raise ValueError("Le format Parquet nécessite un répertoire de sortie")
+            # Moteur Parquet (pyarrow, requirements-app.txt) vérifié avant de générer quoi que ce soit
+            pd.io.parquet.get_engine('auto')
+            os.makedirs(output_path, exist_ok=True)
+        else:
+            self._file = sys.stdout.buffer if output_path == '-' else open(output_path, 'wb')
+
+    def write(self, chunk: pd.DataFrame):
+        if self.output_format == 'csv':
+            self._file.write(chunk.to_csv(index=False, header=self.chunks == 0).encode('utf-8'))
+        elif self.output_format == 'ndjson':
+            self._file.write(chunk.to_json(orient='records', lines=True, force_ascii=False).encode('utf-8'))
+        else:
+            part = os.path.join(self.output_path, f'part-{self.chunks:05d}.parquet')
+            chunk.to_parquet(part + '.tmp', index=False)
+            os.replace(part + '.tmp', part)
+        self.chunks += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            if self._file is not sys.stdout.buffer:
+                self._file.close()
+
+
+def write_dataset(output_path: str, rows: int, output_format: str = None, seed: int = 42, chunk_rows: int = 100000,
+                  match_path: str = None, valid_only: bool = False) -> Dict[str, Any]:
+    output_format = output_format or next(
+        (fmt for fmt in OUTPUT_FORMATS if output_path.rstrip(os.sep).endswith('.' + fmt)), 'csv')
+    profile = fit_marginals(match_path, valid_only) if match_path else None
+    if profile is not None:
+        logger.info(f"Distributions marginales apprises sur {profile['rows']} lignes de {os.path.basename(match_path)}")
+
+    start = time.monotonic()
+    written, positives = 0, 0
+    writer = ChunkWriter(output_path, output_format)
+    try:
+        for chunk in generate(rows, seed, chunk_rows, profile):
+            writer.write(chunk)
+            written += len(chunk)
+            positives += int(chunk[TARGET].sum())
+            if writer.chunks % 10 == 0:
+                logger.info(f"{written} lignes générées ({written / (time.monotonic() - start):,.0f} lignes/s)")
+    finally:
+        writer.close()
+
+    elapsed = time.monotonic() - start
+    return {
+        'rows': written,
+        'high_risk_rate': round(positives / written, 4) if written else 0.0,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(written / elapsed) if elapsed else 0,
+        'output': output_path,
+        'format': output_format
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génération de demandeurs synthétiques (schéma de loan_data.csv)")
+    parser.add_argument('--rows', type=int, default=1000000, help='Nombre de lignes (défaut : 1 000 000)')
+    parser.add_argument('--output', required=True, help="Fichier CSV / NDJSON, répertoire Parquet, ou '-' (sortie standard)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, help="Déduit de l'extension par défaut (csv)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-rows', type=int, default=100000, help='Lignes par bloc (défaut : 100 000)')
+    parser.add_argument('--match', nargs='?', const=os.path.join(SRC_DIR, 'loan_data.csv'),
+                        help='Reproduire les distributions marginales de ce fichier (défaut : src/loan_data.csv)')
+    parser.add_argument('--valid-only', action='store_true',
+                        help="Avec --match : uniquement les modalités acceptées par l'API, normalisées")
+    args = parser.parse_args()
+
+    summary = write_dataset(args.output, args.rows, args.format, args.seed, args.chunk_rows, args.match, args.valid_only)
+    # Le résumé va sur stderr : la sortie standard peut porter les données
+    print(f"✅ {summary['rows']} lignes ({summary['high_risk_rate']:.1%} à risque élevé) en {summary['seconds']}s "
+          f"({summary['rows_per_second']:,} lignes/s) -> {summary['output']}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""
+Entraînement des modèles candidats (reprise du workflow notebook en point d'entrée réutilisable).
+
+Chaque candidat (régression logistique, forêt aléatoire, XGBoost si installé) est entraîné
+dans son propre processus : recherche d'hyperparamètres par successive halving
+(HalvingGridSearchCV, ROC AUC en validation croisée) puis évaluation sur le jeu de test.
+Le préprocesseur est ajusté une seule fois (src/preprocessing_cache.py) : candidats et plis
+partagent les mêmes matrices prétraitées, projetées en mémoire.
+Les cœurs sont répartis entre processus (n_jobs et threads BLAS/OpenMP bornés) pour ne pas
+sursouscrire la machine. Le meilleur pipeline selon la ROC AUC de test est écrit avec un
+rapport au format de model_performance.txt, temps d'entraînement par candidat compris.
+
+Usage :
+    python -m src.training
+    python -m src.training --data src/loan_data.csv --output-dir src/models --workers 3
+    python -m src.training --candidates random_forest --rows 10000 --no-search
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import HalvingGridSearchCV, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from threadpoolctl import threadpool_limits
+
+from src.api_reference import FEATURE_DESCRIPTIONS
+from src.input_validation import CATEGORICAL_VALUES, validate_frame
+from src.preprocessing_cache import DEFAULT_CACHE_DIR, PreprocessingCache, PreparedData
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+TARGET = 'loan_status'
+FEATURES = list(FEATURE_DESCRIPTIONS)
+NUMERICAL_COLS = [field for field in FEATURES if field not in CATEGORICAL_VALUES]
+CATEGORICAL_COLS = [field for field in FEATURES if field in CATEGORICAL_VALUES]
+# Part maximale de lignes écartées par la validation avant d'arrêter l'entraînement
+MAX_DROPPED_RATE = 0.05
+
+
+def _xgboost(random_state: int):
+    # Dépendance facultative (requirements-app.txt) : le candidat est ignoré sans elle
+    from xgboost import XGBClassifier
+    return XGBClassifier(random_state=random_state, eval_metric='logloss', n_estimators=200,
+                         learning_rate=0.1, max_depth=5, n_jobs=1)
+
+
+# Candidats : libellé du rapport, estimateur (paramètres du notebook) et grille de recherche
+CANDIDATES = {
+    'logistic_regression': (
+        'Logistic Regression',
+        lambda seed: LogisticRegression(random_state=seed, solver='liblinear', C=0.1),
+        {'C': [0.01, 0.1, 1.0, 10.0], 'class_weight': [None, 'balanced']}
+    ),
+    'random_forest': (
+        'Random Forest',
+        lambda seed: RandomForestClassifier(random_state=seed, n_estimators=200, max_depth=10, n_jobs=1),
+        {'n_estimators': [100, 200], 'max_depth': [6, 10, 16, None], 'min_samples_leaf': [1, 5]}
+    ),
+    'xgboost': (
+        'XGBoost',
+        _xgboost,
+        {'n_estimators': [100, 200, 400], 'learning_rate': [0.05, 0.1], 'max_depth': [3, 5, 7]}
+    ),
+}
+
+
+def build_preprocessor() -> ColumnTransformer:
+    # Même structure que le pipeline servi (compilable par src/feature_encoder.py)
+    return ColumnTransformer(
+        transformers=[
+            ('num', Pipeline(steps=[('scaler', StandardScaler())]), NUMERICAL_COLS),
+            ('cat', Pipeline(steps=[('onehot', OneHotEncoder(handle_unknown='ignore'))]), CATEGORICAL_COLS)
+        ],
+        remainder='passthrough'
+    )
+
+
+def load_dataset(data_path: str, rows: int = None, seed: int = 42,
+                 max_dropped_rate: float = MAX_DROPPED_RATE) -> Tuple[pd.DataFrame, pd.Series, int]:
+    # Les modalités sont normalisées comme en production (p. ex. 'female' -> 'Female'). Une modalité
+    # inconnue de l'API est conservée telle quelle (person_education='Associate' : 27 % de
+    # loan_data.csv) et apprise par le OneHotEncoder ; seules les lignes incomplètes ou aux
+    # numériques invalides sont écartées, et au-delà de max_dropped_rate l'entraînement s'arrête.
+    df = pd.read_csv(data_path)
+    if rows and rows < len(df):
+        df = df.sample(n=rows, random_state=seed)
+    normalized, valid_mask, errors = validate_frame(df[FEATURES], FEATURES)
+    for field in CATEGORICAL_COLS:
+        raw = df[field]
+        unknown = raw.notna().to_numpy() & normalized[field].isna().to_numpy()
+        if unknown.any():
+            kept = raw[unknown].astype(str).str.strip()
+            normalized.loc[unknown, field] = kept.to_numpy()
+            logger.warning(f"{field} : modalités hors API conservées pour l'entraînement "
+                           f"{kept.value_counts().to_dict()}")
+    for row, details in errors.items():
+        if all(key in CATEGORICAL_VALUES for key in details):
+            valid_mask[row] = True
+
+    dropped = int((~valid_mask).sum())
+    if dropped:
+        causes = pd.Series([key for row in np.flatnonzero(~valid_mask) for key in errors[int(row)]]).value_counts()
+        logger.warning(f"{dropped} lignes sur {len(df)} écartées par la validation ({causes.to_dict()})")
+    if dropped > max_dropped_rate * len(df):
+        raise ValueError(f"{dropped} lignes sur {len(df)} écartées par la validation "
+                         f"(plus de {max_dropped_rate:.0%}) : vérifier le fichier de données")
+    target = df[TARGET].to_numpy()[valid_mask]
+    X = normalized[valid_mask].reset_index(drop=True)
+    return X, pd.Series(target, name=TARGET), dropped
+
+
+def train_candidate(key: str, data_dir: str, n_jobs: int, search: bool, cv: int, factor: int,
+                    seed: int) -> Dict[str, Any]:
+    # Exécuté dans un processus du pool : les matrices prétraitées sont projetées en mémoire
+    # (partagées entre processus) et les bibliothèques natives bornées à n_jobs threads
+    label, make_estimator, grid = CANDIDATES[key]
+    data = PreparedData(data_dir)
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_jobs):
+        classifier = make_estimator(seed)
+        summary = {}
+        if search:
+            searcher = HalvingGridSearchCV(classifier, grid, scoring='roc_auc', cv=cv, factor=factor,
+                                           random_state=seed, n_jobs=n_jobs, refit=True)
+            searcher.fit(data.X_train, data.y_train)
+            classifier = searcher.best_estimator_
+            summary = {
+                'best_params': searcher.best_params_,
+                'cv_roc_auc': float(searcher.best_score_),
+                'fits': int(sum(searcher.n_candidates_)) * cv,
+                'iterations': int(searcher.n_iterations_)
+            }
+        else:
+            classifier.fit(data.X_train, data.y_train)
+        y_proba = classifier.predict_proba(data.X_test)[:, 1]
+    y_pred = classifier.classes_[(y_proba > 0.5).astype(int)]
+    return {
+        'key': key,
+        'name': label,
+        'classifier': classifier,
+        'metrics': {
+            'accuracy': accuracy_score(data.y_test, y_pred),
+            'precision': precision_score(data.y_test, y_pred),
+            'recall': recall_score(data.y_test, y_pred),
+            'roc_auc': roc_auc_score(data.y_test, y_proba)
+        },
+        'search': summary,
+        'seconds': round(time.perf_counter() - start, 2),
+        'n_jobs': n_jobs
+    }
+
+
+def available_candidates(requested: List[str] = None) -> List[str]:
+    candidates = []
+    for key in requested or list(CANDIDATES):
+        if key not in CANDIDATES:
+            raise ValueError(f"Candidat inconnu: {key} (disponibles : {', '.join(CANDIDATES)})")
+        try:
+            CANDIDATES[key][1](0)
+        except ImportError as e:
+            logger.warning(f"Candidat {key} ignoré: {str(e)}")
+            continue
+        candidates.append(key)
+    return candidates
+
+
+def train(data_path: str, output_dir: str, candidates: List[str] = None, workers: int = None, search: bool = True,
+          cv: int = 3, factor: int = 3, rows: int = None, seed: int = 42,
+          model_name: str = 'best_credit_risk_model.pkl', cache_dir: str = DEFAULT_CACHE_DIR,
+          max_dropped_rate: float = MAX_DROPPED_RATE) -> Dict[str, Any]:
+    start = time.perf_counter()
+    candidates = available_candidates(candidates)
+    if not candidates:
+        raise ValueError("Aucun candidat disponible")
+
+    X, y, dropped = load_dataset(data_path, rows, seed, max_dropped_rate)
+    logger.info(f"{len(X)} lignes d'entraînement ({dropped} écartées par la validation)")
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed, stratify=y)
+    # Préprocesseur ajusté une fois pour tous les candidats et plis (réutilisé d'une exécution à l'autre)
+    prepare_start = time.perf_counter()
+    data = PreprocessingCache(cache_dir).prepare(build_preprocessor(), X_train, y_train, X_test, y_test)
+    prepare_seconds = round(time.perf_counter() - prepare_start, 2)
+
+    # Un processus par candidat au plus ; les cœurs restants vont aux fits de chaque recherche
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(candidates)))
+    n_jobs = max(1, cpus // workers)
+    logger.info(f"{len(candidates)} candidats sur {workers} processus, {n_jobs} cœur(s) chacun")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(train_candidate, key, data.directory, n_jobs, search, cv, factor, seed): key
+                   for key in candidates}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Erreur lors de l'entraînement de {key}: {str(e)}")
+                continue
+            results[key] = result
+            logger.info(f"{result['name']} - ROC AUC: {result['metrics']['roc_auc']:.4f} "
+                        f"({result['seconds']}s{', ' + str(result['search']['best_params']) if search else ''})")
+
+    if not results:
+        raise RuntimeError("Aucun modèle n'a pu être entraîné")
+    best = max(results.values(), key=lambda result: result['metrics']['roc_auc'])
+
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, model_name)
+    # Écriture puis renommage : la surveillance du modèle ne voit jamais un fichier partiel
+    pipeline = Pipeline(steps=[('preprocessor', data.preprocessor), ('classifier', best['classifier'])])
+    joblib.dump(pipeline, model_path + '.tmp')
+    os.replace(model_path + '.tmp', model_path)
+    report_path = os.path.join(output_dir, 'model_performance.txt')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(format_report(best, [results[key] for key in candidates if key in results], len(X), dropped,
+                              data.key, prepare_seconds))
+
+    return {
+        'best': best['name'],
+        'roc_auc': round(best['metrics']['roc_auc'], 4),
+        'model_path': model_path,
+        'report_path': report_path,
+        'candidate_seconds': {result['name']: result['seconds'] for result in results.values()},
+        'preprocessing': {'key': data.key, 'seconds': prepare_seconds},
+        'seconds': round(time.perf_counter() - start, 2)
+    }
+
+
+def format_report(best: Dict[str, Any], results: List[Dict[str, Any]], rows: int, dropped: int,
+                  data_key: str, prepare_seconds: float) -> str:
+    metrics = best['metrics']
+    lines = [
+        f"Meilleur modèle: {best['name']}",
+        f"ROC AUC: {metrics['roc_auc']:.4f}",
+        f"Accuracy: {metrics['accuracy']:.4f}",
+        f"Precision: {metrics['precision']:.4f}",
+        f"Recall: {metrics['recall']:.4f}",
+        "",
+        "Tous les résultats:"
+    ]
+    lines.extend(f"{result['name']}: {result['metrics']}" for result in results)
+    lines.extend(["", f"Temps d'entraînement ({rows} lignes, {dropped} écartées par la validation):",
+                  f"Prétraitement: {prepare_seconds}s (cache {data_key})"])
+    for result in results:
+        search = result['search']
+        details = f", {search['fits']} fits en {search['iterations']} itérations, " \
+                  f"ROC AUC CV {search['cv_roc_auc']:.4f}, {search['best_params']}" if search else ''
+        lines.append(f"{result['name']}: {result['seconds']}s ({result['n_jobs']} cœur(s){details})")
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement parallèle des modèles candidats")
+    parser.add_argument('--data', default=os.path.join(SRC_DIR, 'loan_data.csv'))
+    parser.add_argument('--output-dir', default=os.path.join(SRC_DIR, 'models'))
+    parser.add_argument('--model-name', default='best_credit_risk_model.pkl', help='Nom du pipeline écrit')
+    parser.add_argument('--candidates', nargs='+', choices=list(CANDIDATES), help='Défaut : tous les candidats disponibles')
+    parser.add_argument('--workers', type=int, help='Processus parallèles (défaut : un par candidat, borné aux cœurs)')
+    parser.add_argument('--no-search', action='store_true', help='Paramètres du notebook, sans recherche')
+    parser.add_argument('--cv', type=int, default=3, help='Plis de validation croisée')
+    parser.add_argument('--factor', type=int, default=3, help='Facteur de successive halving')
+    parser.add_argument('--rows', type=int, help='Sous-échantillon de lignes (essais rapides)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Cache des matrices prétraitées')
+    parser.add_argument('--max-dropped-rate', type=float, default=MAX_DROPPED_RATE,
+                        help="Part maximale de lignes écartées par la validation (défaut : 0.05)")
+    args = parser.parse_args()
+
+    summary = train(args.data, args.output_dir, args.candidates, args.workers, not args.no_search,
+                    args.cv, args.factor, args.rows, args.seed, args.model_name, args.cache_dir,
+                    args.max_dropped_rate)
+    times = ', '.join(f"{name} {seconds}s" for name, seconds in summary['candidate_seconds'].items())
+    print(f"✅ Meilleur modèle: {summary['best']} (ROC AUC {summary['roc_auc']}) -> {summary['model_path']}")
+    print(f"   Durée totale {summary['seconds']}s ({times}) ; rapport : {summary['report_path']}")
+
+
+if __name__ == '__main__':
+    main()
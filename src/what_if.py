@@ -0,0 +1,115 @@
+"""
+Analyse de sensibilité (« what-if ») : un demandeur et une ou deux variables balayées.
+
+Chaque balayage est une plage ({field, start, stop, step}, bornes incluses) ou une liste
+de valeurs ({field, values}) ; une variable catégorielle sans liste prend toutes ses
+modalités. Les valeurs respectent les mêmes règles métier que validate_input.
+La grille (produit cartésien des balayages) est construite en un seul tableau par
+variable : CreditRiskPredictor.what_if n'encode la ligne de base qu'une fois et score
+toute la grille en un seul appel au classifieur.
+"""
+
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from src.api_reference import MAX_BATCH_SIZE
+from src.input_validation import (
+    NUMERIC_RULES, CATEGORICAL_VALUES, NUMERIC_TYPE_ERROR, canonical_value, categorical_error, is_number
+)
+
+MAX_SWEEPS = 2
+MAX_SWEEP_POINTS = MAX_BATCH_SIZE
+
+# loan_percent_income vaut loan_amnt / person_income (arrondi à 2 décimales dans loan_data.csv)
+PERCENT_INCOME = 'loan_percent_income'
+
+
+def _sweep_values(field: str, spec: Dict[str, Any]) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    if 'values' in spec:
+        values = spec['values']
+        if not isinstance(values, list) or not values:
+            return None, "values doit être une liste non vide"
+        if len(values) > MAX_SWEEP_POINTS:
+            return None, f"Au plus {MAX_SWEEP_POINTS} valeurs par variable"
+        if field in CATEGORICAL_VALUES:
+            # Mêmes variantes que validate_input ('female' -> 'Female') : la grille ne porte
+            # que des modalités connues de l'encodeur
+            values = [canonical_value(field, value) for value in values]
+            if any(value is None for value in values):
+                return None, categorical_error(field)
+            return np.asarray(values, dtype=object), None
+        if not all(is_number(value) for value in values):
+            return None, NUMERIC_TYPE_ERROR
+        values = np.asarray(values)
+    elif field in CATEGORICAL_VALUES:
+        return np.asarray(CATEGORICAL_VALUES[field], dtype=object), None
+    else:
+        start, stop, step = spec.get('start'), spec.get('stop'), spec.get('step')
+        if not all(is_number(value) for value in (start, stop, step)):
+            return None, "start, stop et step doivent être numériques"
+        if step <= 0 or stop < start:
+            return None, "step doit être positif et stop supérieur ou égal à start"
+        count = math.floor((stop - start) / step + 1e-9) + 1
+        if count > MAX_SWEEP_POINTS:
+            return None, f"Au plus {MAX_SWEEP_POINTS} valeurs par variable ({count} demandées)"
+        if all(isinstance(value, int) for value in (start, stop, step)):
+            values = start + step * np.arange(count, dtype=np.int64)
+        else:
+            # Arrondi : 0.1 + 3 * 0.1 doit rester 0.4 dans la réponse
+            values = np.round(start + step * np.arange(count), 10)
+    if field in NUMERIC_RULES:
+        rule, message = NUMERIC_RULES[field]
+        if not np.all(rule(values)):
+            return None, message
+    return values, None
+
+
+def parse_sweeps(specs: Any, feature_names: List[str]) -> Tuple[List[Tuple[str, np.ndarray]], Dict[str, Any]]:
+    # Renvoie les balayages (variable, valeurs) et le rapport d'erreurs par variable
+    if isinstance(specs, dict):
+        specs = [specs]
+    if not isinstance(specs, list) or not 1 <= len(specs) <= MAX_SWEEPS:
+        return [], {'sweeps': "Une ou deux variables à balayer attendues ({field, start, stop, step} ou {field, values})"}
+    sweeps, errors = [], {}
+    for spec in specs:
+        field = spec.get('field') if isinstance(spec, dict) else None
+        if field not in feature_names:
+            errors[str(field)] = "Variable inconnue"
+        elif any(field == swept for swept, _ in sweeps):
+            errors[field] = "Variable balayée plusieurs fois"
+        else:
+            values, error = _sweep_values(field, spec)
+            if error:
+                errors[field] = error
+            else:
+                sweeps.append((field, values))
+    points = math.prod(len(values) for _, values in sweeps)
+    if not errors and points > MAX_SWEEP_POINTS:
+        errors['sweeps'] = f"La grille ne peut pas dépasser {MAX_SWEEP_POINTS} points ({points} demandés)"
+    return sweeps, errors
+
+
+def build_grid(data: Dict[str, Any], sweeps: List[Tuple[str, np.ndarray]],
+               link_percent_income: bool = True) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    # Colonnes modifiées de la grille, une valeur par point (produit cartésien, premier
+    # balayage en lignes). La ligne 0 est le demandeur tel que soumis.
+    # Quand loan_amnt ou person_income varient, loan_percent_income suit (sauf s'il est balayé).
+    # Numériques en float64 : un balayage entier ne doit pas tronquer la valeur soumise (12.75 -> 12)
+    grids = np.meshgrid(*[values for _, values in sweeps], indexing='ij')
+    columns = {
+        field: np.concatenate([np.asarray([data[field]], dtype=object if grid.dtype == object else np.float64),
+                               grid.ravel()])
+        for (field, _), grid in zip(sweeps, grids)
+    }
+    derived = []
+    if link_percent_income and PERCENT_INCOME not in columns and ({'loan_amnt', 'person_income'} & set(columns)):
+        n = len(next(iter(columns.values())))
+        amount = columns.get('loan_amnt', np.full(n, data['loan_amnt']))
+        income = columns.get('person_income', np.full(n, data['person_income']))
+        ratio = np.round(np.asarray(amount, dtype=np.float64) / np.asarray(income, dtype=np.float64), 2)
+        ratio[0] = data[PERCENT_INCOME]
+        columns[PERCENT_INCOME] = ratio
+        derived.append(PERCENT_INCOME)
+    return columns, derived